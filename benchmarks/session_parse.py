@@ -0,0 +1,109 @@
+"""
+Session-parser memory benchmark.
+
+Writes a synthetic Codex rollout (JSONL) and Gemini session (one JSON
+object) of a given size, dominated by large tool outputs as in long
+full-auto runs, then parses each under tracemalloc. Peak memory should
+stay flat as --size-mb grows: records are streamed and tool output is
+capped by TraceLimits.
+
+Usage:
+    python benchmarks/session_parse.py --size-mb 500
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, ".")
+
+from src.backends.codex import _parse_codex_session
+from src.backends.gemini import _parse_gemini_session
+
+TOOL_OUTPUT_BYTES = 256 * 1024
+
+
+def write_codex_session(path: Path, size_bytes: int) -> int:
+    """Write alternating function_call / function_call_output records."""
+    output = "x" * TOOL_OUTPUT_BYTES
+    written = records = 0
+    with open(path, "w") as f:
+        while written < size_bytes:
+            for payload in (
+                {"type": "function_call", "name": "shell",
+                 "arguments": json.dumps({"cmd": f"step {records}"}),
+                 "call_id": f"c{records}"},
+                {"type": "function_call_output", "call_id": f"c{records}",
+                 "output": output},
+            ):
+                line = json.dumps({
+                    "timestamp": "2026-01-01T00:00:00Z",
+                    "type": "response_item",
+                    "payload": payload,
+                }) + "\n"
+                f.write(line)
+                written += len(line)
+            records += 1
+    return records
+
+
+def write_gemini_session(path: Path, size_bytes: int) -> int:
+    """Write a session object whose messages carry large tool results."""
+    result = "y" * TOOL_OUTPUT_BYTES
+    written = records = 0
+    with open(path, "w") as f:
+        f.write('{"sessionId": "bench", "projectHash": "0", "messages": [')
+        while written < size_bytes:
+            item = json.dumps({
+                "type": "gemini",
+                "timestamp": "2026-01-01T00:00:00Z",
+                "content": f"step {records}",
+                "tokens": {"total": 10},
+                "toolCalls": [{"name": "shell", "args": {"cmd": "ls"},
+                               "result": result, "status": "success"}],
+            })
+            f.write(("," if records else "") + item)
+            written += len(item)
+            records += 1
+        f.write("]}")
+    return records
+
+
+def measure(parse, path: Path) -> tuple[float, float]:
+    """(seconds, peak MiB) for one parse of `path`."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    parse(path)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=500)
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, write, parse in (
+            ("codex", write_codex_session, _parse_codex_session),
+            ("gemini", write_gemini_session, _parse_gemini_session),
+        ):
+            path = Path(tmp) / f"{name}-session"
+            records = write(path, size)
+            elapsed, peak = measure(parse, path)
+            print(
+                f"{name:7s} {args.size_mb} MiB, {records} records: "
+                f"{elapsed:.2f}s, peak {peak:.1f} MiB"
+            )
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Executor benchmark suite.
+
+Runs graphs against the in-process mock backend (zero latency), so every
+measured second is coordination overhead rather than model time, and
+writes the results as JSON for tracking regressions across commits.
+
+Benchmarks:
+    schedule  end-to-end run time per node, per shape and size
+    plan      parse + topological sort + level grouping vs graph size
+    context   _build_context cost vs upstream fan-in, per edge policy
+    trace     build_trace + save_trace time and size vs number of steps,
+              plain and deduplicated
+    memory    peak Python heap (tracemalloc) of one run per shape
+
+Shapes: pipeline, parallel, plan_execute, random_dag (seeded).
+
+Usage:
+    python benchmarks/suite.py --out bench.json
+    python benchmarks/suite.py --quick --only schedule plan
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, ".")
+
+from src.agent import AgentResult
+from src.backends.mock import MOCK
+from src.graph import AsyncGraphExecutor, GraphExecutor, parse_graph
+from src.graph.envelope import TaskEnvelope
+from src.graph.executor import _build_context, _parallel_groups, _topo_sort
+from src.graph.schema import ContextPolicy, EdgeDef
+from src.tracing import build_trace, save_trace
+
+RESULTS_VERSION = 1
+SEED = 1234
+
+SIZES = [10, 100, 1000]
+QUICK_SIZES = [10, 100]
+PLAN_SIZES = [100, 1000, 10_000]
+FAN_INS = [1, 10, 100, 1000]
+TRACE_STEPS = [10, 100, 1000]
+
+
+# ── Graph shapes ─────────────────────────────────────────────────────
+
+
+def _node(i: int) -> dict:
+    return {"role": f"worker {i}", "backend": "mock"}
+
+
+def pipeline_graph(n: int) -> dict:
+    ids = [f"n{i}" for i in range(n)]
+    chain = ["_input", *ids, "_output"]
+    return {
+        "name": "pipeline",
+        "nodes": {nid: _node(i) for i, nid in enumerate(ids)},
+        "edges": [{"from": a, "to": b} for a, b in zip(chain, chain[1:])],
+    }
+
+
+def parallel_graph(n: int) -> dict:
+    workers = [f"w{i}" for i in range(n - 1)]
+    return {
+        "name": "parallel",
+        "nodes": {**{w: _node(i) for i, w in enumerate(workers)},
+                  "synth": _node(n)},
+        "edges": [{"from": "_input", "to": w} for w in workers]
+        + [{"from": w, "to": "synth", "context_policy": "aggregate"}
+           for w in workers]
+        + [{"from": "synth", "to": "_output"}],
+    }
+
+
+def plan_execute_graph(n: int) -> dict:
+    """A planner whose mock answer expands into n - 1 sequential items."""
+    MOCK.configure("planner", replay={"steps": [
+        {"output": json.dumps([f"subtask {i}" for i in range(n - 1)])},
+    ]})
+    return {
+        "name": "plan_execute",
+        "nodes": {
+            "planner": {
+                "type": "dynamic",
+                "expand": "sequential",
+                "llm_call": {"backend": "mock", "model": "planner",
+                             "prompt": "Plan: {{task}}"},
+            },
+            "executor": _node(0),
+        },
+        "edges": [
+            {"from": "_input", "to": "planner"},
+            {"from": "planner", "to": "executor",
+             "context_policy": "accumulate"},
+            {"from": "executor", "to": "_output"},
+        ],
+    }
+
+
+def random_dag_graph(n: int, max_parents: int = 3) -> dict:
+    """Seeded DAG: each node draws up to max_parents earlier nodes."""
+    rng = random.Random(SEED + n)
+    ids = [f"d{i}" for i in range(n)]
+    edges, has_child = [], set()
+    for i, nid in enumerate(ids):
+        parents = rng.sample(ids[:i], min(i, rng.randint(0, max_parents)))
+        if not parents:
+            edges.append({"from": "_input", "to": nid})
+        for p in parents:
+            edges.append({"from": p, "to": nid, "context_policy": "aggregate"})
+            has_child.add(p)
+    edges += [{"from": nid, "to": "_output"} for nid in ids if nid not in has_child]
+    return {
+        "name": "random_dag",
+        "nodes": {nid: _node(i) for i, nid in enumerate(ids)},
+        "edges": edges,
+    }
+
+
+SHAPES = {
+    "pipeline": pipeline_graph,
+    "parallel": parallel_graph,
+    "plan_execute": plan_execute_graph,
+    "random_dag": random_dag_graph,
+}
+
+
+# ── Benchmarks ───────────────────────────────────────────────────────
+
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of `repeat` calls, with executor logging muted."""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def bench_schedule(sizes: list[int], repeat: int) -> list[dict]:
+    rows = []
+    for shape, build in SHAPES.items():
+        for n in sizes:
+            graph = parse_graph(build(n))
+            for executor in (GraphExecutor, AsyncGraphExecutor):
+                seconds = timed(lambda: executor(graph).run("task"), repeat)
+                rows.append({
+                    "benchmark": "schedule",
+                    "shape": shape,
+                    "executor": executor.__name__,
+                    "nodes": n,
+                    "seconds": seconds,
+                    "per_node_us": seconds / n * 1e6,
+                })
+    return rows
+
+
+def bench_plan(sizes: list[int], repeat: int) -> list[dict]:
+    rows = []
+    for shape in ("pipeline", "parallel", "random_dag"):
+        for n in sizes:
+            data = SHAPES[shape](n)
+
+            def plan():
+                graph = parse_graph(data)
+                _parallel_groups(graph, _topo_sort(graph))
+
+            seconds = timed(plan, repeat)
+            rows.append({
+                "benchmark": "plan",
+                "shape": shape,
+                "nodes": n,
+                "seconds": seconds,
+                "per_node_us": seconds / n * 1e6,
+            })
+    return rows
+
+
+def bench_context(fan_ins: list[int], repeat: int, output_chars: int = 2000) -> list[dict]:
+    rows = []
+    output = "x" * output_chars
+    for policy in (ContextPolicy.AGGREGATE, ContextPolicy.ACCUMULATE,
+                   ContextPolicy.REPLACE):
+        for k in fan_ins:
+            sources = [f"s{i}" for i in range(k)]
+            edges = [EdgeDef(s, "target", policy) for s in sources]
+            completed = {}
+            for s in sources:
+                env = TaskEnvelope(context_id="c", task=f"task {s}", node_id=s)
+                env.mark_completed(AgentResult(agent_name=s, output=output))
+                completed[s] = [env]
+            seconds = timed(lambda: _build_context(edges, completed), repeat)
+            rows.append({
+                "benchmark": "context",
+                "policy": policy.value,
+                "fan_in": k,
+                "output_chars": output_chars,
+                "seconds": seconds,
+            })
+    return rows
+
+
+def bench_trace(step_counts: list[int], repeat: int) -> list[dict]:
+    rows = []
+    MOCK.configure(tool_calls=3, output_chars=2000)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "trace.json"
+        for n in step_counts:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = GraphExecutor(parse_graph(parallel_graph(n))).run("task")
+            build = timed(lambda: build_trace(result, "task"), repeat)
+            trace = build_trace(result, "task")
+            save = timed(lambda: save_trace(trace, str(path)), repeat)
+            size = path.stat().st_size
+            dedupe_build = timed(
+                lambda: build_trace(result, "task", dedupe=True), repeat)
+            save_trace(build_trace(result, "task", dedupe=True), str(path))
+            rows.append({
+                "benchmark": "trace",
+                "steps": n,
+                "build_seconds": build,
+                "save_seconds": save,
+                "bytes": size,
+                "dedupe_build_seconds": dedupe_build,
+                "dedupe_bytes": path.stat().st_size,
+            })
+    MOCK.configure()
+    return rows
+
+
+def bench_memory(n: int) -> list[dict]:
+    rows = []
+    for shape, build in SHAPES.items():
+        graph = parse_graph(build(n))
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            GraphExecutor(graph).run("task")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows.append({
+            "benchmark": "memory",
+            "shape": shape,
+            "nodes": n,
+            "peak_heap_mib": peak / (1024 * 1024),
+        })
+    return rows
+
+
+# ── Driver ───────────────────────────────────────────────────────────
+
+
+def peak_rss_mib() -> float:
+    """Peak resident set size of this process (ru_maxrss)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", type=Path, help="write JSON results here")
+    parser.add_argument("--quick", action="store_true",
+                        help="small sizes and one repeat, for smoke runs")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--only", nargs="+", metavar="NAME",
+        choices=["schedule", "plan", "context", "trace", "memory"],
+    )
+    args = parser.parse_args()
+    repeat = 1 if args.quick else args.repeat
+    selected = set(args.only or ["schedule", "plan", "context", "trace", "memory"])
+
+    MOCK.clear()
+    MOCK.configure()
+    sizes = QUICK_SIZES if args.quick else SIZES
+    runs = {
+        "schedule": lambda: bench_schedule(sizes, repeat),
+        "plan": lambda: bench_plan(
+            PLAN_SIZES[:2] if args.quick else PLAN_SIZES, repeat),
+        "context": lambda: bench_context(
+            FAN_INS[:3] if args.quick else FAN_INS, repeat),
+        "trace": lambda: bench_trace(
+            TRACE_STEPS[:2] if args.quick else TRACE_STEPS, repeat),
+        "memory": lambda: bench_memory(sizes[-1]),
+    }
+
+    results = []
+    for name, run in runs.items():
+        if name not in selected:
+            continue
+        t0 = time.perf_counter()
+        rows = run()
+        results.extend(rows)
+        print(f"{name:9s} {len(rows):3d} results in {time.perf_counter() - t0:.1f}s")
+
+    report = {
+        "version": RESULTS_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "repeat": repeat,
+        "seed": SEED,
+        "peak_rss_mib": peak_rss_mib(),
+        "results": results,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"wrote {args.out}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
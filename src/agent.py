@@ -6,11 +6,30 @@ process a task by sending a prompt to the LLM via a configurable backend
 (Codex CLI, Claude Code, or Gemini CLI).
 """
 
+import asyncio
+import threading
 import time
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable
 
-from src.backends import Backend, DEFAULT_MODELS, LLMResponse, TraceMessage
+from src.backends import (
+    Backend,
+    DEFAULT_MODELS,
+    ErrorKind,
+    LLMResponse,
+    REGISTRY,
+    SessionField,
+    SessionLoader,
+    TraceMessage,
+    session_fields,
+    session_repr,
+)
+from src.backends import acall as backend_acall
 from src.backends import call as backend_call
+from src.context import Context, ContextRope
+
+if TYPE_CHECKING:
+    from src.cache import ResultCache
 
 
 @dataclass
@@ -18,45 +37,60 @@ class AgentTrace:
     """Full trace of a single agent invocation for debugging / logging.
 
     Includes both the immediate execution data and the complete trace
-    extracted from the CLI's native session file.
+    extracted from the CLI's native session file. Session-derived fields
+    share the response's loader and are parsed on first access.
     """
 
     system_prompt: str = ""
     user_prompt: str = ""
-    context: str | None = None
-    full_prompt: str = ""
+    # Ropes shared with the envelopes that produced them, not copies
+    context: Context | None = None
+    full_prompt: Context = ""
     # Thinking / reasoning blocks (from session file)
-    thinking: list[str] = field(default_factory=list)
+    thinking: list[str] = SessionField(list)
     # Tool calls and results (from session file)
-    tool_calls: list[dict] = field(default_factory=list)
-    tool_results: list[dict] = field(default_factory=list)
+    tool_calls: list[dict] = SessionField(list)
+    tool_results: list[dict] = SessionField(list)
     # Raw events from stdout stream (backend-specific)
     raw_events: list[dict] = field(default_factory=list)
     # Complete normalized messages from session file
-    session_messages: list[TraceMessage] = field(default_factory=list)
+    session_messages: list[TraceMessage] = SessionField(list)
     # Path to the native session file
-    session_file: str | None = None
+    session_file: str | None = SessionField(lambda: None)
     # Extracted web searches and command executions (Codex-specific)
     web_searches: list[dict] = field(default_factory=list)
     command_executions: list[dict] = field(default_factory=list)
     # Final output and metadata
     output: str = ""
-    usage: dict | None = None
+    usage: dict | None = SessionField(lambda: None)
     error: str | None = None
     backend: str = ""
     model: str | None = None
+    # Seconds the call waited on backend rate limits
+    queue_delay: float = 0.0
+    session_loader: SessionLoader | None = field(
+        default=None, repr=False, compare=False,
+    )
+
+    def __repr__(self) -> str:
+        return session_repr(self)
 
     @property
     def reasoning(self) -> list[str]:
         """Alias for thinking (backward compat)."""
         return self.thinking
 
-    def to_dict(self) -> dict:
+    def to_dict(self, *, ropes: bool = False) -> dict:
+        """Plain dict; `ropes` leaves ContextRope fields for src.blobs.dedupe()."""
+        context, full_prompt = self.context, self.full_prompt
+        if not ropes:
+            context = str(context) if context is not None else None
+            full_prompt = str(full_prompt)
         return {
             "system_prompt": self.system_prompt,
             "user_prompt": self.user_prompt,
-            "context": self.context,
-            "full_prompt": self.full_prompt,
+            "context": context,
+            "full_prompt": full_prompt,
             "thinking": self.thinking,
             "tool_calls": self.tool_calls,
             "tool_results": self.tool_results,
@@ -70,8 +104,34 @@ class AgentTrace:
             "error": self.error,
             "backend": self.backend,
             "model": self.model,
+            "queue_delay": self.queue_delay,
         }
 
+    @classmethod
+    def from_dict(cls, d: dict) -> "AgentTrace":
+        return cls(
+            system_prompt=d.get("system_prompt", ""),
+            user_prompt=d.get("user_prompt", ""),
+            context=d.get("context"),
+            full_prompt=d.get("full_prompt", ""),
+            thinking=d.get("thinking", []),
+            tool_calls=d.get("tool_calls", []),
+            tool_results=d.get("tool_results", []),
+            raw_events=d.get("raw_events", []),
+            session_messages=[
+                TraceMessage.from_dict(m) for m in d.get("session_messages", [])
+            ],
+            session_file=d.get("session_file"),
+            web_searches=d.get("web_searches", []),
+            command_executions=d.get("command_executions", []),
+            output=d.get("output", ""),
+            usage=d.get("usage"),
+            error=d.get("error"),
+            backend=d.get("backend", ""),
+            model=d.get("model"),
+            queue_delay=d.get("queue_delay", 0.0),
+        )
+
 
 @dataclass
 class AgentResult:
@@ -81,6 +141,46 @@ class AgentResult:
     trace: AgentTrace | None = None
     elapsed: float = 0.0
     step_label: str = ""
+    # True when served from a ResultCache instead of a backend call
+    cached: bool = False
+    # Why the call failed (timeout / cancelled / api / exit), if it did
+    error_kind: ErrorKind | None = None
+    # Backend calls made for this result (retries included)
+    attempts: int = 1
+    # True when the result came from a hedged duplicate call
+    hedged: bool = False
+
+    @property
+    def timed_out(self) -> bool:
+        return self.error_kind == ErrorKind.TIMEOUT
+
+    def to_dict(self, *, ropes: bool = False) -> dict:
+        return {
+            "agent_name": self.agent_name,
+            "output": self.output,
+            "error": self.error,
+            "trace": self.trace.to_dict(ropes=ropes) if self.trace else None,
+            "elapsed": self.elapsed,
+            "step_label": self.step_label,
+            "error_kind": self.error_kind.value if self.error_kind else None,
+            "attempts": self.attempts,
+            "hedged": self.hedged,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "AgentResult":
+        trace = d.get("trace")
+        return cls(
+            agent_name=d.get("agent_name", ""),
+            output=d.get("output", ""),
+            error=d.get("error"),
+            trace=AgentTrace.from_dict(trace) if trace else None,
+            elapsed=d.get("elapsed", 0.0),
+            step_label=d.get("step_label", ""),
+            error_kind=ErrorKind(d["error_kind"]) if d.get("error_kind") else None,
+            attempts=d.get("attempts", 1),
+            hedged=d.get("hedged", False),
+        )
 
 
 @dataclass
@@ -91,31 +191,165 @@ class Agent:
     full_auto: bool = False  # enable autonomous mode (web search / commands)
     backend: Backend | str = Backend.CODEX  # which CLI to use
     model: str = ""  # model override (defaults to backend-specific default)
+    cache: "ResultCache | None" = None  # serve identical prompts from disk
+    # further (backend, model) candidates; see src.backends.router
+    fallbacks: list[tuple[Backend | str, str]] = field(default_factory=list)
 
     def __repr__(self) -> str:
         return f"Agent({self.name!r}, backend={self.backend!r})"
 
-    def run(self, task: str, context: str = "") -> AgentResult:
-        """Execute a task with optional context from previous steps."""
-        system_prompt = f"You are: {self.role}"
-        parts = [system_prompt]
-        if context:
-            parts.append(f"Context from previous work:\n{context}")
-        user_prompt = f"Task:\n{task}"
-        parts.append(user_prompt)
-        if self.instruction:
-            parts.append(f"Your specific assignment:\n{self.instruction}")
+    def run(
+        self,
+        task: str,
+        context: Context = "",
+        *,
+        timeout: float | None = None,
+        cancel: threading.Event | None = None,
+        coalesce: bool = True,
+        slot: Callable[[str], Any] | None = None,
+    ) -> AgentResult:
+        """Execute a task with optional context from previous steps.
 
-        prompt = "\n\n".join(parts)
+        `timeout` and `cancel` are passed to the backend, which kills the
+        CLI's process group when either fires. `coalesce=False` forces a
+        fresh backend call even if an identical one is in flight. `slot`
+        is held around each backend attempt (see src.backends.call).
+        """
+        system_prompt, user_prompt, rope = self._build_prompt(task, context)
+        prompt = str(rope)
         t0 = time.time()
+        cached = self._cache_lookup(prompt, t0)
+        if cached:
+            return cached
         resp: LLMResponse = backend_call(
             prompt,
             backend=self.backend,
             model=self.model,
             full_auto=self.full_auto,
+            timeout=timeout,
+            cancel=cancel,
+            coalesce=coalesce,
+            fallbacks=self.fallbacks,
+            slot=slot,
         )
         elapsed = time.time() - t0
+        result = self._make_result(
+            resp, system_prompt, user_prompt, context, rope, elapsed,
+        )
+        self._cache_store(prompt, result)
+        return result
+
+    async def arun(
+        self,
+        task: str,
+        context: Context = "",
+        *,
+        timeout: float | None = None,
+        cancel: asyncio.Event | None = None,
+        coalesce: bool = True,
+        slot: Callable[[str], Any] | None = None,
+    ) -> AgentResult:
+        """Async variant of run() using the asyncio backend path.
+
+        Cache lookups touch the disk, so they run in a worker thread
+        rather than on the event loop; writes go to the cache's writer.
+        """
+        system_prompt, user_prompt, rope = self._build_prompt(task, context)
+        prompt = str(rope)
+        t0 = time.time()
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self._cache_lookup, prompt, t0)
+            if cached:
+                return cached
+        resp: LLMResponse = await backend_acall(
+            prompt,
+            backend=self.backend,
+            model=self.model,
+            full_auto=self.full_auto,
+            timeout=timeout,
+            cancel=cancel,
+            coalesce=coalesce,
+            fallbacks=self.fallbacks,
+            slot=slot,
+        )
+        elapsed = time.time() - t0
+        result = self._make_result(
+            resp, system_prompt, user_prompt, context, rope, elapsed,
+        )
+        self._cache_store(prompt, result)
+        return result
+
+    def _cache_key(self, prompt: str) -> str:
+        return self.cache.key(
+            prompt,
+            backend=self.backend,
+            model=self.model,
+            full_auto=self.full_auto,
+        )
+
+    def _cache_lookup(self, prompt: str, t0: float) -> AgentResult | None:
+        """Return a cached result for this exact prompt, if any."""
+        if self.cache is None:
+            return None
+        hit = self.cache.get(self._cache_key(prompt))
+        if hit is None:
+            return None
+        hit.agent_name = self.name
+        hit.elapsed = time.time() - t0
+        hit.cached = True
+        return hit
+
+    def _cache_store(self, prompt: str, result: AgentResult) -> None:
+        # Failed calls are never cached — a retry should hit the backend.
+        # Nor are a fallback's answers: the key names the primary backend.
+        # Serialising reads the lazy session fields, so the write (and any
+        # session parse) happens on the cache's writer thread.
+        if (
+            self.cache is not None
+            and result.error is None
+            and self._answered_by_primary(result)
+        ):
+            self.cache.put_later(self._cache_key(prompt), result)
+
+    def _answered_by_primary(self, result: AgentResult) -> bool:
+        if not self.fallbacks or result.trace is None:
+            return True
+        spec = REGISTRY.get(self.backend)
+        return (result.trace.backend, result.trace.model) == (
+            spec.name, self.model or spec.default_model,
+        )
+
+    def _build_prompt(
+        self, task: str, context: Context,
+    ) -> tuple[str, str, ContextRope]:
+        """Return (system_prompt, user_prompt, full_prompt).
+
+        The full prompt is a rope that references `context` rather than
+        copying it; str() it to get the text sent to the backend.
+        """
+        system_prompt = f"You are: {self.role}"
+        prompt = ContextRope(system_prompt)
+        if context:
+            prompt = prompt.append("\n\nContext from previous work:\n")
+            prompt = prompt.append(context)
+        user_prompt = f"Task:\n{task}"
+        prompt = prompt.append(f"\n\n{user_prompt}")
+        if self.instruction:
+            prompt = prompt.append(
+                f"\n\nYour specific assignment:\n{self.instruction}"
+            )
+        return system_prompt, user_prompt, prompt
 
+    def _make_result(
+        self,
+        resp: LLMResponse,
+        system_prompt: str,
+        user_prompt: str,
+        context: Context,
+        prompt: ContextRope,
+        elapsed: float,
+    ) -> AgentResult:
+        """Wrap a backend response into an AgentResult with full trace."""
         # Extract web_search and command_execution events (Codex-specific)
         web_searches: list[dict] = []
         command_executions: list[dict] = []
@@ -142,19 +376,15 @@ class Agent:
             user_prompt=user_prompt,
             context=context or None,
             full_prompt=prompt,
-            thinking=resp.thinking,
-            tool_calls=resp.tool_calls,
-            tool_results=resp.tool_results,
             raw_events=resp.raw_events,
-            session_messages=resp.session_messages,
-            session_file=resp.session_file,
             web_searches=web_searches,
             command_executions=command_executions,
             output=resp.text,
-            usage=resp.usage,
             error=resp.error,
             backend=resp.backend,
             model=resp.model,
+            queue_delay=resp.queue_delay,
+            **session_fields(resp),
         )
 
         return AgentResult(
@@ -163,4 +393,5 @@ class Agent:
             error=resp.error,
             trace=trace,
             elapsed=elapsed,
+            error_kind=resp.error_kind,
         )
@@ -4,16 +4,37 @@ Multi-backend LLM support: Codex CLI, Claude Code, Gemini CLI.
 Each backend invokes the CLI subprocess, then reads the native session
 file for the complete faithful trace (thinking, tool calls, tool results).
 Trace extraction methods adapted from life-long-memory parsers.
+Backend.MOCK answers in-process for offline and load testing.
+
+Session handling is deferred: responses carry a SessionLoader, and the
+session file is located, waited for and parsed on first access to a
+trace field. Callers that only need the answer text never pay for it.
 """
 
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from enum import Enum
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+from typing import Any, AsyncContextManager, Callable, ContextManager, Sequence
 
 
 class Backend(str, Enum):
     CODEX = "codex"
     CLAUDE_CODE = "claude_code"
     GEMINI = "gemini"
+    MOCK = "mock"  # in-process, for offline and load testing
+
+
+class ErrorKind(str, Enum):
+    """Why a backend call failed."""
+
+    TIMEOUT = "timeout"  # deadline expired, process group killed
+    CANCELLED = "cancelled"  # run already failed, process group killed
+    API = "api"  # the CLI reported an error event
+    EXIT = "exit"  # the CLI exited non-zero without reporting why
 
 
 DEFAULT_BACKEND = Backend.CODEX
@@ -22,8 +43,12 @@ DEFAULT_MODELS = {
     Backend.CODEX: "gpt-5.2-codex",
     Backend.CLAUDE_CODE: "claude-sonnet-4-6",
     Backend.GEMINI: "gemini-2.5-pro",
+    Backend.MOCK: "mock",
 }
 
+# Concurrent calls call_batch() makes for backends without batching.
+BATCH_WORKERS = 8
+
 
 @dataclass
 class TraceMessage:
@@ -56,26 +81,165 @@ class TraceMessage:
             d["timestamp"] = self.timestamp
         return d
 
+    @classmethod
+    def from_dict(cls, d: dict) -> "TraceMessage":
+        return cls(
+            role=d.get("role", ""),
+            content_type=d.get("content_type", ""),
+            content=d.get("content", ""),
+            tool_name=d.get("tool_name"),
+            tool_input=d.get("tool_input"),
+            timestamp=d.get("timestamp", ""),
+        )
+
+
+# Fields a session file provides, in the order parsers return them.
+TRACE_FIELDS = ("thinking", "tool_calls", "tool_results", "session_messages")
+
+# Marks a session-derived field that has not been loaded yet.
+_UNLOADED: Any = type("_Unloaded", (), {"__repr__": lambda self: "<unloaded>"})()
+
+
+class SessionLoader:
+    """Finds and parses one session file on first call; caches the result.
+
+    `parse(path)` returns either a tuple in TRACE_FIELDS order or a dict
+    of field values. Give either the `path` or a `locate()` that finds it
+    (None if there is no session file); locating may wait for the CLI to
+    flush the file, which is why it is deferred too. The loaded fields
+    include `session_file`. Thread-safe, so one loader can back both an
+    LLMResponse and the AgentTrace built from it.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[Any], tuple | dict],
+        path: Any = None,
+        *,
+        locate: Callable[[], Any] | None = None,
+    ):
+        self.parse = parse
+        self.path = path
+        self.locate = locate
+        self._lock = threading.Lock()
+        self._fields: dict | None = None
+
+    def __call__(self) -> dict:
+        with self._lock:
+            if self._fields is None:
+                if self.path is None and self.locate is not None:
+                    self.path = self.locate()
+                fields: dict = {}
+                if self.path is not None:
+                    parts = self.parse(self.path)
+                    fields = (
+                        parts if isinstance(parts, dict)
+                        else dict(zip(TRACE_FIELDS, parts))
+                    )
+                fields.setdefault(
+                    "session_file", str(self.path) if self.path else None,
+                )
+                self._fields = fields
+            return self._fields
+
+
+class SessionField:
+    """Dataclass field whose value comes from the session file on demand.
+
+    Declared as `thinking: list[str] = SessionField(list)`. Passing a
+    value to the constructor sets it eagerly; leaving it out defers it to
+    the instance's `session_loader`, falling back to `default()`.
+    """
+
+    def __init__(self, default: Callable[[], Any]):
+        self.default = default
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return _UNLOADED  # dataclass picks this up as the default
+        try:
+            return obj.__dict__[self.name]
+        except KeyError:
+            loader = obj.session_loader
+            loaded = loader() if loader is not None else {}
+            value = loaded.get(self.name, _UNLOADED)
+            if value is _UNLOADED:
+                value = self.default()
+            return obj.__dict__.setdefault(self.name, value)
+
+    def __set__(self, obj, value) -> None:
+        if value is _UNLOADED:
+            obj.__dict__.pop(self.name, None)
+        else:
+            obj.__dict__[self.name] = value
+
+
+def session_repr(obj) -> str:
+    """Dataclass-style repr that shows unloaded session fields as such.
+
+    The generated repr would read every field, so printing or logging a
+    response would locate and parse its session file.
+    """
+    parts = []
+    for f in fields(obj):
+        if not f.repr:
+            continue
+        lazy = isinstance(vars(type(obj)).get(f.name), SessionField)
+        value = (
+            _UNLOADED if lazy and f.name not in obj.__dict__
+            else getattr(obj, f.name)
+        )
+        parts.append(f"{f.name}={value!r}")
+    return f"{type(obj).__name__}({', '.join(parts)})"
+
+
+def session_fields(obj) -> dict:
+    """Constructor kwargs carrying `obj`'s session data without loading it.
+
+    Already-loaded values are copied; the rest stay deferred behind the
+    shared session_loader.
+    """
+    names = [
+        name for name, attr in vars(type(obj)).items()
+        if isinstance(attr, SessionField)
+    ]
+    fields = {name: obj.__dict__[name] for name in names if name in obj.__dict__}
+    fields["session_loader"] = obj.session_loader
+    return fields
+
 
 @dataclass
 class LLMResponse:
     """Unified response from any backend.
 
     Contains both the immediate answer (text) and the complete trace
-    extracted from the native session file.
+    extracted from the native session file. Session-derived fields are
+    parsed on first access via `session_loader`.
     """
 
     text: str
-    thinking: list[str] = field(default_factory=list)
-    tool_calls: list[dict] = field(default_factory=list)
-    tool_results: list[dict] = field(default_factory=list)
+    thinking: list[str] = SessionField(list)
+    tool_calls: list[dict] = SessionField(list)
+    tool_results: list[dict] = SessionField(list)
     raw_events: list[dict] = field(default_factory=list)
-    session_messages: list[TraceMessage] = field(default_factory=list)
-    session_file: str | None = None
-    usage: dict | None = None
+    session_messages: list[TraceMessage] = SessionField(list)
+    session_file: str | None = SessionField(lambda: None)
+    usage: dict | None = SessionField(lambda: None)
     error: str | None = None
     model: str | None = None
     backend: str = ""
+    error_kind: ErrorKind | None = None
+    # Seconds spent waiting on rate limits before the CLI was started
+    queue_delay: float = 0.0
+    session_loader: SessionLoader | None = field(
+        default=None, repr=False, compare=False,
+    )
+
+    def __repr__(self) -> str:
+        return session_repr(self)
 
     @property
     def reasoning(self) -> list[str]:
@@ -94,31 +258,366 @@ def call(
     backend: Backend | str = DEFAULT_BACKEND,
     model: str = "",
     full_auto: bool = False,
+    on_event: Callable[[dict], None] | None = None,
+    timeout: float | None = None,
+    cancel: threading.Event | None = None,
+    coalesce: bool = True,
+    fallbacks: Sequence[tuple[Backend | str, str]] = (),
+    slot: Callable[[str], ContextManager] | None = None,
 ) -> LLMResponse:
     """Dispatch a prompt to the appropriate CLI backend.
 
+    Concurrent calls with the same prompt, backend, model and full_auto
+    share one CLI process and receive the same LLMResponse (see
+    src.backends.singleflight); saved_calls() reports how many were
+    avoided. Calls with `on_event` are never coalesced. Configured rate
+    limits (src.backends.rate_limit) delay the call rather than fail it;
+    the wait is reported as `queue_delay` and counts against `timeout`.
+
+    With `fallbacks`, the primary and fallback candidates are ordered by
+    src.backends.router from live latency, error-rate and load figures,
+    and a call that fails with a timeout, API or exit error moves on to
+    the next candidate within the same overall `timeout`.
+
     Args:
         prompt: The full prompt string to send.
         backend: Which CLI to use (codex, claude_code, gemini).
         model: Model name. Defaults to backend-specific default.
         full_auto: Enable autonomous mode (web search, commands, etc.).
+        on_event: Called with each stdout event as the CLI emits it.
+        timeout: Seconds before the CLI's process group is killed and
+                 the response fails with ErrorKind.TIMEOUT.
+        cancel: Setting this event kills the CLI's process group and
+                fails the response with ErrorKind.CANCELLED.
+        coalesce: Set False to force a separate call, e.g. when sampling
+                  the same prompt several times on purpose.
+        fallbacks: Further (backend, model) candidates; "" selects the
+                   backend's default model.
+        slot: Called with the backend each attempt goes to; the context
+              manager it returns is held around that attempt, so a
+              concurrency limit applies to the backend the router chose.
 
     Returns:
         LLMResponse with text answer and complete session trace.
     """
-    if isinstance(backend, str):
-        backend = Backend(backend)
-
-    resolved_model = model or DEFAULT_MODELS[backend]
-
-    if backend == Backend.CODEX:
-        from src.backends.codex import call_codex
-        return call_codex(prompt, model=resolved_model, full_auto=full_auto)
-    elif backend == Backend.CLAUDE_CODE:
-        from src.backends.claude_code import call_claude_code
-        return call_claude_code(prompt, model=resolved_model, full_auto=full_auto)
-    elif backend == Backend.GEMINI:
-        from src.backends.gemini import call_gemini
-        return call_gemini(prompt, model=resolved_model, full_auto=full_auto)
+    primary = _resolve(backend, model)
+    if not fallbacks:
+        with _held(slot, primary[0]):
+            return _call_one(
+                prompt, *primary, full_auto, on_event=on_event,
+                timeout=timeout, cancel=cancel, coalesce=coalesce,
+            )
+
+    route = ROUTER.route(_candidates(primary, fallbacks))
+    start = time.monotonic()
+    for backend, model in route.plan:
+        with _held(slot, backend):
+            resp = _call_one(
+                prompt, backend, model, full_auto, on_event=on_event,
+                timeout=_remaining(timeout, time.monotonic() - start),
+                cancel=cancel, coalesce=coalesce,
+            )
+        route.record(backend, model, resp)
+        if not should_fail_over(resp) or _expired(timeout, start):
+            break
+    return resp
+
+
+async def acall(
+    prompt: str,
+    *,
+    backend: Backend | str = DEFAULT_BACKEND,
+    model: str = "",
+    full_auto: bool = False,
+    on_event: Callable[[dict], None] | None = None,
+    timeout: float | None = None,
+    cancel: asyncio.Event | None = None,
+    coalesce: bool = True,
+    fallbacks: Sequence[tuple[Backend | str, str]] = (),
+    slot: Callable[[str], AsyncContextManager] | None = None,
+) -> LLMResponse:
+    """Async counterpart of call().
+
+    Uses asyncio subprocesses, so many calls can be in flight on a single
+    event loop without one OS thread per call.
+    """
+    primary = _resolve(backend, model)
+    if not fallbacks:
+        async with _held(slot, primary[0]):
+            return await _acall_one(
+                prompt, *primary, full_auto, on_event=on_event,
+                timeout=timeout, cancel=cancel, coalesce=coalesce,
+            )
+
+    route = ROUTER.route(_candidates(primary, fallbacks))
+    start = time.monotonic()
+    for backend, model in route.plan:
+        async with _held(slot, backend):
+            resp = await _acall_one(
+                prompt, backend, model, full_auto, on_event=on_event,
+                timeout=_remaining(timeout, time.monotonic() - start),
+                cancel=cancel, coalesce=coalesce,
+            )
+        route.record(backend, model, resp)
+        if not should_fail_over(resp) or _expired(timeout, start):
+            break
+    return resp
+
+
+def backend_stats() -> dict[str, dict]:
+    """Live per-backend/model statistics (see src.backends.router)."""
+    return ROUTER.snapshot()
+
+
+def call_batch(
+    prompts: Sequence[str],
+    *,
+    backend: Backend | str = DEFAULT_BACKEND,
+    model: str = "",
+    full_auto: bool = False,
+    timeout: float | None = None,
+    cancel: threading.Event | None = None,
+) -> list[LLMResponse]:
+    """Answer several prompts, in one request if the backend batches.
+
+    Backends registered with Capabilities(batching=True) receive all
+    prompts in a single `batch` call. The call is rate-limited like one
+    request per prompt. Other backends get one call() per prompt,
+    BATCH_WORKERS at a time. Responses come back in prompt order.
+    """
+    name, model = _resolve(backend, model)
+    spec = REGISTRY.get(name)
+    if not prompts:
+        return []
+    if not spec.capabilities.batching:
+        with ThreadPoolExecutor(min(len(prompts), BATCH_WORKERS)) as pool:
+            return list(pool.map(
+                lambda p: call(
+                    p, backend=name, model=model, full_auto=full_auto,
+                    timeout=timeout, cancel=cancel,
+                ),
+                prompts,
+            ))
+
+    tickets = [RATE_LIMITS.reserve(name, model, p) for p in prompts]
+    last = max(tickets, key=lambda t: t.delay)
+    refused = RATE_LIMITS.wait(last, timeout=timeout, cancel=cancel)
+    if refused:
+        for t in tickets:
+            t.refund()
+        return [_gave_up(refused, name, model, timeout) for _ in prompts]
+    with ROUTER.track(name, model) as tracking:
+        responses = spec.resolve("batch")(
+            list(prompts), model=model, full_auto=full_auto,
+            timeout=_remaining(timeout, last.delay), cancel=cancel,
+        )
+        tracking.finish(
+            next((r for r in responses if r.error), responses[0]),
+        )
+    for t, resp in zip(tickets, responses):
+        t.settle(resp)
+        resp.queue_delay = last.delay
+    return responses
+
+
+def _call_one(
+    prompt: str,
+    backend: str,
+    model: str,
+    full_auto: bool,
+    *,
+    on_event: Callable[[dict], None] | None,
+    timeout: float | None,
+    cancel: threading.Event | None,
+    coalesce: bool,
+) -> LLMResponse:
+    """One backend/model: coalescing, then rate limits, then the CLI."""
+
+    def dispatch() -> LLMResponse:
+        ticket = RATE_LIMITS.reserve(backend, model, prompt)
+        refused = RATE_LIMITS.wait(ticket, timeout=timeout, cancel=cancel)
+        if refused:
+            resp = _gave_up(refused, backend, model, timeout)
+        else:
+            with ROUTER.track(backend, model) as tracking:
+                resp = tracking.finish(_dispatch(
+                    prompt, backend, model, full_auto,
+                    on_event=on_event, cancel=cancel,
+                    timeout=_remaining(timeout, ticket.delay),
+                ))
+            ticket.settle(resp)
+        resp.queue_delay = ticket.delay
+        return resp
+
+    if not coalesce or on_event is not None:
+        return dispatch()
+
+    return FLIGHTS.do(
+        (prompt, backend, model, full_auto),
+        dispatch,
+        timeout=timeout,
+        cancel=cancel,
+        on_give_up=lambda kind: _gave_up(kind, backend, model, timeout),
+    )
+
+
+async def _acall_one(
+    prompt: str,
+    backend: str,
+    model: str,
+    full_auto: bool,
+    *,
+    on_event: Callable[[dict], None] | None,
+    timeout: float | None,
+    cancel: asyncio.Event | None,
+    coalesce: bool,
+) -> LLMResponse:
+    async def dispatch() -> LLMResponse:
+        ticket = RATE_LIMITS.reserve(backend, model, prompt)
+        refused = await RATE_LIMITS.await_turn(
+            ticket, timeout=timeout, cancel=cancel,
+        )
+        if refused:
+            resp = _gave_up(refused, backend, model, timeout)
+        else:
+            with ROUTER.track(backend, model) as tracking:
+                resp = tracking.finish(await _adispatch(
+                    prompt, backend, model, full_auto,
+                    on_event=on_event, cancel=cancel,
+                    timeout=_remaining(timeout, ticket.delay),
+                ))
+            ticket.settle(resp)
+        resp.queue_delay = ticket.delay
+        return resp
+
+    if not coalesce or on_event is not None:
+        return await dispatch()
+
+    return await FLIGHTS.ado(
+        (prompt, backend, model, full_auto),
+        dispatch,
+        timeout=timeout,
+        cancel=cancel,
+        on_give_up=lambda kind: _gave_up(kind, backend, model, timeout),
+    )
+
+
+def saved_calls() -> int:
+    """Backend calls avoided so far by coalescing identical requests."""
+    return FLIGHTS.saved
+
+
+def _dispatch(
+    prompt: str,
+    backend: str,
+    model: str,
+    full_auto: bool,
+    *,
+    on_event: Callable[[dict], None] | None = None,
+    **kwargs,
+) -> LLMResponse:
+    spec = REGISTRY.get(backend)
+    if spec.capabilities.streaming:
+        kwargs["on_event"] = on_event
+    resp = spec.resolve("call")(
+        prompt, model=model, full_auto=full_auto, **kwargs,
+    )
+    if on_event is not None and not spec.capabilities.streaming:
+        _replay_events(resp, on_event)
+    return resp
+
+
+async def _adispatch(
+    prompt: str,
+    backend: str,
+    model: str,
+    full_auto: bool,
+    *,
+    on_event: Callable[[dict], None] | None = None,
+    **kwargs,
+) -> LLMResponse:
+    spec = REGISTRY.get(backend)
+    if spec.capabilities.streaming:
+        kwargs["on_event"] = on_event
+    if spec.capabilities.async_native:
+        resp = await spec.resolve("acall")(
+            prompt, model=model, full_auto=full_auto, **kwargs,
+        )
+    else:
+        resp = await run_sync(
+            spec.resolve("call"), prompt,
+            model=model, full_auto=full_auto, **kwargs,
+        )
+    if on_event is not None and not spec.capabilities.streaming:
+        _replay_events(resp, on_event)
+    return resp
+
+
+def _replay_events(resp: LLMResponse, on_event: Callable[[dict], None]) -> None:
+    """Deliver a non-streaming backend's answer as one final event."""
+    if resp.text:
+        on_event({"type": "text", "text": resp.text})
+
+
+def backend_name(backend: Backend | str) -> str:
+    """Registered name of `backend`; raises ValueError if unknown."""
+    return REGISTRY.get(backend).name
+
+
+def _resolve(backend: Backend | str, model: str) -> tuple[str, str]:
+    spec = REGISTRY.get(backend)
+    return spec.name, model or spec.default_model
+
+
+def _held(slot: Callable[[str], Any] | None, backend: str) -> Any:
+    """The context manager `slot` gives for `backend`, or a no-op one."""
+    return nullcontext() if slot is None else slot(backend)
+
+
+def _candidates(
+    primary: tuple[str, str],
+    fallbacks: Sequence[tuple[Backend | str, str]],
+) -> list[tuple[str, str]]:
+    """Primary plus resolved fallbacks, without duplicates."""
+    candidates = [primary]
+    for backend, model in fallbacks:
+        candidate = _resolve(backend, model)
+        if candidate not in candidates:
+            candidates.append(candidate)
+    return candidates
+
+
+def _remaining(timeout: float | None, spent: float) -> float | None:
+    return None if timeout is None else timeout - spent
+
+
+def _expired(timeout: float | None, start: float) -> bool:
+    return timeout is not None and time.monotonic() - start >= timeout
+
+
+def _gave_up(
+    kind: ErrorKind, backend: str, model: str, timeout: float | None,
+) -> LLMResponse:
+    """Response for a coalesced caller whose own timeout/cancel fired."""
+    if kind == ErrorKind.TIMEOUT:
+        error = f"{backend} timed out after {max(timeout or 0, 0):g}s"
     else:
-        raise ValueError(f"Unknown backend: {backend}")
+        error = f"{backend} call cancelled"
+    return LLMResponse(
+        text="", error=error, model=model, backend=backend,
+        error_kind=kind,
+    )
+
+
+# Imported last: these modules build on the types defined above.
+from src.backends.rate_limit import RATE_LIMITS  # noqa: E402
+from src.backends.registry import (  # noqa: E402
+    REGISTRY,
+    BackendSpec,
+    Capabilities,
+    run_sync,
+)
+from src.backends.router import ROUTER, should_fail_over  # noqa: E402
+from src.backends.singleflight import FLIGHTS  # noqa: E402
+
+register_backend = REGISTRY.register
@@ -3,6 +3,10 @@ Claude Code CLI backend.
 
 Invokes `claude -p --output-format stream-json` and extracts the complete
 trace from the native session file at ~/.claude/projects/{slug}/{uuid}.jsonl.
+The slug is the working directory with every non-alphanumeric character
+replaced by "-", and the uuid is the session_id from the init event.
+Lookup and parsing happen on first access to a trace field, not during
+the call.
 
 Session file format (from life-long-memory/src/parsers/claude_code.py):
   Each line: {"type": "user"|"assistant"|"progress"|..., "timestamp": str,
@@ -14,16 +18,29 @@ Session file format (from life-long-memory/src/parsers/claude_code.py):
     {"type": "tool_result", "content": "..."}   → tool result
 """
 
+import asyncio
 import json
-import subprocess
+import os
+import re
+import threading
 import time
+from functools import partial
 from pathlib import Path
-
-from src.backends import LLMResponse, TraceMessage
+from typing import Callable
+
+from src.backends import LLMResponse, SessionLoader, TraceMessage
+from src.backends.process_utils import (
+    ProcessResult,
+    classify_error,
+    run_process,
+    run_process_async,
+)
 from src.backends.session_utils import (
-    read_jsonl,
-    truncate,
-    wait_for_session_file,
+    TraceBuilder,
+    TraceLimits,
+    iter_jsonl,
+    locate_session_file,
+    settle,
 )
 
 CLAUDE_PROJECTS_DIR = Path.home() / ".claude" / "projects"
@@ -34,48 +51,95 @@ def call_claude_code(
     *,
     model: str = "claude-sonnet-4-6",
     full_auto: bool = False,
+    on_event: Callable[[dict], None] | None = None,
+    timeout: float | None = None,
+    cancel: threading.Event | None = None,
 ) -> LLMResponse:
-    """Send a prompt to Claude Code CLI and return the response with full trace."""
-    cmd = ["claude", "-p", "--output-format", "stream-json", "--verbose", "--model", model]
-    if full_auto:
-        cmd.append("--dangerously-skip-permissions")
+    """Send a prompt to Claude Code CLI and return the response with full trace.
+
+    `on_event` is called with each stream-json event as it arrives.
+    """
+    cmd = _claude_cmd(model, full_auto)
 
     # Record time before execution to find new session file
     start_mtime = time.time() - 1  # 1s buffer
 
-    proc = subprocess.Popen(
-        cmd,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
+    # Send prompt via stdin (safer for long prompts) and parse
+    # stream-json stdout for immediate answer
+    stream = _ClaudeStream(on_event)
+    proc = run_process(
+        cmd, stdin_data=prompt, on_line=stream.feed,
+        timeout=timeout, cancel=cancel,
+    )
+    if proc.killed:
+        return stream.response(proc, timeout, model, None)
+
+    # --- Complete trace from the session file, found on first access ---
+    return stream.response(
+        proc, timeout, model, _session_loader(stream.session_id, start_mtime),
     )
 
-    # Send prompt via stdin (safer for long prompts)
-    proc.stdin.write(prompt)
-    proc.stdin.close()
 
-    # Parse stream-json stdout for immediate answer
-    assistant_texts: list[str] = []
-    raw_events: list[dict] = []
-    usage = None
-    error = None
-    session_id = None
+async def acall_claude_code(
+    prompt: str,
+    *,
+    model: str = "claude-sonnet-4-6",
+    full_auto: bool = False,
+    on_event: Callable[[dict], None] | None = None,
+    timeout: float | None = None,
+    cancel: asyncio.Event | None = None,
+) -> LLMResponse:
+    """Async variant of call_claude_code built on asyncio subprocesses."""
+    cmd = _claude_cmd(model, full_auto)
+    start_mtime = time.time() - 1  # 1s buffer
+
+    stream = _ClaudeStream(on_event)
+    proc = await run_process_async(
+        cmd, stdin_data=prompt, on_line=stream.feed,
+        timeout=timeout, cancel=cancel,
+    )
+    if proc.killed:
+        return stream.response(proc, timeout, model, None)
+
+    return stream.response(
+        proc, timeout, model, _session_loader(stream.session_id, start_mtime),
+    )
+
+
+def _claude_cmd(model: str, full_auto: bool) -> list[str]:
+    cmd = ["claude", "-p", "--output-format", "stream-json", "--verbose", "--model", model]
+    if full_auto:
+        cmd.append("--dangerously-skip-permissions")
+    return cmd
+
+
+class _ClaudeStream:
+    """Accumulates the `claude -p --output-format stream-json` event stream."""
 
-    for line in proc.stdout:
+    def __init__(self, on_event: Callable[[dict], None] | None = None):
+        self.on_event = on_event
+        self.assistant_texts: list[str] = []
+        self.raw_events: list[dict] = []
+        self.usage: dict | None = None
+        self.error: str | None = None
+        self.session_id: str | None = None
+
+    def feed(self, line: str) -> None:
         line = line.strip()
         if not line:
-            continue
+            return
         try:
             event = json.loads(line)
         except json.JSONDecodeError:
-            continue
+            return
 
-        raw_events.append(event)
+        self.raw_events.append(event)
+        if self.on_event:
+            self.on_event(event)
         etype = event.get("type", "")
 
         if etype == "system" and event.get("subtype") == "init":
-            session_id = event.get("session_id")
+            self.session_id = event.get("session_id")
 
         elif etype == "assistant":
             message = event.get("message", {})
@@ -85,101 +149,118 @@ def call_claude_code(
                     if isinstance(block, dict) and block.get("type") == "text":
                         text = block.get("text", "")
                         if text:
-                            assistant_texts.append(text)
+                            self.assistant_texts.append(text)
             u = message.get("usage")
             if u:
-                usage = u
+                self.usage = u
 
         elif etype == "result":
             result_text = event.get("result", "")
-            if result_text and not assistant_texts:
-                assistant_texts.append(result_text)
+            if result_text and not self.assistant_texts:
+                self.assistant_texts.append(result_text)
             if event.get("is_error"):
-                error = result_text
-            if not session_id:
-                session_id = event.get("session_id")
+                self.error = result_text
+            if not self.session_id:
+                self.session_id = event.get("session_id")
 
         elif etype == "error":
-            error = event.get("error", {}).get("message", str(event))
-
-    proc.wait()
-
-    stderr_out = proc.stderr.read().strip()
-    if proc.returncode != 0 and not error:
-        error = stderr_out or f"claude exited with code {proc.returncode}"
-
-    final_text = assistant_texts[-1] if assistant_texts else ""
+            self.error = event.get("error", {}).get("message", str(event))
+
+    def response(
+        self,
+        proc: ProcessResult,
+        timeout: float | None,
+        model: str,
+        loader: SessionLoader | None,
+    ) -> LLMResponse:
+        """Build the LLMResponse; the session trace is loaded on first access."""
+        error, error_kind = classify_error("claude", proc, self.error, timeout)
+        return LLMResponse(
+            text=self.assistant_texts[-1] if self.assistant_texts else "",
+            raw_events=self.raw_events,
+            session_loader=loader,
+            usage=self.usage,
+            error=error,
+            model=model,
+            backend="claude_code",
+            error_kind=error_kind,
+        )
 
-    # --- Extract complete trace from session file ---
-    thinking, tool_calls, tool_results, session_messages = [], [], [], []
-    session_file = None
 
-    sf = _find_session_file(session_id, start_mtime)
-    if sf:
-        session_file = str(sf)
-        thinking, tool_calls, tool_results, session_messages = (
-            _parse_claude_code_session(sf)
-        )
+def _session_loader(session_id: str | None, start_mtime: float) -> SessionLoader:
+    """Loader that finds this call's session file when the trace is first read.
 
-    return LLMResponse(
-        text=final_text,
-        thinking=thinking,
-        tool_calls=tool_calls,
-        tool_results=tool_results,
-        raw_events=raw_events,
-        session_messages=session_messages,
-        session_file=session_file,
-        usage=usage,
-        error=error,
-        model=model,
-        backend="claude_code",
-    )
+    The project directory is fixed now, since the cwd may change later.
+    """
+    return SessionLoader(_parse_claude_code_session, locate=partial(
+        _find_session_file, session_id, start_mtime, _project_dir(),
+    ))
 
 
 def _find_session_file(
     session_id: str | None,
     start_mtime: float,
+    project_dir: Path,
 ) -> Path | None:
     """Find the Claude Code session JSONL file.
 
-    First tries to match by session_id, then falls back to newest file.
+    Looks for `{session_id}.jsonl` in `project_dir`, then in the other
+    project directories, and only then waits for the file to be flushed.
+    Without a session ID, takes the newest file in `project_dir`.
     """
     if not CLAUDE_PROJECTS_DIR.exists():
         return None
 
-    # If we know the session ID, search for the exact file
-    if session_id:
-        for project_dir in CLAUDE_PROJECTS_DIR.iterdir():
-            if not project_dir.is_dir():
-                continue
-            candidate = project_dir / f"{session_id}.jsonl"
-            if candidate.exists():
-                return candidate
+    exact = _session_file_by_id(session_id, project_dir)
+    if exact:
+        return settle(exact)
 
-    # Fallback: find newest JSONL file across all projects
-    return wait_for_session_file(
-        CLAUDE_PROJECTS_DIR, "*.jsonl", start_mtime, timeout=5.0,
+    return locate_session_file(
+        [project_dir], _session_pattern(session_id), start_mtime,
+        timeout=5.0, root=CLAUDE_PROJECTS_DIR,
     )
 
 
+def _project_dir() -> Path:
+    """Directory Claude Code files sessions under for the current cwd."""
+    return CLAUDE_PROJECTS_DIR / re.sub(r"[^A-Za-z0-9]", "-", str(Path.cwd()))
+
+
+def _session_pattern(session_id: str | None) -> str:
+    return f"{session_id}.jsonl" if session_id else "*.jsonl"
+
+
+def _session_file_by_id(session_id: str | None, project_dir: Path) -> Path | None:
+    """Find an existing `{session_id}.jsonl`, `project_dir` first."""
+    if not session_id:
+        return None
+    candidate = project_dir / f"{session_id}.jsonl"
+    if candidate.is_file():
+        return candidate
+    for project_dir in os.scandir(CLAUDE_PROJECTS_DIR):
+        candidate = Path(project_dir.path) / f"{session_id}.jsonl"
+        if project_dir.is_dir() and candidate.is_file():
+            return candidate
+    return None
+
+
 def _parse_claude_code_session(
     file_path: Path,
+    limits: TraceLimits | None = None,
 ) -> tuple[list[str], list[dict], list[dict], list[TraceMessage]]:
     """Parse a Claude Code session JSONL file for complete trace.
 
-    Adapted from life-long-memory/src/parsers/claude_code.py.
+    Adapted from life-long-memory/src/parsers/claude_code.py. Records are
+    streamed, so memory is bounded by `limits` rather than file size.
 
     Returns:
         (thinking, tool_calls, tool_results, session_messages)
     """
-    records = read_jsonl(file_path)
+    trace = TraceBuilder(limits)
 
-    thinking: list[str] = []
-    tool_calls: list[dict] = []
-    tool_results: list[dict] = []
-    messages: list[TraceMessage] = []
-
-    for rec in records:
+    for rec in iter_jsonl(file_path):
+        if not isinstance(rec, dict):
+            continue
         rec_type = rec.get("type", "")
         ts_str = rec.get("timestamp", "")
 
@@ -194,31 +275,23 @@ def _parse_claude_code_session(
         content = message.get("content", "")
 
         if rec_type == "user":
-            _parse_user_content(content, ts_str, messages, tool_results)
+            _parse_user_content(content, ts_str, trace)
 
         elif rec_type == "assistant":
-            _parse_assistant_content(
-                content, ts_str, messages, thinking, tool_calls,
-            )
+            _parse_assistant_content(content, ts_str, trace)
 
-    return thinking, tool_calls, tool_results, messages
+    return trace.parts()
 
 
 def _parse_user_content(
     content: str | list | dict,
     ts_str: str,
-    messages: list[TraceMessage],
-    tool_results: list[dict],
+    trace: TraceBuilder,
 ) -> None:
     """Parse user message content blocks."""
     if isinstance(content, str):
         if content.strip():
-            messages.append(TraceMessage(
-                role="user",
-                content_type="text",
-                content=content,
-                timestamp=ts_str,
-            ))
+            trace.text("user", content, ts_str)
         return
 
     if isinstance(content, list):
@@ -230,12 +303,7 @@ def _parse_user_content(
             if item_type == "text":
                 text = item.get("text", "")
                 if text.strip():
-                    messages.append(TraceMessage(
-                        role="user",
-                        content_type="text",
-                        content=text,
-                        timestamp=ts_str,
-                    ))
+                    trace.text("user", text, ts_str)
 
             elif item_type == "tool_result":
                 result_content = item.get("content", "")
@@ -245,35 +313,22 @@ def _parse_user_content(
                         if isinstance(block, dict) and block.get("type") == "text":
                             parts.append(block.get("text", ""))
                     result_content = "\n".join(parts)
-                result_text = truncate(str(result_content))
-                tool_results.append({
-                    "tool_use_id": item.get("tool_use_id"),
-                    "output": result_text,
-                })
-                messages.append(TraceMessage(
-                    role="tool",
-                    content_type="tool_result",
-                    content=result_text,
-                    timestamp=ts_str,
-                ))
+                trace.tool_result(
+                    {"tool_use_id": item.get("tool_use_id")},
+                    str(result_content),
+                    ts_str,
+                )
 
 
 def _parse_assistant_content(
     content: str | list | dict,
     ts_str: str,
-    messages: list[TraceMessage],
-    thinking: list[str],
-    tool_calls: list[dict],
+    trace: TraceBuilder,
 ) -> None:
     """Parse assistant message content blocks."""
     if isinstance(content, str):
         if content.strip():
-            messages.append(TraceMessage(
-                role="assistant",
-                content_type="text",
-                content=content,
-                timestamp=ts_str,
-            ))
+            trace.text("assistant", content, ts_str)
         return
 
     if isinstance(content, list):
@@ -285,39 +340,22 @@ def _parse_assistant_content(
             if item_type == "text":
                 text = item.get("text", "")
                 if text.strip():
-                    messages.append(TraceMessage(
-                        role="assistant",
-                        content_type="text",
-                        content=text,
-                        timestamp=ts_str,
-                    ))
+                    trace.text("assistant", text, ts_str)
 
             elif item_type == "thinking":
                 text = item.get("thinking", "")
                 if text.strip():
-                    thinking.append(text)
-                    messages.append(TraceMessage(
-                        role="assistant",
-                        content_type="thinking",
-                        content=text,
-                        timestamp=ts_str,
-                    ))
+                    trace.thought(text, ts_str)
 
             elif item_type == "tool_use":
                 name = item.get("name", "")
                 inp = item.get("input", {})
                 inp_str = json.dumps(inp) if isinstance(inp, dict) else str(inp)
+                clipped = trace.clip(inp_str)
                 tc = {
                     "id": item.get("id"),
                     "name": name,
-                    "input": inp,
+                    # Oversized inputs are kept as a clipped JSON string
+                    "input": inp if clipped is inp_str else clipped,
                 }
-                tool_calls.append(tc)
-                messages.append(TraceMessage(
-                    role="assistant",
-                    content_type="tool_call",
-                    content=truncate(inp_str, 500),
-                    tool_name=name,
-                    tool_input=inp_str,
-                    timestamp=ts_str,
-                ))
+                trace.tool_call(tc, name, inp_str, ts_str)
@@ -3,6 +3,9 @@ Codex CLI backend.
 
 Invokes `codex exec --json` and extracts the complete trace from
 the native session file at ~/.codex/sessions/{y}/{m}/{d}/rollout-*.jsonl.
+The file is resolved by the thread ID from the `thread.started` event,
+which is also the suffix of the rollout file name. Lookup and parsing
+happen on first access to a trace field, not during the call.
 
 Session file format (from life-long-memory/src/parsers/codex.py):
   Each line: {"timestamp": str, "type": str, "payload": {...}}
@@ -11,17 +14,27 @@ Session file format (from life-long-memory/src/parsers/codex.py):
                           function_call_output, custom_tool_call, custom_tool_call_output
 """
 
+import asyncio
 import json
-import subprocess
+import threading
 import time
+from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
-
-from src.backends import LLMResponse, TraceMessage
+from typing import Callable
+
+from src.backends import LLMResponse, SessionLoader, TraceMessage
+from src.backends.process_utils import (
+    ProcessResult,
+    classify_error,
+    run_process,
+    run_process_async,
+)
 from src.backends.session_utils import (
-    find_newest_file,
-    read_jsonl,
-    truncate,
-    wait_for_session_file,
+    TraceBuilder,
+    TraceLimits,
+    iter_jsonl,
+    locate_session_file,
 )
 
 CODEX_SESSION_DIR = Path.home() / ".codex" / "sessions"
@@ -32,107 +45,178 @@ def call_codex(
     *,
     model: str = "gpt-5.2-codex",
     full_auto: bool = False,
+    on_event: Callable[[dict], None] | None = None,
+    timeout: float | None = None,
+    cancel: threading.Event | None = None,
 ) -> LLMResponse:
-    """Send a prompt to Codex CLI and return the response with full trace."""
-    cmd = ["codex", "exec", "--json", "--model", model]
-    if full_auto:
-        cmd.extend(["--full-auto", "--skip-git-repo-check", "--ephemeral"])
-    cmd.append(prompt)
+    """Send a prompt to Codex CLI and return the response with full trace.
+
+    `on_event` is called with each stdout JSON event as it arrives.
+    """
+    cmd = _codex_cmd(model, full_auto)
 
     # Record time before execution to find new session file
     start_mtime = time.time() - 1  # 1s buffer
 
-    proc = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
+    # Parse stdout JSONL stream for immediate answer
+    stream = _CodexStream(on_event)
+    proc = run_process(
+        cmd, stdin_data=prompt, on_line=stream.feed,
+        timeout=timeout, cancel=cancel,
     )
+    if proc.killed:
+        return stream.response(proc, timeout, model, None)
 
-    # Parse stdout JSONL stream for immediate answer
-    assistant_texts: list[str] = []
-    raw_events: list[dict] = []
-    usage = None
-    error = None
+    # --- Complete trace from the session file, found on first access ---
+    return stream.response(
+        proc, timeout, model, _session_loader(stream.thread_id, start_mtime),
+    )
 
-    for line in proc.stdout:
+
+async def acall_codex(
+    prompt: str,
+    *,
+    model: str = "gpt-5.2-codex",
+    full_auto: bool = False,
+    on_event: Callable[[dict], None] | None = None,
+    timeout: float | None = None,
+    cancel: asyncio.Event | None = None,
+) -> LLMResponse:
+    """Async variant of call_codex built on asyncio subprocesses."""
+    cmd = _codex_cmd(model, full_auto)
+    start_mtime = time.time() - 1  # 1s buffer
+
+    stream = _CodexStream(on_event)
+    proc = await run_process_async(
+        cmd, stdin_data=prompt, on_line=stream.feed,
+        timeout=timeout, cancel=cancel,
+    )
+    if proc.killed:
+        return stream.response(proc, timeout, model, None)
+
+    return stream.response(
+        proc, timeout, model, _session_loader(stream.thread_id, start_mtime),
+    )
+
+
+def _codex_cmd(model: str, full_auto: bool) -> list[str]:
+    cmd = ["codex", "exec", "--json", "--model", model]
+    if full_auto:
+        cmd.extend(["--full-auto", "--skip-git-repo-check", "--ephemeral"])
+    # "-" reads the prompt from stdin: no argv size limit, and the process
+    # can be started before the prompt is known (see worker_pool).
+    cmd.append("-")
+    return cmd
+
+
+def _session_dirs(start: float) -> list[Path]:
+    """Date partitions a session started at `start` can be filed under.
+
+    Covers both local and UTC dates at start and now, so runs that cross
+    midnight (in either convention) are still found.
+    """
+    days: list[str] = []
+    for ts in (start, time.time()):
+        for tz in (None, timezone.utc):
+            day = datetime.fromtimestamp(ts, tz).strftime("%Y/%m/%d")
+            if day not in days:
+                days.append(day)
+    return [CODEX_SESSION_DIR / day for day in days]
+
+
+def _session_pattern(thread_id: str | None) -> str:
+    # Without a thread ID (older CLIs), fall back to the newest rollout.
+    return f"rollout-*{thread_id}.jsonl" if thread_id else "rollout-*.jsonl"
+
+
+def _session_loader(thread_id: str | None, start_mtime: float) -> SessionLoader:
+    """Loader that finds this call's rollout when the trace is first read."""
+    return SessionLoader(_parse_codex_session, locate=partial(
+        locate_session_file, _session_dirs(start_mtime),
+        _session_pattern(thread_id), start_mtime, timeout=5.0,
+        root=CODEX_SESSION_DIR,
+    ))
+
+
+class _CodexStream:
+    """Accumulates the `codex exec --json` stdout event stream."""
+
+    def __init__(self, on_event: Callable[[dict], None] | None = None):
+        self.on_event = on_event
+        self.assistant_texts: list[str] = []
+        self.raw_events: list[dict] = []
+        self.usage: dict | None = None
+        self.error: str | None = None
+        self.thread_id: str | None = None
+
+    def feed(self, line: str) -> None:
         line = line.strip()
         if not line:
-            continue
+            return
         try:
             event = json.loads(line)
         except json.JSONDecodeError:
-            continue
+            return
 
-        raw_events.append(event)
+        self.raw_events.append(event)
+        if self.on_event:
+            self.on_event(event)
         etype = event.get("type")
         item = event.get("item", {})
 
-        if etype == "item.completed":
+        if etype == "thread.started":
+            self.thread_id = event.get("thread_id")
+        elif etype == "item.completed":
             itype = item.get("type")
             if itype == "agent_message" and item.get("text"):
-                assistant_texts.append(item["text"])
+                self.assistant_texts.append(item["text"])
         elif etype == "turn.completed":
-            usage = event.get("usage")
+            self.usage = event.get("usage")
         elif etype in ("error", "turn.failed"):
             err = event.get("error", {})
-            error = (
+            self.error = (
                 err.get("message") if isinstance(err, dict)
                 else event.get("message", str(err))
             )
 
-    proc.wait()
-
-    stderr_out = proc.stderr.read().strip()
-    if proc.returncode != 0 and not error:
-        error = stderr_out or f"codex exited with code {proc.returncode}"
-
-    final_text = assistant_texts[-1] if assistant_texts else ""
-
-    # --- Extract complete trace from session file ---
-    thinking, tool_calls, tool_results, session_messages = [], [], [], []
-    session_file = None
-
-    sf = wait_for_session_file(
-        CODEX_SESSION_DIR, "rollout-*.jsonl", start_mtime, timeout=5.0,
-    )
-    if sf:
-        session_file = str(sf)
-        thinking, tool_calls, tool_results, session_messages = _parse_codex_session(sf)
-
-    return LLMResponse(
-        text=final_text,
-        thinking=thinking,
-        tool_calls=tool_calls,
-        tool_results=tool_results,
-        raw_events=raw_events,
-        session_messages=session_messages,
-        session_file=session_file,
-        usage=usage,
-        error=error,
-        model=model,
-        backend="codex",
-    )
+    def response(
+        self,
+        proc: ProcessResult,
+        timeout: float | None,
+        model: str,
+        loader: SessionLoader | None,
+    ) -> LLMResponse:
+        """Build the LLMResponse; the session trace is loaded on first access."""
+        error, error_kind = classify_error("codex", proc, self.error, timeout)
+        return LLMResponse(
+            text=self.assistant_texts[-1] if self.assistant_texts else "",
+            raw_events=self.raw_events,
+            session_loader=loader,
+            usage=self.usage,
+            error=error,
+            model=model,
+            backend="codex",
+            error_kind=error_kind,
+        )
 
 
 def _parse_codex_session(
     file_path: Path,
+    limits: TraceLimits | None = None,
 ) -> tuple[list[str], list[dict], list[dict], list[TraceMessage]]:
     """Parse a Codex session JSONL file for complete trace.
 
-    Adapted from life-long-memory/src/parsers/codex.py.
+    Adapted from life-long-memory/src/parsers/codex.py. Records are
+    streamed, so memory is bounded by `limits` rather than file size.
 
     Returns:
         (thinking, tool_calls, tool_results, session_messages)
     """
-    records = read_jsonl(file_path)
+    trace = TraceBuilder(limits)
 
-    thinking: list[str] = []
-    tool_calls: list[dict] = []
-    tool_results: list[dict] = []
-    messages: list[TraceMessage] = []
-
-    for rec in records:
+    for rec in iter_jsonl(file_path):
+        if not isinstance(rec, dict):
+            continue
         ts_str = rec.get("timestamp", "")
         rec_type = rec.get("type", "")
         payload = rec.get("payload", {})
@@ -153,12 +237,7 @@ def _parse_codex_session(
                         text_parts.append(part)
                 text = "\n".join(text_parts)
                 if text:
-                    messages.append(TraceMessage(
-                        role=role,
-                        content_type="text",
-                        content=text,
-                        timestamp=ts_str,
-                    ))
+                    trace.text(role, text, ts_str)
 
             elif ptype == "reasoning":
                 summary_parts = payload.get("summary", [])
@@ -168,77 +247,36 @@ def _parse_codex_session(
                         text_parts.append(part.get("text", ""))
                 text = "\n".join(text_parts)
                 if text:
-                    thinking.append(text)
-                    messages.append(TraceMessage(
-                        role="assistant",
-                        content_type="thinking",
-                        content=text,
-                        timestamp=ts_str,
-                    ))
+                    trace.thought(text, ts_str)
 
             elif ptype == "function_call":
                 name = payload.get("name", "")
-                args = payload.get("arguments", "")
+                args = trace.clip(payload.get("arguments", ""))
                 call_id = payload.get("call_id", "")
                 tc = {"name": name, "arguments": args, "call_id": call_id}
-                tool_calls.append(tc)
-                messages.append(TraceMessage(
-                    role="assistant",
-                    content_type="tool_call",
-                    content=truncate(args, 500),
-                    tool_name=name,
-                    tool_input=args,
-                    timestamp=ts_str,
-                ))
+                trace.tool_call(tc, name, args, ts_str)
 
             elif ptype == "function_call_output":
                 output = payload.get("output", "")
                 call_id = payload.get("call_id", "")
-                tr = {"call_id": call_id, "output": truncate(output)}
-                tool_results.append(tr)
-                messages.append(TraceMessage(
-                    role="tool",
-                    content_type="tool_result",
-                    content=truncate(output),
-                    timestamp=ts_str,
-                ))
+                trace.tool_result({"call_id": call_id}, output, ts_str)
 
             elif ptype == "custom_tool_call":
                 name = payload.get("name", "")
-                inp = str(payload.get("input", ""))
+                inp = trace.clip(str(payload.get("input", "")))
                 call_id = payload.get("call_id", "")
                 tc = {"name": name, "input": inp, "call_id": call_id}
-                tool_calls.append(tc)
-                messages.append(TraceMessage(
-                    role="assistant",
-                    content_type="tool_call",
-                    content=truncate(inp, 500),
-                    tool_name=name,
-                    tool_input=inp,
-                    timestamp=ts_str,
-                ))
+                trace.tool_call(tc, name, inp, ts_str)
 
             elif ptype == "custom_tool_call_output":
                 output = str(payload.get("output", ""))
-                tr = {"output": truncate(output)}
-                tool_results.append(tr)
-                messages.append(TraceMessage(
-                    role="tool",
-                    content_type="tool_result",
-                    content=truncate(output),
-                    timestamp=ts_str,
-                ))
+                trace.tool_result({}, output, ts_str)
 
         elif rec_type == "event_msg":
             payload_type = payload.get("type", "")
             if payload_type == "user_message":
                 text = payload.get("message", "")
                 if text:
-                    messages.append(TraceMessage(
-                        role="user",
-                        content_type="text",
-                        content=text,
-                        timestamp=ts_str,
-                    ))
-
-    return thinking, tool_calls, tool_results, messages
+                    trace.text("user", text, ts_str)
+
+    return trace.parts()
@@ -2,7 +2,13 @@
 Gemini CLI backend.
 
 Invokes the Gemini CLI and extracts the complete trace from the native
-session file at ~/.gemini/tmp/{projectHash}/chats/session-*.json.
+session file at ~/.gemini/tmp/{projectHash}/chats/session-*.json, where
+projectHash is the SHA-256 of the working directory. Gemini prints no
+session ID, so the newest file in that one chats directory is taken.
+If it is already there when the call ends it is pinned then (a later
+call's file would be newer); waiting for it and parsing it happen on
+first access to a trace field, unless stdout was empty and the answer
+itself has to come from the file.
 
 Session file format (from life-long-memory/src/parsers/gemini.py):
   Single JSON object:
@@ -14,17 +20,30 @@ Session file format (from life-long-memory/src/parsers/gemini.py):
     content: str                          → text output
 """
 
+import asyncio
 import hashlib
 import json
-import subprocess
+import threading
 import time
+from functools import partial
 from pathlib import Path
-
-from src.backends import LLMResponse, TraceMessage
+from typing import Callable
+
+from src.backends import LLMResponse, SessionLoader
+from src.backends.process_utils import (
+    ProcessResult,
+    classify_error,
+    run_process,
+    run_process_async,
+)
 from src.backends.session_utils import (
-    read_json,
-    truncate,
-    wait_for_session_file,
+    TraceBuilder,
+    TraceLimits,
+    alocate_session_file,
+    iter_json_array,
+    locate_session_file,
+    scan_session_dirs,
+    settle,
 )
 
 GEMINI_TMP_DIR = Path.home() / ".gemini" / "tmp"
@@ -35,101 +54,210 @@ def call_gemini(
     *,
     model: str = "gemini-2.5-pro",
     full_auto: bool = False,
+    on_event: Callable[[dict], None] | None = None,
+    timeout: float | None = None,
+    cancel: threading.Event | None = None,
+) -> LLMResponse:
+    """Send a prompt to Gemini CLI and return the response with full trace.
+
+    Gemini prints plain text, so `on_event` receives
+    {"type": "text", "text": line} for each stdout line as it arrives.
+    """
+    cmd = _gemini_cmd(model, full_auto)
+
+    # Record time before execution to find new session file
+    start_mtime = time.time() - 1  # 1s buffer
+
+    # Send prompt via stdin; stdout is plain text
+    stdout_lines = _GeminiStream(on_event)
+    proc = run_process(
+        cmd, stdin_data=prompt, on_line=stdout_lines.feed,
+        timeout=timeout, cancel=cancel,
+    )
+    if proc.killed:
+        return _gemini_response(stdout_lines.text(), proc, timeout, model)
+
+    # --- Complete trace from the session file, found on first access ---
+    locate = _session_locator(start_mtime)
+    if stdout_lines.text().strip():
+        return _gemini_response(
+            stdout_lines.text(), proc, timeout, model,
+            loader=SessionLoader(_gemini_trace, locate=locate),
+        )
+    # The answer itself lives in the session file: needed now
+    sf = locate()
+    return _gemini_response(
+        stdout_lines.text(), proc, timeout, model,
+        session_file=sf, parsed=_parse_gemini_session(sf) if sf else None,
+    )
+
+
+async def acall_gemini(
+    prompt: str,
+    *,
+    model: str = "gemini-2.5-pro",
+    full_auto: bool = False,
+    on_event: Callable[[dict], None] | None = None,
+    timeout: float | None = None,
+    cancel: asyncio.Event | None = None,
 ) -> LLMResponse:
-    """Send a prompt to Gemini CLI and return the response with full trace."""
+    """Async variant of call_gemini built on asyncio subprocesses."""
+    cmd = _gemini_cmd(model, full_auto)
+    start_mtime = time.time() - 1  # 1s buffer
+
+    stdout_lines = _GeminiStream(on_event)
+    proc = await run_process_async(
+        cmd, stdin_data=prompt, on_line=stdout_lines.feed,
+        timeout=timeout, cancel=cancel,
+    )
+    if proc.killed:
+        return _gemini_response(stdout_lines.text(), proc, timeout, model)
+
+    if stdout_lines.text().strip():
+        return _gemini_response(
+            stdout_lines.text(), proc, timeout, model,
+            loader=SessionLoader(_gemini_trace, locate=_session_locator(start_mtime)),
+        )
+    # The answer itself lives in the session file: find and parse it now
+    sf = await alocate_session_file(
+        [_chats_dir()], "session-*.json", start_mtime, timeout=5.0,
+        root=GEMINI_TMP_DIR,
+    )
+    parsed = await asyncio.to_thread(_parse_gemini_session, sf) if sf else None
+    return _gemini_response(
+        stdout_lines.text(), proc, timeout, model,
+        session_file=sf, parsed=parsed,
+    )
+
+
+def _gemini_cmd(model: str, full_auto: bool) -> list[str]:
     cmd = ["gemini"]
     if model:
         cmd.extend(["--model", model])
     if full_auto:
         cmd.append("--sandbox")
+    return cmd
 
-    # Record time before execution to find new session file
-    start_mtime = time.time() - 1  # 1s buffer
 
-    proc = subprocess.Popen(
-        cmd,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
+def _chats_dir() -> Path:
+    """Directory Gemini CLI writes chats to for the current cwd."""
+    project_hash = hashlib.sha256(str(Path.cwd()).encode()).hexdigest()
+    return GEMINI_TMP_DIR / project_hash / "chats"
+
+
+def _session_locator(start_mtime: float) -> Callable[[], Path | None]:
+    """Finds this call's chat file; pinned now if it has been written.
+
+    Chat files carry no call ID, so a lookup deferred past a later call
+    could take that call's newer file. Only the wait for a file that is
+    not there yet (and its settle time) is left for later.
+    """
+    chats = _chats_dir()
+    pinned = scan_session_dirs([chats], "session-*.json", start_mtime)
+    if pinned is not None:
+        return partial(settle, pinned)
+    return partial(
+        locate_session_file, [chats], "session-*.json", start_mtime,
+        timeout=5.0, root=GEMINI_TMP_DIR,
     )
 
-    # Send prompt via stdin
-    proc.stdin.write(prompt)
-    proc.stdin.close()
 
-    stdout_text = proc.stdout.read()
-    proc.wait()
+class _GeminiStream:
+    """Collects Gemini's plain-text stdout line by line."""
 
-    stderr_out = proc.stderr.read().strip()
-    error = None
-    if proc.returncode != 0:
-        error = stderr_out or f"gemini exited with code {proc.returncode}"
+    def __init__(self, on_event: Callable[[dict], None] | None = None):
+        self.on_event = on_event
+        self.lines: list[str] = []
 
-    final_text = stdout_text.strip()
+    def feed(self, line: str) -> None:
+        self.lines.append(line)
+        if self.on_event:
+            self.on_event({"type": "text", "text": line})
 
-    # --- Extract complete trace from session file ---
-    thinking, tool_calls, tool_results, session_messages = [], [], [], []
-    session_file = None
-    usage = None
-    detected_model = None
+    def text(self) -> str:
+        return "".join(self.lines)
 
-    sf = wait_for_session_file(
-        GEMINI_TMP_DIR, "session-*.json", start_mtime, timeout=5.0,
-    )
-    if sf:
-        session_file = str(sf)
-        result = _parse_gemini_session(sf)
-        thinking = result["thinking"]
-        tool_calls = result["tool_calls"]
-        tool_results = result["tool_results"]
-        session_messages = result["messages"]
-        usage = result["usage"]
-        detected_model = result["model"]
-        # Use session file content as final text if stdout was empty
-        if not final_text and result["final_text"]:
-            final_text = result["final_text"]
+
+def _gemini_response(
+    stdout_text: str,
+    proc: ProcessResult,
+    timeout: float | None,
+    model: str,
+    *,
+    loader: SessionLoader | None = None,
+    session_file: Path | None = None,
+    parsed: dict | None = None,
+) -> LLMResponse:
+    """Build the LLMResponse once the process is done.
+
+    The session trace comes from `loader` on first access, or from
+    `parsed` when stdout was empty and the file was parsed for the answer.
+    """
+    error, error_kind = classify_error("gemini", proc, None, timeout)
+
+    final_text = stdout_text.strip()
+    if parsed is None:
+        return LLMResponse(
+            text=final_text,
+            raw_events=[],  # Gemini doesn't stream JSONL events
+            session_loader=loader,
+            error=error,
+            model=model,
+            backend="gemini",
+            error_kind=error_kind,
+        )
+
+    # Use session file content as final text if stdout was empty
+    if not final_text and parsed["final_text"]:
+        final_text = parsed["final_text"]
 
     return LLMResponse(
         text=final_text,
-        thinking=thinking,
-        tool_calls=tool_calls,
-        tool_results=tool_results,
+        thinking=parsed["thinking"],
+        tool_calls=parsed["tool_calls"],
+        tool_results=parsed["tool_results"],
         raw_events=[],  # Gemini doesn't stream JSONL events
-        session_messages=session_messages,
-        session_file=session_file,
-        usage=usage,
+        session_messages=parsed["messages"],
+        session_file=str(session_file) if session_file else None,
+        usage=parsed["usage"],
         error=error,
-        model=detected_model or model,
+        model=parsed["model"] or model,
         backend="gemini",
+        error_kind=error_kind,
     )
 
 
-def _parse_gemini_session(file_path: Path) -> dict:
+def _gemini_trace(file_path: Path) -> dict:
+    """SessionLoader adapter: the lazily-loaded fields of a Gemini session."""
+    parsed = _parse_gemini_session(file_path)
+    return {
+        "thinking": parsed["thinking"],
+        "tool_calls": parsed["tool_calls"],
+        "tool_results": parsed["tool_results"],
+        "session_messages": parsed["messages"],
+        "usage": parsed["usage"],
+    }
+
+
+def _parse_gemini_session(
+    file_path: Path,
+    limits: TraceLimits | None = None,
+) -> dict:
     """Parse a Gemini session JSON file for complete trace.
 
-    Adapted from life-long-memory/src/parsers/gemini.py.
+    Adapted from life-long-memory/src/parsers/gemini.py. The messages
+    array is streamed item by item, so memory is bounded by `limits`
+    rather than file size.
 
     Returns dict with: thinking, tool_calls, tool_results, messages,
                        usage, model, final_text
     """
-    data = read_json(file_path)
-    if not data:
-        return _empty_result()
-
-    raw_messages = data.get("messages", [])
-    if not raw_messages:
-        return _empty_result()
-
-    thinking: list[str] = []
-    tool_calls: list[dict] = []
-    tool_results: list[dict] = []
-    messages: list[TraceMessage] = []
+    trace = TraceBuilder(limits)
     total_tokens = 0
     model = None
     final_text = ""
 
-    for msg in raw_messages:
+    for msg in iter_json_array(file_path, "messages"):
         if not isinstance(msg, dict):
             continue
 
@@ -139,12 +267,7 @@ def _parse_gemini_session(file_path: Path) -> dict:
         if msg_type == "user":
             text = _extract_user_text(msg)
             if text:
-                messages.append(TraceMessage(
-                    role="user",
-                    content_type="text",
-                    content=text,
-                    timestamp=ts_str,
-                ))
+                trace.text("user", text, ts_str)
 
         elif msg_type == "gemini":
             if not model:
@@ -161,13 +284,7 @@ def _parse_gemini_session(file_path: Path) -> dict:
                 subject = thought.get("subject", "")
                 thought_text = f"{subject}: {desc}" if subject else desc
                 if thought_text:
-                    thinking.append(thought_text)
-                    messages.append(TraceMessage(
-                        role="assistant",
-                        content_type="thinking",
-                        content=thought_text,
-                        timestamp=ts_str,
-                    ))
+                    trace.thought(thought_text, ts_str)
 
             # Tool calls
             for tc in msg.get("toolCalls", []):
@@ -177,46 +294,25 @@ def _parse_gemini_session(file_path: Path) -> dict:
                 status = tc.get("status", "")
                 if tool_name:
                     args_str = json.dumps(args) if isinstance(args, dict) else str(args)
-                    tool_calls.append({
+                    clipped = trace.clip(args_str)
+                    trace.tool_call({
                         "name": tool_name,
-                        "args": args,
+                        "args": args if clipped is args_str else clipped,
                         "status": status,
-                    })
-                    messages.append(TraceMessage(
-                        role="assistant",
-                        content_type="tool_call",
-                        content=truncate(args_str, 500),
-                        tool_name=tool_name,
-                        tool_input=args_str,
-                        timestamp=ts_str,
-                    ))
+                    }, tool_name, args_str, ts_str)
 
                     # Tool result
                     result_text = (
                         json.dumps(result) if not isinstance(result, str)
                         else result
                     )
-                    tool_results.append({
-                        "name": tool_name,
-                        "output": truncate(result_text),
-                    })
-                    messages.append(TraceMessage(
-                        role="tool",
-                        content_type="tool_result",
-                        content=truncate(result_text),
-                        timestamp=ts_str,
-                    ))
+                    trace.tool_result({"name": tool_name}, result_text, ts_str)
 
             # Main text content
             content = msg.get("content", "")
             if isinstance(content, str) and content.strip():
                 final_text = content  # Last gemini message is the final answer
-                messages.append(TraceMessage(
-                    role="assistant",
-                    content_type="text",
-                    content=content,
-                    timestamp=ts_str,
-                ))
+                trace.text("assistant", content, ts_str)
 
         elif msg_type == "info":
             content = msg.get("content", "")
@@ -229,14 +325,10 @@ def _parse_gemini_session(file_path: Path) -> dict:
                     if isinstance(item, dict)
                 )
             if text.strip():
-                messages.append(TraceMessage(
-                    role="system",
-                    content_type="text",
-                    content=text,
-                    timestamp=ts_str,
-                ))
+                trace.text("system", text, ts_str)
 
     usage_dict = {"total_tokens": total_tokens} if total_tokens else None
+    thinking, tool_calls, tool_results, messages = trace.parts()
 
     return {
         "thinking": thinking,
@@ -266,14 +358,3 @@ def _extract_user_text(msg: dict) -> str:
         return "\n".join(parts)
     return ""
 
-
-def _empty_result() -> dict:
-    return {
-        "thinking": [],
-        "tool_calls": [],
-        "tool_results": [],
-        "messages": [],
-        "usage": None,
-        "model": None,
-        "final_text": "",
-    }
@@ -0,0 +1,315 @@
+"""
+Mock backend for offline testing and load testing.
+
+Backend.MOCK answers in-process, without starting a CLI, so the whole
+executor, tracing and coordinator stack can run at thousands of calls
+per second. Latency, failures and the shape of the session trace are
+drawn from a per-model MockProfile:
+
+    from src.backends.mock import MOCK, Latency
+
+    MOCK.configure(latency=Latency.lognormal(median=20, sigma=0.6),
+                   error_rate=0.02, time_scale=0.001, seed=7)
+    MOCK.configure("replayed", replay="traces/run.json")
+
+Draws are deterministic: the n-th call with a given prompt and model
+gets the same latency, outcome and text in every run with the same
+seed. Replay profiles serve the outputs, traces and recorded latencies
+of steps in saved traces (src.tracing.save_trace) instead.
+"""
+
+import asyncio
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from src.backends import ErrorKind, LLMResponse, TraceMessage
+from src.backends.session_utils import TraceBuilder
+from src.tracing import expand_trace, load_trace
+
+_FILLER = (
+    "The mock backend returns this filler text so that downstream "
+    "context building, caching and tracing see realistic payloads. "
+)
+
+
+@dataclass
+class Latency:
+    """A distribution of simulated call latency in seconds.
+
+    Build one with the constructors below rather than directly.
+    """
+
+    kind: str = "constant"
+    a: float = 0.0
+    b: float = 0.0
+    samples: list[float] = field(default_factory=list)
+
+    @classmethod
+    def constant(cls, seconds: float) -> "Latency":
+        return cls("constant", seconds)
+
+    @classmethod
+    def uniform(cls, low: float, high: float) -> "Latency":
+        return cls("uniform", low, high)
+
+    @classmethod
+    def lognormal(cls, median: float, sigma: float) -> "Latency":
+        """Long-tailed: most calls near `median`, a few much slower."""
+        return cls("lognormal", median, sigma)
+
+    @classmethod
+    def exponential(cls, mean: float) -> "Latency":
+        return cls("exponential", mean)
+
+    @classmethod
+    def empirical(cls, samples: list[float]) -> "Latency":
+        """Resample observed latencies, e.g. elapsed_seconds from traces."""
+        if not samples:
+            raise ValueError("empirical latency needs at least one sample")
+        return cls("empirical", samples=list(samples))
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "constant":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.a), self.b)
+        if self.kind == "exponential":
+            return rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+        if self.kind == "empirical":
+            return rng.choice(self.samples)
+        raise ValueError(f"Unknown latency distribution: {self.kind!r}")
+
+
+@dataclass
+class MockProfile:
+    """How the mock backend behaves for one model.
+
+    Args:
+        latency: Simulated call duration (None = the recorded duration
+                 when replaying, else instant).
+        time_scale: Multiplier applied to every latency, e.g. 0.001 to
+                    replay minute-long calls in milliseconds.
+        error_rate: Probability that a call fails with ErrorKind.API.
+        thinking: Thinking blocks per generated trace.
+        tool_calls: Tool call/result pairs per generated trace.
+        output_chars: Length of generated answers.
+        seed: Seed mixed into every draw.
+        steps: Recorded trace steps to replay instead of generating.
+    """
+
+    latency: Latency | None = None
+    time_scale: float = 1.0
+    error_rate: float = 0.0
+    thinking: int = 1
+    tool_calls: int = 0
+    output_chars: int = 200
+    seed: int = 0
+    steps: list[dict] = field(default_factory=list, repr=False)
+
+
+class MockBackend:
+    """Per-model mock profiles plus the call counters that seed draws."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: dict[str | None, MockProfile] = {}
+        self._seen: dict[tuple[str, str], int] = {}
+
+    def configure(
+        self,
+        model: str | None = None,
+        *,
+        replay: str | Path | dict | list[str | Path | dict] | None = None,
+        **settings,
+    ) -> MockProfile:
+        """Set the profile for `model` (None = default for all models).
+
+        `settings` are MockProfile fields. `replay` names saved traces
+        (paths or trace dicts) whose steps are served in place of
+        generated responses.
+        """
+        profile = MockProfile(**settings)
+        if replay is not None:
+            profile.steps = _load_steps(replay)
+        with self._lock:
+            self._profiles[model] = profile
+        return profile
+
+    def profile(self, model: str) -> MockProfile:
+        with self._lock:
+            return self._profiles.get(model) or self._profiles.get(None) or MockProfile()
+
+    def clear(self) -> None:
+        """Drop all profiles and restart the per-prompt call counters."""
+        with self._lock:
+            self._profiles.clear()
+            self._seen.clear()
+
+    def draw(self, prompt: str, model: str) -> tuple[float, LLMResponse]:
+        """(simulated seconds, response) for the next call with `prompt`."""
+        profile = self.profile(model)
+        with self._lock:
+            n = self._seen.get((prompt, model), 0)
+            self._seen[(prompt, model)] = n + 1
+        rng = random.Random(f"{profile.seed}:{model}:{n}:{prompt}")
+
+        step = rng.choice(profile.steps) if profile.steps else None
+        if profile.latency is not None:
+            seconds = profile.latency.sample(rng)
+        else:
+            seconds = step.get("elapsed_seconds", 0.0) if step else 0.0
+        seconds = max(0.0, seconds * profile.time_scale)
+
+        if rng.random() < profile.error_rate:
+            resp = LLMResponse(
+                text="", error="mock: simulated API error", model=model,
+                backend="mock", error_kind=ErrorKind.API,
+            )
+        elif step is not None:
+            resp = _replayed(step, model)
+        else:
+            resp = _generated(prompt, model, profile, rng)
+        return seconds, resp
+
+
+MOCK = MockBackend()
+
+
+def call_mock(
+    prompt: str,
+    *,
+    model: str = "mock",
+    full_auto: bool = False,
+    timeout: float | None = None,
+    cancel: threading.Event | None = None,
+) -> LLMResponse:
+    """Answer `prompt` from the mock profile for `model`.
+
+    Sleeps for the drawn latency, honouring `timeout` and `cancel` the
+    way the CLI backends do.
+    """
+    seconds, resp = MOCK.draw(prompt, model)
+    wait = seconds if timeout is None else min(seconds, max(timeout, 0))
+    if cancel is not None and cancel.is_set():
+        return _killed(ErrorKind.CANCELLED, model, timeout)
+    if wait > 0:
+        if cancel is not None:
+            if cancel.wait(wait):
+                return _killed(ErrorKind.CANCELLED, model, timeout)
+        else:
+            time.sleep(wait)
+    if wait < seconds:
+        return _killed(ErrorKind.TIMEOUT, model, timeout)
+    return resp
+
+
+async def acall_mock(
+    prompt: str,
+    *,
+    model: str = "mock",
+    full_auto: bool = False,
+    timeout: float | None = None,
+    cancel: asyncio.Event | None = None,
+) -> LLMResponse:
+    """Async variant of call_mock."""
+    seconds, resp = MOCK.draw(prompt, model)
+    wait = seconds if timeout is None else min(seconds, max(timeout, 0))
+    if cancel is not None and cancel.is_set():
+        return _killed(ErrorKind.CANCELLED, model, timeout)
+    if wait > 0:
+        if cancel is not None:
+            try:
+                await asyncio.wait_for(cancel.wait(), wait)
+                return _killed(ErrorKind.CANCELLED, model, timeout)
+            except TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(wait)
+    if wait < seconds:
+        return _killed(ErrorKind.TIMEOUT, model, timeout)
+    return resp
+
+
+def _generated(
+    prompt: str, model: str, profile: MockProfile, rng: random.Random,
+) -> LLMResponse:
+    token = f"{rng.getrandbits(32):08x}"
+    head = f"[mock {model} {token}] "
+    filler = _FILLER * (profile.output_chars // len(_FILLER) + 1)
+    text = (head + filler)[:max(profile.output_chars, len(head))]
+
+    trace = TraceBuilder()
+    trace.text("user", prompt)
+    for i in range(profile.thinking):
+        trace.thought(f"mock reasoning {i + 1} ({token})")
+    for i in range(profile.tool_calls):
+        call_id = f"call_{token}_{i}"
+        command = f"echo step {i + 1}"
+        trace.tool_call(
+            {"name": "shell", "arguments": command, "call_id": call_id},
+            "shell", command,
+        )
+        trace.tool_result({"call_id": call_id}, f"step {i + 1}")
+    trace.text("assistant", text)
+    thinking, tool_calls, tool_results, messages = trace.parts()
+    return LLMResponse(
+        text=text,
+        thinking=thinking,
+        tool_calls=tool_calls,
+        tool_results=tool_results,
+        session_messages=messages,
+        usage={
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(text) // 4,
+        },
+        model=model,
+        backend="mock",
+    )
+
+
+def _replayed(step: dict, model: str) -> LLMResponse:
+    return LLMResponse(
+        text=step.get("output", ""),
+        thinking=list(step.get("thinking") or []),
+        tool_calls=list(step.get("tool_calls") or []),
+        tool_results=list(step.get("tool_results") or []),
+        session_messages=[
+            TraceMessage.from_dict(m) for m in step.get("session_messages") or []
+        ],
+        usage=step.get("usage"),
+        model=model,
+        backend="mock",
+    )
+
+
+def _killed(kind: ErrorKind, model: str, timeout: float | None) -> LLMResponse:
+    if kind == ErrorKind.TIMEOUT:
+        error = f"mock timed out after {max(timeout or 0, 0):g}s"
+    else:
+        error = "mock call cancelled"
+    return LLMResponse(
+        text="", error=error, model=model, backend="mock", error_kind=kind,
+    )
+
+
+def _load_steps(replay) -> list[dict]:
+    """Successful steps from saved traces (paths or trace dicts)."""
+    sources = replay if isinstance(replay, list) else [replay]
+    steps: list[dict] = []
+    for source in sources:
+        if isinstance(source, dict):
+            source = expand_trace(source)
+        else:
+            source = load_trace(source)
+        steps.extend(
+            s for s in source.get("steps", []) if not s.get("error")
+        )
+    if not steps:
+        raise ValueError("replay traces contain no successful steps")
+    return steps
@@ -0,0 +1,361 @@
+"""
+Shared helpers for running backend CLI subprocesses.
+
+Both runners stream stdout line by line to a callback while draining
+stderr concurrently into a bounded tail buffer, so a CLI that is chatty
+on stderr can never block on a full pipe, and neither stream is held in
+memory beyond what the backend chooses to keep. A stdout line longer
+than STREAM_LIMIT kills the CLI and fails the call with ErrorKind.EXIT
+rather than being buffered whole. The async runner lets a
+single event loop drive many in-flight CLI calls without dedicating an
+OS thread to each one.
+
+Each CLI is started in its own session (process group). On timeout or
+cancellation the whole group is terminated, so helper processes the CLI
+spawned (MCP servers, shells, node workers) die with it.
+
+When a WarmPool is installed (src.backends.worker_pool), the sync runner
+takes an already-started CLI from it instead of spawning one.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+from src.backends import ErrorKind
+
+# Max bytes (characters, for the sync runner) buffered for a single
+# stdout line; large tool outputs are emitted as one JSON event.
+STREAM_LIMIT = 16 * 1024 * 1024
+
+# Only the tail of stderr is kept for error messages.
+STDERR_TAIL_BYTES = 64 * 1024
+
+# Seconds between SIGTERM and SIGKILL when killing a process group.
+KILL_GRACE_SECONDS = 2.0
+
+# How often the sync watchdog checks the deadline and cancel event.
+WATCHDOG_INTERVAL = 0.05
+
+# Pool of pre-started CLI processes used by run_process (None = cold start).
+_warm_pool = None
+
+
+def set_warm_pool(pool) -> None:
+    """Install (or with None, remove) the WarmPool run_process draws from."""
+    global _warm_pool
+    _warm_pool = pool
+
+
+def spawn_cli(cmd: list[str], *, stdin: bool) -> subprocess.Popen:
+    """Start `cmd` in its own process group with piped stdout/stderr."""
+    return subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if stdin else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        start_new_session=True,
+    )
+
+
+@dataclass
+class ProcessResult:
+    """Outcome of a CLI subprocess run."""
+
+    returncode: int
+    stderr: str
+    timed_out: bool = False
+    cancelled: bool = False
+    # Killed for a stdout line longer than STREAM_LIMIT
+    overflowed: bool = False
+
+    @property
+    def killed(self) -> bool:
+        return self.timed_out or self.cancelled or self.overflowed
+
+
+class TailBuffer:
+    """Keeps roughly the last `max_bytes` characters appended to it."""
+
+    def __init__(self, max_bytes: int = STDERR_TAIL_BYTES):
+        self.max_bytes = max_bytes
+        self._chunks: deque[str] = deque()
+        self._size = 0
+
+    def append(self, chunk: str) -> None:
+        self._chunks.append(chunk)
+        self._size += len(chunk)
+        while self._size > self.max_bytes and len(self._chunks) > 1:
+            self._size -= len(self._chunks.popleft())
+
+    def text(self) -> str:
+        joined = "".join(self._chunks)
+        return joined[-self.max_bytes:]
+
+
+def run_process(
+    cmd: list[str],
+    *,
+    stdin_data: str | None = None,
+    on_line: Callable[[str], None],
+    timeout: float | None = None,
+    cancel: threading.Event | None = None,
+) -> ProcessResult:
+    """Run `cmd`, feeding each stdout line to `on_line` as it arrives.
+
+    stdin is written and stderr drained on helper threads, so a large
+    prompt or a verbose CLI cannot deadlock against the stdout reader.
+    A watchdog kills the process group once `timeout` seconds pass or
+    `cancel` is set; the call is not started at all if either has
+    already happened.
+    """
+    if timeout is not None and timeout <= 0:
+        return ProcessResult(-1, "", timed_out=True)
+    if cancel is not None and cancel.is_set():
+        return ProcessResult(-1, "", cancelled=True)
+
+    pool = _warm_pool
+    if pool is not None and stdin_data is not None:
+        proc = pool.acquire(cmd)
+    else:
+        proc = spawn_cli(cmd, stdin=stdin_data is not None)
+
+    stderr_tail = TailBuffer()
+    outcome = ProcessResult(0, "")
+    finished = threading.Event()
+    helpers = [threading.Thread(
+        target=_drain, args=(proc.stderr, stderr_tail.append), daemon=True,
+    )]
+    if stdin_data is not None:
+        helpers.append(threading.Thread(
+            target=_write_stdin, args=(proc.stdin, stdin_data), daemon=True,
+        ))
+    watchdog = None
+    if timeout is not None or cancel is not None:
+        watchdog = threading.Thread(
+            target=_watchdog,
+            args=(proc, timeout, cancel, finished, outcome),
+            daemon=True,
+        )
+        helpers.append(watchdog)
+    for t in helpers:
+        t.start()
+
+    limit = STREAM_LIMIT
+    try:
+        while line := proc.stdout.readline(limit + 1):
+            if len(line) > limit and not line.endswith("\n"):
+                outcome.overflowed = True
+                kill_process_group(proc)
+                break
+            on_line(line)
+        returncode = proc.wait()
+    except BaseException:
+        kill_process_group(proc)
+        raise
+    finally:
+        finished.set()
+        for t in helpers:
+            t.join()
+        proc.stdout.close()
+
+    outcome.returncode = returncode
+    outcome.stderr = stderr_tail.text().strip()
+    return outcome
+
+
+async def run_process_async(
+    cmd: list[str],
+    *,
+    stdin_data: str | None = None,
+    on_line: Callable[[str], None],
+    timeout: float | None = None,
+    cancel: asyncio.Event | None = None,
+) -> ProcessResult:
+    """Async counterpart of run_process.
+
+    Cancelling the awaiting task also kills the process group.
+    """
+    if timeout is not None and timeout <= 0:
+        return ProcessResult(-1, "", timed_out=True)
+    if cancel is not None and cancel.is_set():
+        return ProcessResult(-1, "", cancelled=True)
+
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if stdin_data is not None else None,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=STREAM_LIMIT,
+        start_new_session=True,
+    )
+
+    stderr_tail = TailBuffer()
+    outcome = ProcessResult(0, "")
+
+    async def communicate() -> None:
+        helpers = [asyncio.create_task(_adrain(proc.stderr, stderr_tail.append))]
+        if stdin_data is not None:
+            helpers.append(
+                asyncio.create_task(_awrite_stdin(proc.stdin, stdin_data)),
+            )
+        try:
+            try:
+                async for raw in proc.stdout:
+                    on_line(raw.decode(errors="replace"))
+            except ValueError:  # line longer than STREAM_LIMIT
+                outcome.overflowed = True
+                await asyncio.to_thread(kill_process_group, proc)
+                return
+            await asyncio.gather(*helpers)
+        finally:
+            for t in helpers:
+                t.cancel()
+
+    io_task = asyncio.create_task(communicate())
+    waiters = {io_task}
+    cancel_task = None
+    if cancel is not None:
+        cancel_task = asyncio.create_task(cancel.wait())
+        waiters.add(cancel_task)
+
+    try:
+        done, _ = await asyncio.wait(
+            waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED,
+        )
+        if io_task not in done:
+            outcome.cancelled = cancel_task in done
+            outcome.timed_out = not outcome.cancelled
+            await asyncio.to_thread(kill_process_group, proc)
+            io_task.cancel()
+        else:
+            io_task.result()
+        outcome.returncode = await proc.wait()
+    except BaseException:
+        io_task.cancel()
+        if proc.returncode is None:
+            await asyncio.to_thread(kill_process_group, proc)
+        raise
+    finally:
+        if cancel_task:
+            cancel_task.cancel()
+
+    outcome.stderr = stderr_tail.text().strip()
+    return outcome
+
+
+def classify_error(
+    cli: str,
+    result: ProcessResult,
+    reported: str | None,
+    timeout: float | None,
+) -> tuple[str | None, ErrorKind | None]:
+    """Return (error message, ErrorKind) for a finished CLI run."""
+    if result.timed_out:
+        return f"{cli} timed out after {max(timeout or 0, 0):g}s", ErrorKind.TIMEOUT
+    if result.cancelled:
+        return f"{cli} call cancelled", ErrorKind.CANCELLED
+    if result.overflowed:
+        return (
+            f"{cli} wrote a stdout line over {STREAM_LIMIT} bytes and was killed",
+            ErrorKind.EXIT,
+        )
+    if reported:
+        return reported, ErrorKind.API
+    if result.returncode != 0:
+        return (
+            result.stderr or f"{cli} exited with code {result.returncode}",
+            ErrorKind.EXIT,
+        )
+    return None, None
+
+
+def kill_process_group(proc) -> None:
+    """SIGTERM the process's group, then SIGKILL after a grace period.
+
+    Works for both subprocess.Popen and asyncio subprocesses (only
+    `pid`, `returncode`/`poll` are used).
+    """
+    if _exited(proc):
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return
+    deadline = time.time() + KILL_GRACE_SECONDS
+    while time.time() < deadline:
+        if _exited(proc):
+            return
+        time.sleep(WATCHDOG_INTERVAL)
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _exited(proc) -> bool:
+    if isinstance(proc, subprocess.Popen):
+        return proc.poll() is not None
+    return proc.returncode is not None
+
+
+def _watchdog(
+    proc: subprocess.Popen,
+    timeout: float | None,
+    cancel: threading.Event | None,
+    finished: threading.Event,
+    outcome: ProcessResult,
+) -> None:
+    deadline = time.time() + timeout if timeout is not None else None
+    while not finished.wait(WATCHDOG_INTERVAL):
+        if cancel is not None and cancel.is_set():
+            outcome.cancelled = True
+        elif deadline is not None and time.time() >= deadline:
+            outcome.timed_out = True
+        else:
+            continue
+        kill_process_group(proc)
+        return
+
+
+def _drain(stream, sink: Callable[[str], None]) -> None:
+    try:
+        for chunk in iter(lambda: stream.read(8192), ""):
+            sink(chunk)
+    finally:
+        stream.close()
+
+
+def _write_stdin(stream, data: str) -> None:
+    try:
+        stream.write(data)
+    except (BrokenPipeError, OSError):
+        pass  # CLI exited early; its exit code reports the problem
+    finally:
+        try:
+            stream.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+
+async def _adrain(stream: asyncio.StreamReader, sink: Callable[[str], None]) -> None:
+    while chunk := await stream.read(8192):
+        sink(chunk.decode(errors="replace"))
+
+
+async def _awrite_stdin(stream: asyncio.StreamWriter, data: str) -> None:
+    try:
+        stream.write(data.encode())
+        await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        stream.close()
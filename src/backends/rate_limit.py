@@ -0,0 +1,243 @@
+"""
+Process-wide request and token rate limits per backend and model.
+
+Limits are token buckets shared by every caller of src.backends.call /
+acall in the process, whichever executor they run in. A call reserves
+one request and its estimated prompt tokens up front and, if a bucket
+is in debt, waits until its turn instead of failing: a burst of parallel
+items is spread out at the configured rate, in arrival order. Once the
+response is in, the token reservation is corrected with the usage the
+CLI reported.
+
+Usage:
+    from src.backends.rate_limit import RATE_LIMITS
+
+    RATE_LIMITS.configure("codex", rpm=60, tpm=200_000)
+    RATE_LIMITS.configure("claude_code", "claude-opus-4-1", rpm=20)
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+
+from src.backends import (
+    Backend,
+    ErrorKind,
+    LLMResponse,
+    backend_name,
+    session_fields,
+)
+
+# Rough prompt size estimate used for the up-front token reservation.
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class RateLimit:
+    """Requests- and tokens-per-minute for one backend (or backend/model).
+
+    `burst_seconds` sets bucket capacity: how many seconds' worth of
+    budget may be spent at once after an idle period.
+    """
+
+    rpm: float | None = None
+    tpm: float | None = None
+    burst_seconds: float = 1.0
+
+
+class TokenBucket:
+    """Reservation-based token bucket (may go into debt).
+
+    reserve() always succeeds and returns how long the caller must wait
+    for the bucket to cover the reservation, so callers are served in
+    reservation order at exactly the refill rate.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 1.0):
+        if per_minute <= 0:
+            raise ValueError(f"rate must be positive, got {per_minute}")
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` now; return seconds until the bucket covers it."""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) after the fact."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._last) * self.rate,
+        )
+        self._last = now
+
+
+@dataclass
+class Ticket:
+    """A call's place in the rate-limit queue."""
+
+    delay: float = 0.0
+    tokens: int = 0
+    _charges: list[tuple[TokenBucket, float]] = field(default_factory=list)
+    _token_buckets: list[TokenBucket] = field(default_factory=list)
+
+    def refund(self) -> None:
+        """Give back everything reserved (the call never ran)."""
+        for bucket, amount in self._charges:
+            bucket.adjust(-amount)
+        self._charges.clear()
+
+    def settle(self, resp: LLMResponse) -> None:
+        """Correct the token reservation with the reported usage."""
+        # Only usage already known; never force a lazy session parse
+        used = _usage_tokens(session_fields(resp).get("usage"))
+        if used is None:
+            return
+        for bucket in self._token_buckets:
+            bucket.adjust(used - self.tokens)
+
+
+class RateLimiter:
+    """Registry of buckets keyed on (backend, model); model None = all."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: dict[tuple[str, str | None], tuple] = {}
+
+    def configure(
+        self,
+        backend: Backend | str,
+        model: str | None = None,
+        *,
+        rpm: float | None = None,
+        tpm: float | None = None,
+        burst_seconds: float = 1.0,
+    ) -> None:
+        """Set (or with rpm=tpm=None, remove) a limit.
+
+        A backend-wide limit (model=None) and a model limit both apply
+        to calls for that model.
+        """
+        key = (backend_name(backend), model)
+        limit = RateLimit(rpm, tpm, burst_seconds)
+        with self._lock:
+            if rpm is None and tpm is None:
+                self._buckets.pop(key, None)
+                return
+            self._buckets[key] = (
+                limit,
+                TokenBucket(rpm, burst_seconds) if rpm else None,
+                TokenBucket(tpm, burst_seconds) if tpm else None,
+            )
+
+    def limits(self) -> dict[tuple[str, str | None], RateLimit]:
+        with self._lock:
+            return {key: entry[0] for key, entry in self._buckets.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def reserve(self, backend: str, model: str, prompt: str) -> Ticket:
+        """Reserve one request and the prompt's tokens; compute the wait."""
+        ticket = Ticket()
+        if not self._buckets:
+            return ticket
+        with self._lock:
+            entries = [
+                self._buckets[key]
+                for key in ((backend, None), (backend, model))
+                if key in self._buckets
+            ]
+        ticket.tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+        for _, requests, tokens in entries:
+            if requests:
+                ticket.delay = max(ticket.delay, requests.reserve(1))
+                ticket._charges.append((requests, 1))
+            if tokens:
+                ticket.delay = max(ticket.delay, tokens.reserve(ticket.tokens))
+                ticket._charges.append((tokens, ticket.tokens))
+                ticket._token_buckets.append(tokens)
+        return ticket
+
+    def wait(
+        self,
+        ticket: Ticket,
+        *,
+        timeout: float | None = None,
+        cancel: threading.Event | None = None,
+    ) -> ErrorKind | None:
+        """Sleep out the ticket's delay.
+
+        Returns None when the call may proceed, or why it may not (the
+        reservation is then refunded).
+        """
+        if ticket.delay <= 0:
+            return None
+        budget = _budget(ticket.delay, timeout)
+        if cancel is not None and cancel.wait(budget):
+            ticket.refund()
+            return ErrorKind.CANCELLED
+        if cancel is None:
+            time.sleep(budget)
+        if budget < ticket.delay:
+            ticket.refund()
+            return ErrorKind.TIMEOUT
+        return None
+
+    async def await_turn(
+        self,
+        ticket: Ticket,
+        *,
+        timeout: float | None = None,
+        cancel: asyncio.Event | None = None,
+    ) -> ErrorKind | None:
+        """Async counterpart of wait()."""
+        if ticket.delay <= 0:
+            return None
+        budget = _budget(ticket.delay, timeout)
+        if cancel is not None:
+            try:
+                await asyncio.wait_for(cancel.wait(), budget)
+                ticket.refund()
+                return ErrorKind.CANCELLED
+            except TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(budget)
+        if budget < ticket.delay:
+            ticket.refund()
+            return ErrorKind.TIMEOUT
+        return None
+
+
+def _budget(delay: float, timeout: float | None) -> float:
+    return delay if timeout is None else max(0.0, min(timeout, delay))
+
+
+def _usage_tokens(usage: dict | None) -> int | None:
+    """Total tokens from a backend usage dict, if it reports them."""
+    if not usage:
+        return None
+    if "total_tokens" in usage:
+        return int(usage["total_tokens"])
+    parts = [usage.get("input_tokens"), usage.get("output_tokens")]
+    if all(p is None for p in parts):
+        return None
+    return sum(int(p or 0) for p in parts)
+
+
+# Shared by every call()/acall() in the process.
+RATE_LIMITS = RateLimiter()
@@ -0,0 +1,204 @@
+"""
+Backend registry.
+
+Every backend — the built-in CLIs, the mock, and any in-house backend —
+is a BackendSpec registered under a name. src.backends.call/acall look
+the name up here, so a registered backend gets coalescing, rate limits,
+routing, caching and the graph executors without further changes:
+
+    from src.backends import Capabilities, register_backend
+
+    register_backend(
+        "inhouse",
+        "mycompany.llm:call_inhouse",      # or the callable itself
+        acall="mycompany.llm:acall_inhouse",
+        default_model="inhouse-large",
+        capabilities=Capabilities(async_native=True, batching=True),
+        batch="mycompany.llm:batch_inhouse",
+    )
+
+Implementations take the keyword arguments model, full_auto, timeout
+and cancel (plus on_event if they declare streaming) and return an
+LLMResponse; `batch` takes a list of prompts and returns one response
+per prompt.
+Import strings are resolved once, on first use, so registering a backend
+never imports its dependencies.
+"""
+
+import asyncio
+import importlib
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from src.backends import DEFAULT_MODELS, Backend, LLMResponse
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    """What a backend supports beyond a blocking call.
+
+    Args:
+        streaming: on_event receives events while the call runs. Without
+                   it, call() reports the final text as a single event.
+        async_native: `acall` neither holds a thread nor blocks the event
+                      loop. Without it, acall() runs the sync call in a
+                      worker thread.
+        batching: `batch` answers several prompts in one request.
+    """
+
+    streaming: bool = False
+    async_native: bool = False
+    batching: bool = False
+
+
+CLI_CAPABILITIES = Capabilities(streaming=True, async_native=True)
+
+
+@dataclass
+class BackendSpec:
+    """A registered backend.
+
+    `call`, `acall` and `batch` may be callables or "module:attribute"
+    import strings; strings are resolved on first use and cached.
+    """
+
+    name: str
+    call: Callable[..., LLMResponse] | str
+    acall: Callable[..., Awaitable[LLMResponse]] | str | None = None
+    default_model: str = ""
+    capabilities: Capabilities = field(default_factory=Capabilities)
+    batch: Callable[..., list[LLMResponse]] | str | None = None
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def resolve(self, attr: str) -> Callable | None:
+        """The implementation for `attr` ("call", "acall" or "batch")."""
+        target = getattr(self, attr)
+        if not isinstance(target, str):
+            return target
+        with self._lock:
+            target = getattr(self, attr)
+            if isinstance(target, str):
+                target = _import(target)
+                setattr(self, attr, target)
+        return target
+
+
+class BackendRegistry:
+    """Name -> BackendSpec, shared by the whole process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._specs: dict[str, BackendSpec] = {}
+
+    def register(
+        self,
+        name: str,
+        call: Callable[..., LLMResponse] | str,
+        *,
+        acall: Callable[..., Awaitable[LLMResponse]] | str | None = None,
+        default_model: str = "",
+        capabilities: Capabilities = Capabilities(),
+        batch: Callable[..., list[LLMResponse]] | str | None = None,
+        replace: bool = False,
+    ) -> BackendSpec:
+        """Register a backend under `name`.
+
+        Raises:
+            ValueError: If `name` is taken and `replace` is False, or if
+                        batching or async_native is declared without a
+                        `batch` or `acall` callable.
+        """
+        if capabilities.batching and batch is None:
+            raise ValueError(f"backend {name!r}: batching requires `batch`")
+        if capabilities.async_native and acall is None:
+            raise ValueError(f"backend {name!r}: async_native requires `acall`")
+        spec = BackendSpec(
+            name=name,
+            call=call,
+            acall=acall,
+            default_model=default_model,
+            capabilities=capabilities,
+            batch=batch,
+        )
+        with self._lock:
+            if name in self._specs and not replace:
+                raise ValueError(f"backend {name!r} is already registered")
+            self._specs[name] = spec
+        DEFAULT_MODELS[name] = default_model
+        return spec
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._specs.pop(name, None)
+        if name not in {b.value for b in Backend}:
+            DEFAULT_MODELS.pop(name, None)
+
+    def get(self, backend: Backend | str) -> BackendSpec:
+        """The spec for `backend`; raises ValueError if unknown."""
+        name = backend.value if isinstance(backend, Backend) else backend
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise ValueError(f"Unknown backend: {name!r}") from None
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return list(self._specs)
+
+    def __contains__(self, backend: object) -> bool:
+        name = backend.value if isinstance(backend, Backend) else backend
+        return name in self._specs
+
+
+def _import(path: str) -> Callable:
+    module, _, attr = path.partition(":")
+    if not attr:
+        raise ValueError(f"import path {path!r} must look like 'module:attr'")
+    return getattr(importlib.import_module(module), attr)
+
+
+async def run_sync(
+    call: Callable[..., LLMResponse],
+    prompt: str,
+    *,
+    cancel: asyncio.Event | None = None,
+    **kwargs: Any,
+) -> LLMResponse:
+    """Run a sync-only backend in a worker thread for acall().
+
+    The asyncio cancel event is mirrored onto a threading.Event the
+    backend can poll.
+    """
+    bridged = threading.Event() if cancel is not None else None
+    watcher = None
+    if cancel is not None:
+        async def mirror() -> None:
+            await cancel.wait()
+            bridged.set()
+        watcher = asyncio.create_task(mirror())
+    try:
+        return await asyncio.to_thread(call, prompt, cancel=bridged, **kwargs)
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+
+REGISTRY = BackendRegistry()
+
+for _name, _module, _stem, _capabilities in (
+    (Backend.CODEX, "src.backends.codex", "codex", CLI_CAPABILITIES),
+    (Backend.CLAUDE_CODE, "src.backends.claude_code", "claude_code", CLI_CAPABILITIES),
+    (Backend.GEMINI, "src.backends.gemini", "gemini", CLI_CAPABILITIES),
+    (Backend.MOCK, "src.backends.mock", "mock",
+     Capabilities(async_native=True)),
+):
+    REGISTRY.register(
+        _name.value,
+        f"{_module}:call_{_stem}",
+        acall=f"{_module}:acall_{_stem}",
+        default_model=DEFAULT_MODELS[_name],
+        capabilities=_capabilities,
+    )
@@ -0,0 +1,244 @@
+"""
+Latency-aware routing across backend/model candidates.
+
+A call may name fallback candidates besides its primary backend and
+model. The process-wide ROUTER keeps live statistics per backend/model —
+calls in flight, a moving average of successful-call latency and of the
+error rate, and consecutive failures — and orders the candidates by
+expected completion time before each call. A candidate that has failed
+several times in a row is treated as degraded for a cooldown period and
+only tried after healthy ones.
+
+Statistics are recorded for every backend call, with or without
+fallbacks, so `ROUTER.snapshot()` always reflects current load.
+Each routed call also leaves a RouteDecision in `ROUTER.decisions`.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Iterator
+
+from src.backends import Backend, ErrorKind, LLMResponse, backend_name
+
+# Failure kinds that count against a candidate and trigger failover.
+# Cancellation is the caller's doing and says nothing about the backend.
+FAILOVER_KINDS = (ErrorKind.API, ErrorKind.EXIT, ErrorKind.TIMEOUT)
+
+
+@dataclass
+class BackendStats:
+    """Live statistics for one backend/model pair."""
+
+    backend: str
+    model: str
+    in_flight: int = 0
+    calls: int = 0
+    errors: int = 0
+    consecutive_errors: int = 0
+    # Moving averages; latency covers successful calls only
+    latency: float | None = None
+    error_rate: float = 0.0
+    last_error_kind: str | None = None
+    last_error_at: float | None = field(default=None, repr=False)
+
+    @property
+    def label(self) -> str:
+        return f"{self.backend}/{self.model}"
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        d.pop("last_error_at")
+        return d
+
+
+@dataclass
+class RouteDecision:
+    """How one call with fallbacks was routed."""
+
+    candidates: list[str]
+    order: list[str]
+    scores: dict[str, float]
+    degraded: list[str]
+    # (candidate, error kind or None on success) per attempt, in order
+    attempts: list[tuple[str, str | None]] = field(default_factory=list)
+    timestamp: float = field(default_factory=time.time)
+    # Resolved (backend, model) pairs in `order`
+    plan: list[tuple[str, str]] = field(
+        default_factory=list, repr=False, compare=False,
+    )
+
+    def record(self, backend: str, model: str, resp: LLMResponse) -> None:
+        kind = _failure(resp)
+        self.attempts.append(
+            (f"{backend}/{model}", kind.value if kind else None),
+        )
+
+    @property
+    def chosen(self) -> str | None:
+        """The candidate that answered successfully, if any."""
+        for label, kind in self.attempts:
+            if kind is None:
+                return label
+        return None
+
+
+class Router:
+    """Orders candidates and tracks per-backend/model health.
+
+    Args:
+        smoothing: Weight of the newest sample in the moving averages.
+        failure_threshold: Consecutive failures that mark a candidate
+                           degraded.
+        cooldown: Seconds a degraded candidate is tried last before it
+                  is scored normally again.
+        history: RouteDecisions kept for inspection.
+    """
+
+    def __init__(
+        self,
+        smoothing: float = 0.2,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        history: int = 100,
+    ):
+        self.smoothing = smoothing
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.decisions: deque[RouteDecision] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stats: dict[tuple[str, str], BackendStats] = {}
+
+    def route(self, candidates: list[tuple[str, str]]) -> RouteDecision:
+        """Order `candidates` (resolved backend/model pairs) for one call.
+
+        Healthy candidates come first, cheapest expected completion time
+        first — observed latency scaled by calls already in flight and by
+        the error rate. Candidates without history are scored like the
+        best observed one, so declared order breaks ties. Degraded
+        candidates follow in declared order.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = [self._get(b, m) for b, m in candidates]
+            known = [s.latency for s in stats if s.latency is not None]
+            baseline = min(known) if known else 1.0
+            scores, healthy, degraded = {}, [], []
+            for cand, s in zip(candidates, stats):
+                if self._degraded(s, now):
+                    degraded.append((cand, s))
+                    continue
+                latency = s.latency if s.latency is not None else baseline
+                scores[s.label] = (
+                    latency * (1 + s.in_flight) / max(0.05, 1 - s.error_rate)
+                )
+                healthy.append((cand, s))
+        healthy.sort(key=lambda pair: scores[pair[1].label])
+        order = healthy + degraded
+        decision = RouteDecision(
+            candidates=[s.label for s in stats],
+            order=[s.label for _, s in order],
+            scores={k: round(v, 3) for k, v in scores.items()},
+            degraded=[s.label for _, s in degraded],
+            plan=[cand for cand, _ in order],
+        )
+        self.decisions.append(decision)
+        return decision
+
+    @contextmanager
+    def track(self, backend: str, model: str) -> Iterator["_Tracking"]:
+        """Count a call as in flight; record its outcome via finish()."""
+        with self._lock:
+            stats = self._get(backend, model)
+            stats.in_flight += 1
+        tracking = _Tracking()
+        t0 = time.monotonic()
+        try:
+            yield tracking
+        finally:
+            self._record(stats, tracking.response, time.monotonic() - t0)
+
+    def stats(self, backend: Backend | str, model: str) -> BackendStats:
+        """A copy of the statistics for one backend/model pair."""
+        with self._lock:
+            s = self._get(backend_name(backend), model)
+            return BackendStats(**asdict(s))
+
+    def snapshot(self) -> dict[str, dict]:
+        """Statistics for every backend/model seen, keyed by label."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                s.label: {**s.to_dict(), "degraded": self._degraded(s, now)}
+                for s in self._stats.values()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+        self.decisions.clear()
+
+    def _get(self, backend: str, model: str) -> BackendStats:
+        key = (backend, model)
+        s = self._stats.get(key)
+        if s is None:
+            s = self._stats[key] = BackendStats(backend, model)
+        return s
+
+    def _degraded(self, s: BackendStats, now: float) -> bool:
+        return (
+            s.consecutive_errors >= self.failure_threshold
+            and s.last_error_at is not None
+            and now - s.last_error_at < self.cooldown
+        )
+
+    def _record(
+        self, s: BackendStats, resp: LLMResponse | None, took: float,
+    ) -> None:
+        kind = ErrorKind.EXIT if resp is None else _failure(resp)
+        a = self.smoothing
+        with self._lock:
+            s.in_flight -= 1
+            if kind == ErrorKind.CANCELLED:
+                return
+            s.calls += 1
+            failed = kind in FAILOVER_KINDS
+            s.error_rate += a * (failed - s.error_rate)
+            if failed:
+                s.errors += 1
+                s.consecutive_errors += 1
+                s.last_error_kind = kind.value
+                s.last_error_at = time.monotonic()
+            else:
+                s.consecutive_errors = 0
+                s.latency = took if s.latency is None else (
+                    s.latency + a * (took - s.latency)
+                )
+
+
+class _Tracking:
+    __slots__ = ("response",)
+
+    def __init__(self):
+        self.response: LLMResponse | None = None
+
+    def finish(self, resp: LLMResponse) -> LLMResponse:
+        self.response = resp
+        return resp
+
+
+def should_fail_over(resp: LLMResponse) -> bool:
+    """Whether a failed response should be retried on the next candidate."""
+    return _failure(resp) in FAILOVER_KINDS
+
+
+def _failure(resp: LLMResponse) -> ErrorKind | None:
+    """The response's ErrorKind; unclassified errors count as EXIT."""
+    if resp.error is None:
+        return None
+    return resp.error_kind or ErrorKind.EXIT
+
+
+ROUTER = Router()
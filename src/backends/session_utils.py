@@ -3,88 +3,462 @@ Shared utilities for session file discovery and parsing.
 
 Used by all three backends to find and read native session files
 after CLI execution.
+
+Backends resolve a session file from the ID the CLI prints on stdout
+plus the CLI's directory layout, so lookup only ever lists one or two
+directories. If the file has not been flushed yet, the waiters block on
+filesystem events when `watchdog` is installed (inotify/FSEvents) and
+fall back to cheap polling of those same directories otherwise.
 """
 
+import asyncio
+import fnmatch
 import json
+import os
+import threading
 import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+from src.backends import TraceMessage
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional: pip install watchdog
+    FileSystemEventHandler = object
+    Observer = None
+
+# Poll interval for locate_session_file when watchdog is unavailable.
+# Scans are a single os.scandir per directory, so this can be short.
+LOCATE_POLL_INTERVAL = 0.1
+
+# Quiet time a session file needs (since its last write) before it is
+# read, giving the CLI time to finish writing.
+SETTLE_DELAY = 0.2
+
+
+@dataclass
+class TraceLimits:
+    """Caps on what a parsed session trace keeps in memory.
+
+    Args:
+        tool_output: Characters kept per tool result.
+        tool_input: Characters kept per tool call input (None = all).
+        max_items: Entries kept per trace list, e.g. session_messages
+                   (None = all). Later entries are counted, not kept.
+        max_record_bytes: JSONL lines longer than this are skipped
+                          without being read into memory.
+    """
+
+    tool_output: int = 2000
+    tool_input: int | None = 20_000
+    max_items: int | None = None
+    max_record_bytes: int = 64 * 1024 * 1024
+
+
+# Limits used by the backend parsers; replace to change them process-wide.
+TRACE_LIMITS = TraceLimits()
+
+
+class TraceBuilder:
+    """Accumulates a session trace record by record under TraceLimits.
+
+    Parsers stream records from the session file and hand each message
+    to the builder, so only the capped trace is ever held in memory.
+    """
+
+    def __init__(self, limits: TraceLimits | None = None):
+        self.limits = limits or TRACE_LIMITS
+        self.thinking: list[str] = []
+        self.tool_calls: list[dict] = []
+        self.tool_results: list[dict] = []
+        self.messages: list[TraceMessage] = []
+        self.dropped = 0
+
+    def text(self, role: str, text: str, timestamp: str = "") -> None:
+        self._keep(self.messages, TraceMessage(
+            role=role,
+            content_type="text",
+            content=text,
+            timestamp=timestamp,
+        ))
+
+    def thought(self, text: str, timestamp: str = "") -> None:
+        self._keep(self.thinking, text)
+        self._keep(self.messages, TraceMessage(
+            role="assistant",
+            content_type="thinking",
+            content=text,
+            timestamp=timestamp,
+        ))
+
+    def tool_call(
+        self, call: dict, name: str, tool_input: str, timestamp: str = "",
+    ) -> None:
+        """Record a tool call; `call` should hold clip()ped values."""
+        tool_input = self.clip(tool_input)
+        self._keep(self.tool_calls, call)
+        self._keep(self.messages, TraceMessage(
+            role="assistant",
+            content_type="tool_call",
+            content=truncate(tool_input, 500),
+            tool_name=name,
+            tool_input=tool_input,
+            timestamp=timestamp,
+        ))
+
+    def tool_result(self, result: dict, output: str, timestamp: str = "") -> None:
+        """Record a tool result; `output` is capped at limits.tool_output."""
+        output = truncate(output, self.limits.tool_output)
+        self._keep(self.tool_results, {**result, "output": output})
+        self._keep(self.messages, TraceMessage(
+            role="tool",
+            content_type="tool_result",
+            content=output,
+            timestamp=timestamp,
+        ))
 
+    def clip(self, tool_input: str) -> str:
+        """Apply the tool_input cap (returns the same object if it fits)."""
+        if self.limits.tool_input is None:
+            return tool_input
+        return truncate(tool_input, self.limits.tool_input)
 
-def read_jsonl(file_path: Path) -> list[dict]:
-    """Read a JSONL file, skipping malformed lines."""
-    lines = []
-    with open(file_path, "r", errors="replace") as f:
-        for line in f:
+    def parts(
+        self,
+    ) -> tuple[list[str], list[dict], list[dict], list[TraceMessage]]:
+        """(thinking, tool_calls, tool_results, session_messages)"""
+        return self.thinking, self.tool_calls, self.tool_results, self.messages
+
+    def _keep(self, items: list, item) -> None:
+        cap = self.limits.max_items
+        if cap is None or len(items) < cap:
+            items.append(item)
+        else:
+            self.dropped += 1
+
+
+def iter_jsonl(
+    file_path: Path, max_record_bytes: int | None = None,
+) -> Iterator[Any]:
+    """Stream the records of a JSONL file, skipping malformed lines.
+
+    Lines longer than `max_record_bytes` (default: TRACE_LIMITS) are
+    skipped in bounded-size reads rather than loaded.
+    """
+    limit = max_record_bytes or TRACE_LIMITS.max_record_bytes
+    with open(file_path, "rb") as f:
+        while line := f.readline(limit + 1):
+            if len(line) > limit:
+                while line and not line.endswith(b"\n"):
+                    line = f.readline(_READ_CHUNK)
+                continue
             line = line.strip()
             if not line:
                 continue
             try:
-                lines.append(json.loads(line))
+                yield json.loads(line.decode("utf-8", errors="replace"))
             except json.JSONDecodeError:
                 continue
-    return lines
 
 
-def read_json(file_path: Path) -> dict | None:
-    """Read a JSON file, returning None on error."""
+def iter_json_array(file_path: Path, key: str) -> Iterator[Any]:
+    """Stream the items of array `key` in a file holding one JSON object.
+
+    Other top-level members are decoded and discarded; reading stops
+    once the array ends. Only one item is held in memory at a time.
+    Yields nothing if the file is not an object or lacks the array.
+    """
     try:
-        data = json.loads(file_path.read_text(errors="replace"))
-        return data if isinstance(data, dict) else None
-    except (json.JSONDecodeError, OSError):
-        return None
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            stream = _JsonStream(f)
+            if stream.take() != "{":
+                return
+            while (c := stream.take()) not in ("}", ""):
+                if c == ",":
+                    continue
+                stream.pos -= 1
+                name = stream.value()
+                if stream.take() != ":":
+                    return
+                if name != key or stream.peek() != "[":
+                    stream.value()
+                    continue
+                stream.take()
+                while (c := stream.peek()) not in ("]", ""):
+                    if c == ",":
+                        stream.take()
+                        continue
+                    yield stream.value()
+                return
+    except (OSError, json.JSONDecodeError):
+        return
+
+
+# Read size for streamed session files.
+_READ_CHUNK = 1024 * 1024
+
+_JSON_WHITESPACE = " \t\r\n"
+
+
+class _JsonStream:
+    """Incremental JSON value reader over a text file.
+
+    Keeps a window of unread text and decodes one value at a time with
+    json.JSONDecoder.raw_decode, growing the window geometrically when a
+    value spans beyond it.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def peek(self) -> str:
+        """Next non-whitespace character, "" at end of file."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _JSON_WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def take(self) -> str:
+        c = self.peek()
+        self.pos += len(c)
+        return c
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A bare number at the window's edge may continue past it
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _fill(self) -> bool:
+        """Drop consumed text and read at least as much as is buffered."""
+        if self.eof:
+            return False
+        unread = self.buf[self.pos:]
+        chunk = self.f.read(max(_READ_CHUNK, len(unread)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = unread + chunk
+        self.pos = 0
+        return True
 
 
-def find_newest_file(
-    directory: Path,
+def scan_session_dirs(
+    directories: Iterable[Path],
     pattern: str,
     after_mtime: float,
 ) -> Path | None:
-    """Find the newest file matching glob pattern created after the given time.
-
-    Args:
-        directory: Root directory to search recursively.
-        pattern: Glob pattern (e.g. "*.jsonl", "session-*.json").
-        after_mtime: Only consider files modified after this unix timestamp.
+    """Newest file matching `pattern` directly inside `directories`.
 
-    Returns:
-        Path to the newest matching file, or None.
+    Does not recurse: each directory costs one os.scandir, and missing
+    directories are skipped.
     """
-    if not directory.exists():
-        return None
-    candidates = []
-    for f in directory.rglob(pattern):
-        if f.is_file() and f.stat().st_mtime > after_mtime:
-            candidates.append(f)
-    if not candidates:
-        return None
-    return max(candidates, key=lambda f: f.stat().st_mtime)
+    newest: Path | None = None
+    newest_mtime = after_mtime
+    for directory in directories:
+        try:
+            entries = os.scandir(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            for entry in entries:
+                if not fnmatch.fnmatchcase(entry.name, pattern):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if mtime > newest_mtime and entry.is_file():
+                    newest, newest_mtime = Path(entry.path), mtime
+    return newest
 
 
-def truncate(text: str, max_len: int = 2000) -> str:
-    """Truncate text, adding ellipsis if needed."""
-    if len(text) <= max_len:
-        return text
-    return text[:max_len] + "...[truncated]"
+def locate_session_file(
+    directories: Iterable[Path],
+    pattern: str,
+    after_mtime: float,
+    timeout: float = 5.0,
+    *,
+    root: Path | None = None,
+) -> Path | None:
+    """Wait for a session file in a known set of directories.
+
+    `pattern` should be as specific as the backend allows — ideally the
+    exact session ID — so concurrent calls never pick up each other's
+    files. Waits on filesystem events when watchdog is installed, else
+    polls every LOCATE_POLL_INTERVAL seconds. `root` is the backend's
+    sessions directory: missing directories are watched through their
+    parents up to it, never above.
+    """
+    directories = list(directories)
+    found = scan_session_dirs(directories, pattern, after_mtime)
+    if found is None:
+        deadline = time.monotonic() + timeout
+        with _DirectoryWatch(directories, root=root) as watch:
+            while found is None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return None
+                watch.wait(min(left, LOCATE_POLL_INTERVAL))
+                found = scan_session_dirs(directories, pattern, after_mtime)
+    return settle(found)
 
 
-def wait_for_session_file(
-    directory: Path,
+async def alocate_session_file(
+    directories: Iterable[Path],
     pattern: str,
     after_mtime: float,
-    timeout: float = 10.0,
-    poll_interval: float = 0.5,
+    timeout: float = 5.0,
+    *,
+    root: Path | None = None,
 ) -> Path | None:
-    """Wait for a new session file to appear after CLI execution.
+    """Async counterpart of locate_session_file.
 
-    Some CLIs flush the session file slightly after the process exits.
-    This polls for up to `timeout` seconds.
+    Filesystem events are bridged onto the event loop, so waiting does
+    not hold a thread from the default executor.
     """
-    deadline = time.time() + timeout
-    while time.time() < deadline:
-        result = find_newest_file(directory, pattern, after_mtime)
-        if result is not None:
-            # Give the file a moment to finish writing
-            time.sleep(0.2)
-            return result
-        time.sleep(poll_interval)
-    return None
+    directories = list(directories)
+    found = scan_session_dirs(directories, pattern, after_mtime)
+    if found is None:
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        deadline = time.monotonic() + timeout
+
+        def notify() -> None:
+            loop.call_soon_threadsafe(changed.set)
+
+        with _DirectoryWatch(directories, notify, root=root) as watch:
+            while found is None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(
+                        changed.wait(), min(left, LOCATE_POLL_INTERVAL),
+                    )
+                except TimeoutError:
+                    pass
+                changed.clear()
+                watch.refresh()
+                found = scan_session_dirs(directories, pattern, after_mtime)
+    await asyncio.sleep(_unsettled(found))
+    return found
+
+
+def settle(path: Path) -> Path:
+    """Return `path` once it has gone SETTLE_DELAY seconds unmodified.
+
+    Files written a while ago are returned at once, so a lookup deferred
+    until the trace is read rarely waits at all.
+    """
+    time.sleep(_unsettled(path))
+    return path
+
+
+def _unsettled(path: Path) -> float:
+    """Seconds left until `path` has been quiet for SETTLE_DELAY."""
+    try:
+        age = time.time() - path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+    return min(SETTLE_DELAY, max(0.0, SETTLE_DELAY - age))
+
+
+class _DirectoryWatch(FileSystemEventHandler):
+    """Signals filesystem activity in a set of directories.
+
+    A no-op when watchdog is not installed; callers then rely on their
+    poll interval. A directory that does not exist yet (e.g. today's date
+    partition) is watched through its nearest existing parent, but only
+    up to `root`; each watch is non-recursive, and `refresh` moves it
+    down as the missing levels appear. Directories whose nearest parent
+    lies above `root` are left to polling.
+    """
+
+    def __init__(
+        self,
+        directories: list[Path],
+        callback: Callable[[], None] | None = None,
+        *,
+        root: Path | None = None,
+    ):
+        super().__init__()
+        self.directories = directories
+        self.callback = callback
+        self.root = root
+        self.changed = threading.Event()
+        self._observer = None
+        self._watches: dict[Path, object] = {}
+
+    def __enter__(self) -> "_DirectoryWatch":
+        if Observer is None:
+            return self
+        self._observer = Observer()
+        self.refresh()
+        self._observer.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+    def on_any_event(self, event) -> None:
+        self.changed.set()
+        if self.callback:
+            self.callback()
+
+    def wait(self, timeout: float) -> None:
+        self.changed.wait(timeout)
+        self.changed.clear()
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Move the watches onto the directories that exist by now."""
+        if self._observer is None:
+            return
+        targets = {self._target(d) for d in self.directories} - {None}
+        for target in self._watches.keys() - targets:
+            self._observer.unschedule(self._watches.pop(target))
+        for target in targets - self._watches.keys():
+            try:
+                self._watches[target] = self._observer.schedule(
+                    self, str(target), recursive=False,
+                )
+            except OSError:  # removed since the check; polling covers it
+                continue
+
+    def _target(self, directory: Path) -> Path | None:
+        """Nearest existing directory at or below `root` covering `directory`."""
+        target, root = directory, self.root
+        while not target.is_dir():
+            if root is None or root not in target.parents:
+                return None
+            target = target.parent
+        return target
+
+
+def truncate(text: str, max_len: int = 2000) -> str:
+    """Truncate text, adding ellipsis if needed."""
+    if len(text) <= max_len:
+        return text
+    return text[:max_len] + "...[truncated]"
@@ -0,0 +1,153 @@
+"""
+In-flight request coalescing for backend calls.
+
+When several callers issue the same prompt to the same backend, model
+and mode at the same time, only the first (the leader) starts a CLI
+process; the others wait for it and receive the same LLMResponse
+object. Each waiter still honours its own timeout and cancel event.
+
+A leader that was itself timed out or cancelled does not answer for its
+waiters: they fall back to calling the backend themselves, since their
+own deadlines may allow a full run.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Hashable
+
+from src.backends import ErrorKind, LLMResponse
+
+# How often a waiting caller re-checks its own cancel event and deadline.
+WAIT_INTERVAL = 0.05
+
+_UNUSABLE = (ErrorKind.TIMEOUT, ErrorKind.CANCELLED)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: LLMResponse | None = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key.
+
+    `saved` counts calls answered by another caller's in-flight request.
+    """
+
+    def __init__(self):
+        self.saved = 0
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._aflights: dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights) + len(self._aflights)
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], LLMResponse],
+        *,
+        timeout: float | None = None,
+        cancel: threading.Event | None = None,
+        on_give_up: Callable[[ErrorKind], LLMResponse],
+    ) -> LLMResponse:
+        """Run `fn` unless an identical call is in flight; share its result.
+
+        `on_give_up(kind)` builds the response for a waiter whose own
+        timeout or cancel fires first.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if leader:
+            try:
+                flight.response = fn()
+                return flight.response
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while not flight.done.wait(WAIT_INTERVAL):
+            if cancel is not None and cancel.is_set():
+                return on_give_up(ErrorKind.CANCELLED)
+            if deadline is not None and time.monotonic() >= deadline:
+                return on_give_up(ErrorKind.TIMEOUT)
+
+        resp = flight.response
+        if resp is None or resp.error_kind in _UNUSABLE:
+            left = deadline - time.monotonic() if deadline is not None else None
+            return self.do(
+                key, fn, timeout=left, cancel=cancel, on_give_up=on_give_up,
+            )
+        with self._lock:
+            self.saved += 1
+        return resp
+
+    async def ado(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[LLMResponse]],
+        *,
+        timeout: float | None = None,
+        cancel: asyncio.Event | None = None,
+        on_give_up: Callable[[ErrorKind], LLMResponse],
+    ) -> LLMResponse:
+        """Async counterpart of do(); flights are scoped to the running loop."""
+        loop = asyncio.get_running_loop()
+        key = (id(loop), key)
+        with self._lock:
+            fut = self._aflights.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._aflights[key] = loop.create_future()
+
+        if leader:
+            resp = None
+            try:
+                resp = await fn()
+                return resp
+            finally:
+                with self._lock:
+                    del self._aflights[key]
+                if not fut.done():
+                    fut.set_result(resp)
+
+        waiters = {asyncio.ensure_future(asyncio.shield(fut))}
+        cancel_task = None
+        if cancel is not None:
+            cancel_task = asyncio.create_task(cancel.wait())
+            waiters.add(cancel_task)
+        start = time.monotonic()
+        try:
+            done, pending = await asyncio.wait(
+                waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            for t in waiters:
+                t.cancel()
+        if not fut.done():
+            kind = ErrorKind.CANCELLED if cancel_task in done else ErrorKind.TIMEOUT
+            return on_give_up(kind)
+
+        resp = fut.result()
+        if resp is None or resp.error_kind in _UNUSABLE:
+            left = timeout - (time.monotonic() - start) if timeout is not None else None
+            return await self.ado(
+                key[1], fn, timeout=left, cancel=cancel, on_give_up=on_give_up,
+            )
+        with self._lock:
+            self.saved += 1
+        return resp
+
+
+# Process-wide coalescer used by src.backends.call / acall.
+FLIGHTS = SingleFlight()
@@ -0,0 +1,183 @@
+"""
+Warm pool of pre-started CLI processes.
+
+Starting `codex`, `claude` or `gemini` costs Node.js start-up, auth and
+config loading before the model sees a single token. All three backends
+pass the prompt on stdin, so a CLI can be started ahead of time and left
+blocked on its stdin until a prompt arrives. The pool keeps a few such
+processes per command line and hands one to each call, refilling in the
+background, which takes start-up off the critical path.
+
+Each process serves exactly one prompt. Feeding successive prompts into
+one long-lived session (e.g. `claude --input-format stream-json`) would
+make them turns of a single conversation, leaking context between
+unrelated nodes, so workers are never reused.
+
+Usage:
+    with WarmPool(size=4):
+        executor.run(task)
+"""
+
+import atexit
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from src.backends.process_utils import (
+    kill_process_group,
+    set_warm_pool,
+    spawn_cli,
+)
+
+
+@dataclass
+class PoolStats:
+    """Counters describing how a WarmPool has served calls."""
+
+    warm_hits: int = 0  # calls handed an already-started process
+    cold_starts: int = 0  # calls that had to spawn (pool empty)
+    spawned: int = 0  # processes started in the background
+    dead: int = 0  # warm processes found exited and discarded
+    recycled: int = 0  # warm processes killed after max_idle seconds
+
+
+@dataclass
+class _Worker:
+    proc: subprocess.Popen
+    started: float
+
+
+class WarmPool:
+    """Keeps up to `size` started CLI processes per command line.
+
+    A command is warmed after its first use, keyed on the full argv and
+    the working directory (sessions are filed per project). Workers
+    idle longer than `max_idle` seconds are recycled, so a long pause
+    never hands out a process with stale credentials or config.
+
+    Args:
+        size: Processes kept ready per command line.
+        max_idle: Seconds a worker may wait before being replaced.
+    """
+
+    def __init__(self, size: int = 4, *, max_idle: float = 300.0):
+        if size < 1:
+            raise ValueError(f"size must be >= 1, got {size}")
+        self.size = size
+        self.max_idle = max_idle
+        self._stats = PoolStats()
+        self._lock = threading.Lock()
+        self._idle: dict[tuple, deque[_Worker]] = {}
+        self._starting: dict[tuple, int] = {}
+        self._closed = False
+
+    def acquire(self, cmd: list[str]) -> subprocess.Popen:
+        """Return a started process for `cmd`, warm if one is ready."""
+        key = (os.getcwd(), *cmd)
+        stale: list[_Worker] = []
+        proc = None
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            now = time.monotonic()
+            while idle:
+                worker = idle.popleft()
+                if worker.proc.poll() is not None:
+                    self._stats.dead += 1
+                    stale.append(worker)
+                elif now - worker.started > self.max_idle:
+                    self._stats.recycled += 1
+                    stale.append(worker)
+                else:
+                    proc = worker.proc
+                    self._stats.warm_hits += 1
+                    break
+            if proc is None:
+                self._stats.cold_starts += 1
+        if stale:
+            # Killing takes up to the kill grace per worker: reap in the
+            # background, as refills are started there
+            threading.Thread(
+                target=_discard_all, args=([w.proc for w in stale],),
+                name="warm-pool-reaper", daemon=True,
+            ).start()
+        self._refill(key, cmd)
+        return proc if proc is not None else spawn_cli(cmd, stdin=True)
+
+    @property
+    def stats(self) -> PoolStats:
+        with self._lock:
+            return PoolStats(**vars(self._stats))
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return sum(len(q) for q in self._idle.values())
+
+    def install(self) -> "WarmPool":
+        """Make backend calls in this process draw from the pool."""
+        set_warm_pool(self)
+        atexit.register(self.close)
+        return self
+
+    def close(self) -> None:
+        """Uninstall the pool and kill every idle worker."""
+        with self._lock:
+            self._closed = True
+            workers = [w for q in self._idle.values() for w in q]
+            self._idle.clear()
+        set_warm_pool(None)
+        atexit.unregister(self.close)
+        _discard_all([w.proc for w in workers])
+
+    def __enter__(self) -> "WarmPool":
+        return self.install()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _refill(self, key: tuple, cmd: list[str]) -> None:
+        """Start workers in the background until `size` are ready."""
+        with self._lock:
+            missing = (
+                self.size - len(self._idle.get(key, ()))
+                - self._starting.get(key, 0)
+            )
+            if self._closed or missing <= 0:
+                return
+            self._starting[key] = self._starting.get(key, 0) + missing
+        for _ in range(missing):
+            threading.Thread(
+                target=self._start_worker, args=(key, cmd), daemon=True,
+            ).start()
+
+    def _start_worker(self, key: tuple, cmd: list[str]) -> None:
+        try:
+            proc = spawn_cli(cmd, stdin=True)
+        except OSError:
+            proc = None
+        with self._lock:
+            self._starting[key] -= 1
+            if proc is not None and not self._closed:
+                self._stats.spawned += 1
+                self._idle.setdefault(key, deque()).append(
+                    _Worker(proc, time.monotonic()),
+                )
+                return
+        if proc is not None:
+            _discard(proc)
+
+
+def _discard(proc: subprocess.Popen) -> None:
+    """Kill an unused worker's process group and close its pipes."""
+    kill_process_group(proc)
+    proc.wait()
+    for stream in (proc.stdin, proc.stdout, proc.stderr):
+        if stream:
+            stream.close()
+
+
+def _discard_all(procs: list[subprocess.Popen]) -> None:
+    for proc in procs:
+        _discard(proc)
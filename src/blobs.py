@@ -0,0 +1,184 @@
+"""
+Content-addressed blob store for deduplicating trace text.
+
+The same upstream output reaches a trace many times over: as the step's
+output, inside raw_events and session_messages, and again in every
+downstream step's context and full_prompt. build_trace(dedupe=True)
+stores each distinct text once, in a "blobs" table keyed by its sha256,
+and replaces long strings and every ContextRope with a reference:
+
+    {"$blob": ["<id>", ...]}      # the concatenation of these blobs
+
+Ropes are referenced leaf by leaf, so an accumulated context that
+shares its segments with earlier steps costs one id per segment rather
+than a copy of the text. A plain string equal to a recently stored rope
+(e.g. the prompt echoed in a session's user message) reuses the rope's
+references; it is matched by length and compared leaf by leaf, so a
+rope is never joined or hashed as a whole. expand() turns a
+deduplicated value back into plain strings.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Mapping
+
+from src.context import ContextRope
+
+REF = "$blob"
+
+# Shorter strings are kept inline: a reference would not save space
+BLOB_MIN_CHARS = 256
+
+# Recent ropes an echoed string is matched against
+ROPE_MEMORY = 256
+
+# Long strings whose digest is remembered by object identity
+DIGEST_MEMORY = 4096
+
+
+def blob_id(text: str) -> str:
+    """Content address of `text`."""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class BlobStore:
+    """Distinct texts keyed by blob_id, each held once."""
+
+    def __init__(self, blobs: Mapping[str, str] | None = None):
+        self._lock = threading.Lock()
+        self._blobs: dict[str, str] = dict(blobs or {})
+        # id(text) -> (text, blob id) for recently hashed long strings, so
+        # a leaf shared by many ropes is hashed once; least recent first
+        self._ids: OrderedDict[int, tuple[str, str]] = OrderedDict()
+        # Leaf blob ids of recently stored ropes -> their length in chars
+        self._ropes: OrderedDict[tuple[str, ...], int] = OrderedDict()
+        # Ids added since the last drain(), in insertion order
+        self._new: list[str] = []
+
+    def put(self, text: str) -> str:
+        """Store `text` (once) and return its blob id."""
+        digest = self._digest(text)
+        with self._lock:
+            if digest not in self._blobs:
+                self._blobs[digest] = text
+                self._new.append(digest)
+        return digest
+
+    def put_rope(self, rope: ContextRope) -> list[str]:
+        """Store a rope's leaves; return their blob ids in order."""
+        refs = [self.put(s) for s in rope.segments()]
+        if len(refs) > 1:
+            key = tuple(refs)
+            with self._lock:
+                self._ropes[key] = len(rope)
+                self._ropes.move_to_end(key)
+                if len(self._ropes) > ROPE_MEMORY:
+                    self._ropes.popitem(last=False)
+        return refs
+
+    def refs(self, text: str) -> list[str]:
+        """Blob ids for `text`: a recent rope's leaves, else one blob."""
+        with self._lock:
+            candidates = [
+                leaves for leaves, chars in reversed(self._ropes.items())
+                if chars == len(text)
+            ]
+        for leaves in candidates:
+            if self._spells(text, leaves):
+                return list(leaves)
+        return [self.put(text)]
+
+    def _spells(self, text: str, leaves: tuple[str, ...]) -> bool:
+        """Whether `text` is the concatenation of the blobs `leaves`."""
+        pos = 0
+        for digest in leaves:
+            leaf = self._blobs[digest]
+            if not text.startswith(leaf, pos):
+                return False
+            pos += len(leaf)
+        return True
+
+    def _digest(self, text: str) -> str:
+        if len(text) < BLOB_MIN_CHARS:
+            return blob_id(text)
+        with self._lock:
+            known = self._ids.get(id(text))
+            if known is not None and known[0] is text:
+                self._ids.move_to_end(id(text))
+                return known[1]
+        digest = blob_id(text)
+        with self._lock:
+            self._ids[id(text)] = (text, digest)
+            self._ids.move_to_end(id(text))
+            if len(self._ids) > DIGEST_MEMORY:
+                self._ids.popitem(last=False)
+        return digest
+
+    def get(self, digest: str) -> str:
+        """The text stored under `digest`; raises KeyError if unknown."""
+        return self._blobs[digest]
+
+    def drain(self) -> list[tuple[str, str]]:
+        """(id, text) of blobs added since the previous drain()."""
+        with self._lock:
+            new, self._new = self._new, []
+            return [(d, self._blobs[d]) for d in new]
+
+    def to_dict(self) -> dict[str, str]:
+        with self._lock:
+            return dict(self._blobs)
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    @property
+    def chars(self) -> int:
+        """Total characters held."""
+        with self._lock:
+            return sum(map(len, self._blobs.values()))
+
+
+def dedupe(value: Any, store: BlobStore, min_chars: int = BLOB_MIN_CHARS) -> Any:
+    """Copy of a JSON-like value with long strings and ropes as references."""
+    if isinstance(value, ContextRope):
+        return {REF: store.put_rope(value)}
+    if isinstance(value, str):
+        return {REF: store.refs(value)} if len(value) >= min_chars else value
+    if isinstance(value, dict):
+        return {k: dedupe(v, store, min_chars) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [dedupe(v, store, min_chars) for v in value]
+    return value
+
+
+def expand_rope(value: Any, blobs: Mapping[str, str]) -> Any:
+    """Inverse of dedupe() for a value that was a rope.
+
+    The rope is rebuilt from the stored blobs, so contexts that shared
+    segments share them again. Other values pass through.
+    """
+    if not (
+        isinstance(value, dict) and len(value) == 1
+        and isinstance(value.get(REF), list)
+    ):
+        return value
+    ref = value[REF]
+    if len(ref) == 1:
+        return blobs[ref[0]]
+    rope = ContextRope()
+    for digest in ref:
+        rope = rope.append(blobs[digest])
+    return rope
+
+
+def expand(value: Any, blobs: Mapping[str, str]) -> Any:
+    """Inverse of dedupe(): references replaced by their text."""
+    if isinstance(value, dict):
+        ref = value.get(REF)
+        if len(value) == 1 and isinstance(ref, list):
+            return "".join(blobs[d] for d in ref)
+        return {k: expand(v, blobs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [expand(v, blobs) for v in value]
+    return value
@@ -0,0 +1,204 @@
+"""
+Content-addressed on-disk cache of agent results.
+
+An entry is keyed on a hash of the full prompt built by Agent.run plus
+the backend, resolved model and full_auto flag — everything that
+determines what the CLI is asked. Re-running a graph with an unchanged
+node therefore serves the stored AgentResult (including its trace)
+instead of invoking the CLI again.
+
+Entries are single JSON files named by key. Access order is tracked via
+file mtime, so eviction is least-recently-used once the store exceeds
+`max_bytes` or `max_entries`; entries older than `ttl` seconds are
+treated as misses and removed.
+
+Agents store results with put_later(): serialising a result reads its
+lazy session fields, which may locate and parse a session file, so the
+cache's writer thread does it rather than the call that produced it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from src.agent import AgentResult
+from src.backends import DEFAULT_MODELS, Backend, backend_name
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "agent-coordination" / "results"
+
+
+class ResultCache:
+    """LRU + TTL result store backed by a directory of JSON files.
+
+    Args:
+        directory: Where entries are stored (created on first write).
+        max_bytes: Evict least-recently-used entries above this total size.
+        max_entries: Evict least-recently-used entries above this count.
+        ttl: Seconds after which an entry expires (None = never).
+    """
+
+    def __init__(
+        self,
+        directory: str | Path = DEFAULT_CACHE_DIR,
+        *,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_entries: int | None = None,
+        ttl: float | None = None,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (size_bytes, last_access); loaded lazily from disk
+        self._index: dict[str, tuple[int, float]] | None = None
+        self._writer: ThreadPoolExecutor | None = None
+        # key -> queued put_later(); failed writes stay until flush()
+        self._pending: dict[str, Future] = {}
+
+    @staticmethod
+    def key(
+        prompt: str,
+        *,
+        backend: Backend | str,
+        model: str = "",
+        full_auto: bool = False,
+    ) -> str:
+        """Hash everything that determines the backend's answer."""
+        backend = backend_name(backend)
+        payload = json.dumps({
+            "prompt": prompt,
+            "backend": backend,
+            "model": model or DEFAULT_MODELS[backend],
+            "full_auto": full_auto,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> AgentResult | None:
+        """Return the cached result for `key`, or None on miss/expiry.
+
+        Waits for a queued put_later() of the same key.
+        """
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            wait([pending])
+        path = self._path(key)
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                self.misses += 1
+                return None
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                self._remove(key)
+                self.misses += 1
+                return None
+            if self.ttl is not None and time.time() - entry["created"] > self.ttl:
+                self._remove(key)
+                self.misses += 1
+                return None
+            now = time.time()
+            os.utime(path, (now, now))
+            index[key] = (index[key][0], now)
+            self.hits += 1
+        return AgentResult.from_dict(entry["result"])
+
+    def put(self, key: str, result: AgentResult) -> None:
+        """Store `result` under `key`, then evict down to the size limits."""
+        data = json.dumps(
+            {"created": time.time(), "result": result.to_dict()},
+            ensure_ascii=False,
+            default=str,
+        ).encode("utf-8")
+        path = self._path(key)
+        with self._lock:
+            index = self._load_index()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            index[key] = (len(data), time.time())
+            self._evict()
+
+    def put_later(self, key: str, result: AgentResult) -> None:
+        """Queue put() on the cache's writer thread."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="result-cache",
+                )
+            future = self._writer.submit(self.put, key, result)
+            self._pending[key] = future
+        future.add_done_callback(lambda f: self._settled(key, f))
+
+    def flush(self) -> None:
+        """Wait for queued writes; re-raises the first one that failed."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.result()
+
+    def _settled(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._pending.get(key) is future and future.exception() is None:
+                del self._pending[key]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            for key in list(self._load_index()):
+                self._remove(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load_index())
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for size, _ in self._load_index().values())
+
+    # ── Internals (caller holds self._lock) ──────────────────────────
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load_index(self) -> dict[str, tuple[int, float]]:
+        if self._index is None:
+            self._index = {}
+            if self.directory.exists():
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(".json") and entry.is_file():
+                        st = entry.stat()
+                        self._index[entry.name[:-5]] = (st.st_size, st.st_mtime)
+        return self._index
+
+    def _remove(self, key: str) -> None:
+        self._index.pop(key, None)
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        index = self._index
+        total = sum(size for size, _ in index.values())
+        over_count = (
+            len(index) - self.max_entries if self.max_entries is not None else 0
+        )
+        if total <= self.max_bytes and over_count <= 0:
+            return
+        for key in sorted(index, key=lambda k: index[k][1]):
+            if total <= self.max_bytes and over_count <= 0:
+                break
+            total -= index[key][0]
+            over_count -= 1
+            self._remove(key)
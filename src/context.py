@@ -2,19 +2,113 @@
 Sequential execution with context chaining.
 
 Shared by pipeline (accumulate=False) and plan-execute (accumulate=True).
+Accumulated context is a ContextRope: each step appends a segment in
+O(1) and every envelope and trace holds a view of the same segment list,
+so a 50-step chain no longer copies the growing context at each step.
 """
 
-from src.agent import Agent, AgentResult
+import threading
+from typing import TYPE_CHECKING, Union
+
 from src.logging import StepLogger
 
+if TYPE_CHECKING:
+    from src.agent import Agent, AgentResult
+
+
+class _Segments:
+    """Segment list shared by every view of one rope."""
+
+    __slots__ = ("items", "lock")
+
+    def __init__(self, items: list):
+        self.items = items
+        self.lock = threading.Lock()
+
+
+class ContextRope:
+    """Append-only text kept as segments and joined on demand.
+
+    A rope is an immutable view of the first `count` segments of a
+    shared list: append() returns a new view in O(1), and the old view
+    still reads as before. str() materializes the text; segments may be
+    strings or other ropes. Compares equal to the equivalent str.
+    """
+
+    __slots__ = ("_shared", "_count", "_length")
+
+    def __init__(self, text: Union[str, "ContextRope"] = ""):
+        self._shared = _Segments([text] if text else [])
+        self._count = len(self._shared.items)
+        self._length = len(text)
+
+    def append(self, text: Union[str, "ContextRope"]) -> "ContextRope":
+        """A rope reading as self + text; self is unchanged."""
+        if not text:
+            return self
+        shared = self._shared
+        with shared.lock:
+            if self._count == len(shared.items):
+                shared.items.append(text)
+            else:
+                # Appending to an older view: branch off a private copy.
+                shared = _Segments(shared.items[:self._count] + [text])
+        rope = ContextRope.__new__(ContextRope)
+        rope._shared = shared
+        rope._count = self._count + 1
+        rope._length = self._length + len(text)
+        return rope
+
+    def segments(self) -> list[str]:
+        """The leaf strings of this view, in order."""
+        out: list[str] = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                out.append(node)
+                continue
+            stack.extend(reversed(node._shared.items[:node._count]))
+        return out
+
+    def __str__(self) -> str:
+        return "".join(self.segments())
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, text: str) -> bool:
+        return text in str(self)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (str, ContextRope)):
+            return len(self) == len(other) and str(self) == str(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"ContextRope(segments={self._count}, chars={self._length})"
+
+
+Context = Union[str, ContextRope]
+
+
+def completed_step(task: str, output: str) -> ContextRope:
+    """One finished step's segment of accumulated context.
+
+    References `output` rather than copying it.
+    """
+    return ContextRope(f"\n\nCompleted: {task}\nResult: ").append(output)
+
 
 def run_chain(
-    agents: list[Agent],
+    agents: list["Agent"],
     tasks: list[str],
     log: StepLogger,
     *,
     accumulate: bool = False,
-) -> list[AgentResult]:
+) -> list["AgentResult"]:
     """Run agents sequentially, passing context forward.
 
     Args:
@@ -28,8 +122,8 @@ def run_chain(
     Returns:
         List of AgentResult for each completed step.
     """
-    results: list[AgentResult] = []
-    context = ""
+    results: list["AgentResult"] = []
+    context: Context = ContextRope() if accumulate else ""
     total = len(tasks)
 
     for i, task in enumerate(tasks):
@@ -48,7 +142,7 @@ def run_chain(
         log.done(step_num, total, agent.name, len(step_result.output))
 
         if accumulate:
-            context += f"\n\nCompleted: {task}\nResult: {step_result.output}"
+            context = context.append(completed_step(task, step_result.output))
         else:
             context = step_result.output
 
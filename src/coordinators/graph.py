@@ -21,11 +21,14 @@ class GraphCoordinator(GraphExecutor):
         # Or from a GraphDef:
         coord = GraphCoordinator(graph_def)
         result = coord.run("Your task here")
+
+    Keyword options (max_workers, cache, store, ...) are passed through
+    to GraphExecutor.
     """
 
-    def __init__(self, source: str | GraphDef):
+    def __init__(self, source: str | GraphDef, **options):
         if isinstance(source, str):
             graph_def = load_graph(source)
         else:
             graph_def = source
-        super().__init__(graph_def)
+        super().__init__(graph_def, **options)
@@ -17,16 +17,23 @@ Usage (programmatic):
 """
 
 from src.graph.schema import (
+    ContextBudget,
     ContextPolicy,
     EdgeDef,
     ExpandMode,
     GraphDef,
+    HedgePolicy,
     LLMCallDef,
     NodeDef,
+    RetryPolicy,
 )
 from src.graph.envelope import TaskEnvelope, TaskState
 from src.graph.loader import load_graph, parse_graph
 from src.graph.executor import GraphExecutor
+from src.graph.async_executor import AsyncGraphExecutor
+from src.graph.limits import ConcurrencyLimiter
+from src.graph.resilience import LatencyTracker
+from src.graph.store import RunStore
 
 from src.agent import Agent
 from src.backends import Backend
@@ -58,6 +65,7 @@ def pipeline(agents: list[Agent]) -> GraphExecutor:
             model=agent.model,
             full_auto=agent.full_auto,
             instruction=agent.instruction,
+            fallbacks=list(agent.fallbacks),
         )
 
     # _input -> first agent
@@ -109,6 +117,7 @@ def parallel(
             model=agent.model,
             full_auto=agent.full_auto,
             instruction=agent.instruction,
+            fallbacks=list(agent.fallbacks),
         )
         edges.append(EdgeDef(source="_input", target=agent.name))
 
@@ -124,6 +133,7 @@ def parallel(
             model=synthesizer.model,
             full_auto=synthesizer.full_auto,
             instruction=synthesizer.instruction,
+            fallbacks=list(synthesizer.fallbacks),
         )
         for agent in workers:
             edges.append(EdgeDef(
@@ -143,6 +153,7 @@ def parallel(
 def plan_execute(
     executor_agent: Agent,
     planning_backend: str = "codex",
+    context_budget: ContextBudget | None = None,
 ) -> GraphExecutor:
     """Build a plan-execute graph with dynamic expansion.
 
@@ -152,6 +163,9 @@ def plan_execute(
     Args:
         executor_agent: Agent that executes each subtask.
         planning_backend: Backend for the planning LLM call.
+        context_budget: Optional cap on the accumulated context; with
+                        strategy "summarize", older steps are summarized
+                        in the background once it is exceeded.
 
     Returns:
         GraphExecutor ready to run.
@@ -182,6 +196,7 @@ def plan_execute(
             model=executor_agent.model,
             full_auto=executor_agent.full_auto,
             instruction=executor_agent.instruction,
+            fallbacks=list(executor_agent.fallbacks),
         ),
     }
 
@@ -191,6 +206,7 @@ def plan_execute(
             source="planner",
             target="executor",
             context_policy=ContextPolicy.ACCUMULATE,
+            budget=context_budget,
         ),
         EdgeDef(source="executor", target="_output"),
     ]
@@ -205,7 +221,10 @@ __all__ = [
     "NodeDef",
     "EdgeDef",
     "LLMCallDef",
+    "RetryPolicy",
+    "HedgePolicy",
     "ContextPolicy",
+    "ContextBudget",
     "ExpandMode",
     # A2A envelope
     "TaskEnvelope",
@@ -215,6 +234,10 @@ __all__ = [
     "parse_graph",
     # Execution
     "GraphExecutor",
+    "AsyncGraphExecutor",
+    "ConcurrencyLimiter",
+    "LatencyTracker",
+    "RunStore",
     # Factory functions
     "pipeline",
     "parallel",
@@ -0,0 +1,335 @@
+"""
+Asyncio graph executor.
+
+Same scheduling semantics as GraphExecutor (dataflow ready queue,
+context policies, dynamic expansion, concurrency limits), but every
+backend call is an asyncio subprocess, so one event loop can drive
+hundreds of in-flight agent calls without an OS thread per call.
+"""
+
+import asyncio
+import time
+import uuid
+
+from src.agent import AgentResult
+from src.backends import acall as backend_acall
+from src.base import CoordinatorResult
+from src.context import ContextRope, completed_step
+from src.logging import StepLogger
+from src.graph.compaction import (
+    AsyncChainCompactor,
+    SummaryCall,
+    asummary_call,
+    calls_llm,
+)
+from src.graph.envelope import TaskEnvelope
+from src.graph.executor import (
+    GraphExecutor,
+    _Deadline,
+    _StepCounter,
+    _build_context,
+    _chain_compactor,
+    _expansion_target,
+    _get_upstream_envelopes,
+    _item_envelopes,
+    _make_envelope,
+    _next_context,
+    _node_children,
+    _node_deps,
+    _node_to_agent,
+    _parallel_groups,
+    _settle,
+    _topo_sort,
+)
+from src.graph.limits import AsyncConcurrencyLimiter, SlotCancelled
+from src.graph.resilience import acall_node
+from src.graph.schema import ExpandMode, NodeDef
+from src.graph.transforms import get_transform
+
+
+class AsyncGraphExecutor(GraphExecutor):
+    """Execute an agent graph on a single asyncio event loop.
+
+    Usage:
+        executor = AsyncGraphExecutor(graph, max_workers=200)
+        result = await executor.arun("Your task here")
+
+        # Or from synchronous code:
+        result = executor.run("Your task here")
+    """
+
+    async def arun(self, task: str) -> CoordinatorResult:
+        """Async public interface — records elapsed time like run()."""
+        start = time.time()
+        result = await self._arun(task)
+        result.elapsed = time.time() - start
+        return result
+
+    async def aresume(self, context_id: str) -> CoordinatorResult:
+        """Async counterpart of resume()."""
+        start = time.time()
+        task, completed, restored = self._load_checkpoint(context_id)
+        result = await self._aexecute(task, context_id, completed, restored)
+        result.steps[:0] = restored
+        result.elapsed = time.time() - start
+        return result
+
+    def resume(self, context_id: str) -> CoordinatorResult:
+        return asyncio.run(self.aresume(context_id))
+
+    def _run(self, task: str) -> CoordinatorResult:
+        return asyncio.run(self._arun(task))
+
+    async def _arun(self, task: str) -> CoordinatorResult:
+        return await self._aexecute(task, uuid.uuid4().hex[:12], {})
+
+    async def _aexecute(
+        self,
+        task: str,
+        context_id: str,
+        completed: dict[str, list[TaskEnvelope]],
+        restored: list[AgentResult] | None = None,
+    ) -> CoordinatorResult:
+        """Execute the graph with an asyncio dataflow scheduler."""
+        log = StepLogger(self.name)
+        steps: list[AgentResult] = []
+
+        order = _topo_sort(self.graph)
+        groups = _parallel_groups(self.graph, order)
+        log.info(f"execution plan: {' -> '.join([str(g) for g in groups])}")
+        if self.store:
+            self.store.start_run(context_id, task, self.graph.name)
+            log.info(f"checkpointing run {context_id!r}")
+        self._start_trace(task, context_id, restored)
+
+        total = len(order)
+        counter = _StepCounter()
+        failed = False
+        limiter = AsyncConcurrencyLimiter(self.max_workers, self.backend_limits)
+        deadline = _Deadline(self.timeout)
+        cancel = asyncio.Event()
+
+        pending = {
+            nid: len(_node_deps(self.graph, nid) - completed.keys())
+            for nid in order if nid not in completed
+        }
+        ready = [nid for nid in pending if pending[nid] == 0]
+
+        async def run_node(
+            nid: str,
+        ) -> tuple[list[TaskEnvelope], list[AgentResult]]:
+            node = self.graph.nodes[nid]
+            upstream_envelopes = _get_upstream_envelopes(
+                self.graph, nid, task, context_id, completed,
+            )
+
+            if node.type == "dynamic":
+                expanded = await self._arun_dynamic(
+                    node, task, context_id, log, limiter, deadline, cancel,
+                )
+                return expanded, [e.result for e in expanded if e.result]
+
+            upstream = self.graph.upstream(nid)
+            budgets = [node.context_budget, *(e.budget for e in upstream)]
+            if calls_llm(budgets):
+                # Summarizing compaction makes a blocking backend call
+                context = await asyncio.to_thread(
+                    _build_context, upstream, completed, node.context_budget,
+                    summarize=_summary_on_loop(limiter, deadline, cancel),
+                )
+            else:
+                context = _build_context(
+                    upstream, completed, node.context_budget,
+                )
+            step = counter.next()
+            log.start(step, total, nid)
+
+            result = await acall_node(
+                node, _node_to_agent(node, self.cache), task, context,
+                label=nid, log=log, limiter=limiter, deadline=deadline,
+                cancel=cancel, latencies=self.latencies,
+            )
+            result.step_label = nid
+
+            env = _make_envelope(
+                context_id, task, context, nid, upstream_envelopes,
+            )
+            if result.error:
+                log.error(step, total, nid, result.error)
+            else:
+                log.done(step, total, nid, len(result.output))
+            _settle(env, result)
+            return [env], [result]
+
+        running = {asyncio.create_task(run_node(nid)): nid for nid in ready}
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED,
+                )
+                for t in done:
+                    nid = running.pop(t)
+                    envelopes, results = t.result()
+                    completed[nid] = envelopes
+                    steps.extend(results)
+
+                    node = self.graph.nodes[nid]
+                    if node.type != "dynamic" and any(r.error for r in results):
+                        if not failed and running:
+                            log.info(
+                                f"{nid!r} failed — cancelling "
+                                f"{len(running)} running node(s)"
+                            )
+                        failed = True
+                        cancel.set()
+                    if not failed:
+                        for child in _node_children(self.graph, nid):
+                            pending[child] -= 1
+                            if pending[child] == 0:
+                                running[asyncio.create_task(run_node(child))] = child
+
+                    # Serialising envelopes and steps parses session files;
+                    # the store and the trace sink do it on their writer threads.
+                    if self.store:
+                        self.store.save_node_later(context_id, nid, envelopes)
+                    if self.trace_sink:
+                        self.trace_sink.write(results)
+        finally:
+            if self.store:
+                await asyncio.to_thread(self.store.flush)
+            if self.trace_sink:
+                await asyncio.to_thread(self.trace_sink.finish)
+        return CoordinatorResult(
+            steps=steps,
+            metadata={
+                "pattern": "graph",
+                "graph_name": self.graph.name,
+                "context_id": context_id,
+            },
+        )
+
+    async def _arun_dynamic(
+        self,
+        node: NodeDef,
+        task: str,
+        context_id: str,
+        log: StepLogger,
+        limiter: AsyncConcurrencyLimiter,
+        deadline: _Deadline,
+        cancel: asyncio.Event,
+    ) -> list[TaskEnvelope]:
+        """Async variant of _run_dynamic."""
+        llm = node.llm_call
+        prompt = llm.prompt.replace("{{task}}", task)
+
+        log.info(f"dynamic node {node.id!r}: calling LLM...")
+        try:
+            async with limiter.slot(llm.backend, cancel):
+                resp = await backend_acall(
+                    prompt,
+                    backend=llm.backend,
+                    model=llm.model,
+                    full_auto=llm.full_auto,
+                    timeout=deadline.clamp(llm.timeout),
+                    cancel=cancel,
+                )
+        except SlotCancelled:
+            log.info(f"dynamic node {node.id!r}: cancelled before its call")
+            return []
+
+        transform = get_transform(node.transform or "parse_list")
+        items = transform(resp.text)
+        log.info(f"dynamic node {node.id!r}: expanded to {len(items)} items")
+
+        target_id, edge_policy = _expansion_target(self.graph, node.id)
+        if target_id is None:
+            return _item_envelopes(items, context_id, node.id)
+
+        target_node = self.graph.nodes[target_id]
+        agent = _node_to_agent(target_node, self.cache)
+
+        envelopes: list[TaskEnvelope] = []
+        context = ContextRope()
+        chain = _chain_compactor(
+            AsyncChainCompactor, self.graph, node.id, edge_policy, log, cancel,
+            limiter, deadline,
+        )
+
+        if node.expand == ExpandMode.SEQUENTIAL:
+            for i, item in enumerate(items):
+                log.start(i + 1, len(items), f"{target_id} ({item[:50]})")
+                result = await acall_node(
+                    target_node, agent, item, context,
+                    label=f"{target_id}-{i+1}", log=log, limiter=limiter,
+                    deadline=deadline, cancel=cancel, latencies=self.latencies,
+                )
+                result.step_label = f"{target_id}-{i+1}"
+
+                env = TaskEnvelope(
+                    context_id=context_id,
+                    task=item,
+                    context=context,
+                    node_id=target_id,
+                )
+                _settle(env, result)
+                envelopes.append(env)
+
+                if result.error:
+                    log.error(i + 1, len(items), target_id, result.error)
+                    break
+
+                log.done(i + 1, len(items), target_id, len(result.output))
+                if chain is not None:
+                    context = await chain.append(
+                        completed_step(item, result.output),
+                    )
+                else:
+                    context = _next_context(
+                        context, edge_policy, item, result.output,
+                    )
+
+        elif node.expand == ExpandMode.PARALLEL:
+            async def run_item(item: str, idx: int) -> TaskEnvelope:
+                r = await acall_node(
+                    target_node, agent, item, "",
+                    label=f"{target_id}-{idx+1}", log=log, limiter=limiter,
+                    deadline=deadline, cancel=cancel, latencies=self.latencies,
+                )
+                r.step_label = f"{target_id}-{idx+1}"
+                e = TaskEnvelope(
+                    context_id=context_id, task=item, node_id=target_id,
+                )
+                _settle(e, r)
+                return e
+
+            tasks = [
+                asyncio.create_task(run_item(item, i))
+                for i, item in enumerate(items)
+            ]
+            for fut in asyncio.as_completed(tasks):
+                envelopes.append(await fut)
+
+        if chain is not None:
+            chain.close()
+        return envelopes
+
+
+def _summary_on_loop(
+    limiter: AsyncConcurrencyLimiter, deadline: _Deadline, cancel: asyncio.Event,
+) -> SummaryCall:
+    """A SummaryCall for a worker thread that makes the call on this loop.
+
+    The limiter and cancel event belong to the loop, so the thread only
+    waits for the result.
+    """
+    loop = asyncio.get_running_loop()
+
+    def call(llm, prompt):
+        return asyncio.run_coroutine_threadsafe(
+            asummary_call(
+                llm, prompt, limiter=limiter, deadline=deadline, cancel=cancel,
+            ),
+            loop,
+        ).result()
+
+    return call
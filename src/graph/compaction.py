@@ -0,0 +1,418 @@
+"""
+Token-budgeted context compaction.
+
+_build_context assembles a node's context from labelled upstream parts;
+when an edge or node has a ContextBudget and the parts are estimated to
+exceed it, a compaction strategy from COMPACTORS shrinks them:
+
+    tail       keep the end of the context
+    head       keep the start of the context
+    latest     keep the newest `keep` upstream outputs that fit
+    summarize  condense older outputs with the budget's summarizer call
+
+Strategies take (parts, budget, sep) and return the parts to join with
+`sep`; register custom ones by adding them to COMPACTORS. The executors
+bind "summarize" to a SummaryCall made with summary_call, so its
+backend call shares the run's limiter, deadline and cancel event.
+
+Sequential accumulate chains (dynamic nodes with expand: sequential) use
+ChainCompactor instead, which summarizes older steps in the background
+while the next step runs.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Iterable
+
+from src.backends import ErrorKind, LLMResponse
+from src.backends import acall as backend_acall
+from src.backends import call as backend_call
+from src.context import Context, ContextRope
+from src.graph.limits import (
+    AsyncConcurrencyLimiter,
+    ConcurrencyLimiter,
+    SlotCancelled,
+)
+from src.graph.resilience import _ALinkedEvent, _LinkedEvent
+from src.graph.schema import ContextBudget, LLMCallDef
+from src.logging import StepLogger
+
+if TYPE_CHECKING:
+    from src.graph.executor import _Deadline
+
+# Rough average for English prose and code across the supported models
+CHARS_PER_TOKEN = 4
+
+TRUNCATED = "[... truncated ...]"
+SUMMARY_HEADER = "Summary of earlier results:\n"
+
+DEFAULT_SUMMARY_PROMPT = (
+    "Summarize the following results from earlier steps so that a later "
+    "step can rely on the summary alone. Keep facts, decisions, numbers "
+    "and open issues; drop repetition. Use at most {{max_tokens}} tokens."
+    "\n\n{{context}}"
+)
+
+
+# Makes one summarizer call: (llm, prompt) -> response
+SummaryCall = Callable[[LLMCallDef, str], LLMResponse]
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate (no tokenizer): ~CHARS_PER_TOKEN chars each."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def compact(
+    parts: list[Context],
+    budget: ContextBudget | None,
+    sep: str,
+    *,
+    summarize: SummaryCall | None = None,
+) -> list[Context]:
+    """Return `parts` unchanged if they fit `budget`, else compacted.
+
+    Parts may be ropes; they are materialized only when compaction runs.
+    `summarize` makes the "summarize" strategy's backend call.
+    """
+    if budget is None or _fits(parts, budget.max_tokens, sep):
+        return parts
+    compactor = get_compactor(budget.strategy)
+    if budget.strategy == "summarize" and summarize is not None:
+        compactor = partial(compactor, call=summarize)
+    return compactor([str(p) for p in parts], budget, sep)
+
+
+def summary_call(
+    llm: LLMCallDef,
+    prompt: str,
+    *,
+    limiter: ConcurrencyLimiter | None = None,
+    deadline: "_Deadline | None" = None,
+    cancel: threading.Event | None = None,
+) -> LLMResponse:
+    """One summarizer call, made like any other call of a graph run.
+
+    It holds a `limiter` slot for its backend, its timeout is clamped to
+    the run's `deadline`, and setting `cancel` kills it.
+    """
+    try:
+        with limiter.slot(llm.backend, cancel) if limiter else nullcontext():
+            return backend_call(
+                prompt,
+                backend=llm.backend,
+                model=llm.model,
+                full_auto=llm.full_auto,
+                timeout=deadline.clamp(llm.timeout) if deadline else llm.timeout,
+                cancel=cancel,
+            )
+    except SlotCancelled:
+        return _cancelled(llm)
+
+
+async def asummary_call(
+    llm: LLMCallDef,
+    prompt: str,
+    *,
+    limiter: AsyncConcurrencyLimiter | None = None,
+    deadline: "_Deadline | None" = None,
+    cancel: asyncio.Event | None = None,
+) -> LLMResponse:
+    """Async counterpart of summary_call()."""
+    try:
+        async with limiter.slot(llm.backend, cancel) if limiter else nullcontext():
+            return await backend_acall(
+                prompt,
+                backend=llm.backend,
+                model=llm.model,
+                full_auto=llm.full_auto,
+                timeout=deadline.clamp(llm.timeout) if deadline else llm.timeout,
+                cancel=cancel,
+            )
+    except SlotCancelled:
+        return _cancelled(llm)
+
+
+def _cancelled(llm: LLMCallDef) -> LLMResponse:
+    return LLMResponse(
+        text="",
+        error="summarizer cancelled while waiting for a slot",
+        backend=llm.backend,
+        model=llm.model,
+        error_kind=ErrorKind.CANCELLED,
+    )
+
+
+def calls_llm(budgets: Iterable[ContextBudget | None]) -> bool:
+    """True if compacting to any of `budgets` may make a backend call."""
+    return any(b is not None and b.strategy == "summarize" for b in budgets)
+
+
+def _joined_chars(parts: list[Context], sep: str) -> int:
+    return sum(map(len, parts)) + len(sep) * max(len(parts) - 1, 0)
+
+
+def _fits(parts: list[Context], max_tokens: int, sep: str) -> bool:
+    return _joined_chars(parts, sep) <= max_tokens * CHARS_PER_TOKEN
+
+
+def _tail(parts: list[str], budget: ContextBudget, sep: str) -> list[str]:
+    chars = budget.max_tokens * CHARS_PER_TOKEN - len(TRUNCATED) - 1
+    if chars <= 0:
+        return []
+    return [f"{TRUNCATED}\n{sep.join(parts)[-chars:]}"]
+
+
+def _head(parts: list[str], budget: ContextBudget, sep: str) -> list[str]:
+    chars = budget.max_tokens * CHARS_PER_TOKEN - len(TRUNCATED) - 1
+    if chars <= 0:
+        return []
+    return [f"{sep.join(parts)[:chars]}\n{TRUNCATED}"]
+
+
+def _latest(parts: list[str], budget: ContextBudget, sep: str) -> list[str]:
+    """The newest `keep` parts that fit; the tail of the newest if none do."""
+    kept = _newest_fitting(parts[-budget.keep:] if budget.keep else parts,
+                           budget.max_tokens, sep)
+    return kept or _tail(parts[-1:], budget, sep)
+
+
+def _summarize(
+    parts: list[str],
+    budget: ContextBudget,
+    sep: str,
+    *,
+    call: SummaryCall = summary_call,
+) -> list[str]:
+    """Keep the newest parts within half the budget; summarize the rest.
+
+    Falls back to tail truncation when the summarizer call fails.
+    """
+    kept = _newest_fitting(parts, budget.max_tokens // 2, sep)
+    older = parts[:len(parts) - len(kept)]
+    room = budget.max_tokens - estimate_tokens(
+        SUMMARY_HEADER + sep.join([""] + kept),
+    )
+    llm = budget.summarizer
+    if llm is None or room <= 0:
+        return _tail(parts, budget, sep)
+    resp = call(llm, _summary_prompt(llm, sep.join(older), room))
+    if resp.error or not resp.text:
+        return _tail(parts, budget, sep)
+    result = [SUMMARY_HEADER + resp.text, *kept]
+    return result if _fits(result, budget.max_tokens, sep) else _tail(result, budget, sep)
+
+
+def _summary_prompt(llm: LLMCallDef, context: str, max_tokens: int) -> str:
+    prompt = llm.prompt or DEFAULT_SUMMARY_PROMPT
+    prompt = prompt.replace("{{max_tokens}}", str(max_tokens))
+    return prompt.replace("{{context}}", context)
+
+
+def _newest_fitting(parts: list[Context], max_tokens: int, sep: str) -> list[Context]:
+    """The longest suffix of `parts` that fits in `max_tokens`."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    used, start = 0, len(parts)
+    while start > 0:
+        cost = len(parts[start - 1]) + (len(sep) if start < len(parts) else 0)
+        if used + cost > limit:
+            break
+        used += cost
+        start -= 1
+    return parts[start:]
+
+
+# Registry of available compaction strategies
+COMPACTORS: dict[str, Callable[[list[str], ContextBudget, str], list[str]]] = {
+    "tail": _tail,
+    "head": _head,
+    "latest": _latest,
+    "summarize": _summarize,
+}
+
+
+def get_compactor(name: str) -> Callable[[list[str], ContextBudget, str], list[str]]:
+    """Look up a compaction strategy by name."""
+    if name not in COMPACTORS:
+        raise ValueError(
+            f"Unknown compaction strategy: {name!r}. "
+            f"Available: {list(COMPACTORS.keys())}"
+        )
+    return COMPACTORS[name]
+
+
+class ChainCompactor:
+    """Keeps a sequential accumulate chain's context within a budget.
+
+    Each finished step appends its segment. With the "summarize"
+    strategy, crossing budget.max_tokens starts a summarizer call for all
+    but the newest segments (those within half the budget), asking for
+    at most a quarter of the budget. The next step runs on the full
+    history meanwhile; once the summary lands it replaces the segments
+    it covers; if the summarizer fails, the history is cut to its tail
+    instead. A step only waits for an in-flight summary if the context
+    has reached twice the budget. Other strategies, and "summarize"
+    without a summarizer, compact synchronously and keep only the
+    compacted result. Summarizer calls hold a `limiter` slot and stop at
+    the run's `deadline`.
+    """
+
+    def __init__(
+        self,
+        budget: ContextBudget,
+        *,
+        log: StepLogger | None = None,
+        cancel: threading.Event | None = None,
+        limiter: ConcurrencyLimiter | None = None,
+        deadline: "_Deadline | None" = None,
+    ):
+        self.budget = budget
+        self.log = log
+        self.limiter = limiter
+        self.deadline = deadline
+        # Summaries applied so far
+        self.summaries = 0
+        self._summary = ""
+        self._segments: list[Context] = []
+        self._rope = ContextRope()
+        self._pending: tuple[Future, int] | None = None
+        self._pool: ThreadPoolExecutor | None = None
+        self._stop = _LinkedEvent(cancel) if cancel else threading.Event()
+
+    def append(self, segment: Context) -> ContextRope:
+        """Add a finished step's segment; return the next step's context."""
+        self._add(segment)
+        if not self._summarizes():
+            return self._compacted()
+        if self._pending is not None:
+            future, covered = self._pending
+            if future.done() or self._over(2):
+                self._apply(future.result(), covered)
+        if self._pending is None and self._over(1):
+            request = self._request()
+            if request is not None:
+                prompt, covered = request
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=1)
+                self._pending = (self._pool.submit(self._call, prompt), covered)
+        return self._rope
+
+    def close(self) -> None:
+        """Cancel any in-flight summary once the chain is done."""
+        self._stop.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    def _call(self, prompt: str) -> LLMResponse:
+        return summary_call(
+            self.budget.summarizer, prompt,
+            limiter=self.limiter, deadline=self.deadline, cancel=self._stop,
+        )
+
+    def _summarizes(self) -> bool:
+        return (
+            self.budget.strategy == "summarize"
+            and self.budget.summarizer is not None
+        )
+
+    def _add(self, segment: Context) -> None:
+        self._segments.append(segment)
+        self._rope = self._rope.append(segment)
+
+    def _over(self, factor: int) -> bool:
+        return len(self._rope) > self.budget.max_tokens * factor * CHARS_PER_TOKEN
+
+    def _compacted(self) -> ContextRope:
+        """Compact in place, so later steps start from the result."""
+        if self._over(1):
+            self._segments = compact(self._segments, self.budget, "")
+            self._rope = ContextRope("".join(self._segments))
+        return self._rope
+
+    def _request(self) -> tuple[str, int] | None:
+        """Summary prompt for the older segments, and how many it covers."""
+        kept = _newest_fitting(self._segments, self.budget.max_tokens // 2, "")
+        covered = len(self._segments) - len(kept)
+        if covered == 0:
+            return None
+        older = self._summary + "".join(map(str, self._segments[:covered]))
+        prompt = _summary_prompt(
+            self.budget.summarizer, older.strip(), self.budget.max_tokens // 4,
+        )
+        return prompt, covered
+
+    def _apply(self, resp: LLMResponse, covered: int) -> None:
+        """Swap the covered segments for a finished summary."""
+        self._pending = None
+        if resp.error or not resp.text:
+            if self.log:
+                self.log.info(f"summarizer failed, truncating history: {resp.error}")
+            self._truncate()
+            return
+        self._summary = f"\n\n{SUMMARY_HEADER}{resp.text}"
+        self._segments = self._segments[covered:]
+        rope = ContextRope(self._summary)
+        for segment in self._segments:
+            rope = rope.append(segment)
+        self._rope = rope
+        self.summaries += 1
+        if self.log:
+            self.log.info(
+                f"summarized {covered} earlier steps "
+                f"(~{estimate_tokens(self._summary)} tokens)"
+            )
+
+
+    def _truncate(self) -> None:
+        """Keep the tail of the history, as _summarize does on failure."""
+        if self._over(1):
+            self._summary = ""
+            self._segments = _tail([str(self._rope)], self.budget, "")
+            self._rope = ContextRope("".join(self._segments))
+
+
+class AsyncChainCompactor(ChainCompactor):
+    """ChainCompactor for the asyncio executor; summaries run as tasks."""
+
+    def __init__(
+        self,
+        budget: ContextBudget,
+        *,
+        log: StepLogger | None = None,
+        cancel: asyncio.Event | None = None,
+        limiter: AsyncConcurrencyLimiter | None = None,
+        deadline: "_Deadline | None" = None,
+    ):
+        super().__init__(budget, log=log, deadline=deadline)
+        self.limiter = limiter
+        self._stop = _ALinkedEvent(cancel) if cancel else asyncio.Event()
+        self._task: tuple[asyncio.Task, int] | None = None
+
+    async def append(self, segment: Context) -> ContextRope:
+        """Add a finished step's segment; return the next step's context."""
+        self._add(segment)
+        if not self._summarizes():
+            return self._compacted()
+        if self._task is not None:
+            task, covered = self._task
+            if task.done() or self._over(2):
+                self._task = None
+                self._apply(await task, covered)
+        if self._task is None and self._over(1):
+            request = self._request()
+            if request is not None:
+                prompt, covered = request
+                self._task = (asyncio.create_task(self._acall(prompt)), covered)
+        return self._rope
+
+    def close(self) -> None:
+        self._stop.set()
+
+    async def _acall(self, prompt: str) -> LLMResponse:
+        return await asummary_call(
+            self.budget.summarizer, prompt,
+            limiter=self.limiter, deadline=self.deadline, cancel=self._stop,
+        )
@@ -10,6 +10,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 
 from src.agent import AgentResult
+from src.context import Context
 
 
 class TaskState(str, Enum):
@@ -35,7 +36,8 @@ class TaskEnvelope:
     context_id: str = ""
     parent_task_ids: list[str] = field(default_factory=list)
     task: str = ""
-    context: str = ""
+    # Accumulated context is a ContextRope shared with sibling envelopes
+    context: Context = ""
     state: TaskState = TaskState.SUBMITTED
     node_id: str = ""
     result: AgentResult | None = None
@@ -50,3 +52,30 @@ class TaskEnvelope:
     def mark_failed(self, result: AgentResult) -> None:
         self.state = TaskState.FAILED
         self.result = result
+
+    def to_dict(self, *, ropes: bool = False) -> dict:
+        """Plain dict; `ropes` leaves contexts as ContextRopes (see RunStore)."""
+        return {
+            "task_id": self.task_id,
+            "context_id": self.context_id,
+            "parent_task_ids": self.parent_task_ids,
+            "task": self.task,
+            "context": self.context if ropes else str(self.context),
+            "state": self.state.value,
+            "node_id": self.node_id,
+            "result": self.result.to_dict(ropes=ropes) if self.result else None,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "TaskEnvelope":
+        result = d.get("result")
+        return cls(
+            task_id=d["task_id"],
+            context_id=d.get("context_id", ""),
+            parent_task_ids=d.get("parent_task_ids", []),
+            task=d.get("task", ""),
+            context=d.get("context", ""),
+            state=TaskState(d.get("state", TaskState.SUBMITTED.value)),
+            node_id=d.get("node_id", ""),
+            result=AgentResult.from_dict(result) if result else None,
+        )
@@ -1,20 +1,48 @@
 """
 Graph executor — the single engine for all coordination patterns.
 
-Executes a GraphDef by topologically sorting nodes, running them
-with the appropriate context policies, and handling dynamic expansion.
+Executes a GraphDef by scheduling each node as soon as its upstream
+dependencies complete, running them with the appropriate context
+policies, and handling dynamic expansion.
 """
 
+import heapq
+import threading
+import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from functools import partial
 
 from src.agent import Agent, AgentResult
 from src.backends import call as backend_call
 from src.base import Coordinator, CoordinatorResult
+from src.cache import ResultCache
+from src.context import Context, ContextRope, completed_step
 from src.logging import StepLogger
+from src.graph.compaction import (
+    ChainCompactor,
+    SummaryCall,
+    compact,
+    summary_call,
+)
 from src.graph.envelope import TaskEnvelope, TaskState
-from src.graph.schema import ContextPolicy, ExpandMode, GraphDef, NodeDef
+from src.graph.limits import ConcurrencyLimiter, SlotCancelled
+from src.graph.resilience import LatencyTracker, call_node
+from src.graph.store import RunStore
+from src.graph.schema import (
+    ContextBudget,
+    ContextPolicy,
+    ExpandMode,
+    GraphDef,
+    NodeDef,
+)
 from src.graph.transforms import get_transform
+from src.tracing import JsonlTraceSink
 
 
 class GraphExecutor(Coordinator):
@@ -23,123 +51,233 @@ class GraphExecutor(Coordinator):
     Supports linear pipelines, parallel fan-out/fan-in, dynamic expansion
     (plan-execute), and any combination thereof — all driven by a single
     declarative GraphDef.
+
+    Concurrency is bounded by a run-wide worker budget and optional
+    per-backend limits, taken from the graph definition unless
+    overridden here. When a ResultCache is given, nodes that have not
+    opted out (`cache: false`) are served from it on identical prompts.
+    When a RunStore is given, every finished node is checkpointed so a
+    failed run can be continued with resume(context_id). When a
+    JsonlTraceSink is given, each node's steps are appended to it as the
+    node finishes.
+
+    Each CLI call is bounded by its node's `timeout` and by what is left
+    of the run-wide `timeout`; once any node fails, calls still in flight
+    are cancelled and their process groups killed. Nodes may retry
+    transient failures (`retry`) and hedge slow calls (`hedge`); hedge
+    delays come from latencies this executor has observed, so they
+    sharpen over repeated runs.
     """
 
-    def __init__(self, graph: GraphDef):
+    def __init__(
+        self,
+        graph: GraphDef,
+        *,
+        max_workers: int | None = None,
+        backend_limits: dict[str, int] | None = None,
+        cache: ResultCache | None = None,
+        store: RunStore | None = None,
+        timeout: float | None = None,
+        trace_sink: JsonlTraceSink | None = None,
+    ):
         super().__init__(graph.name)
         self.graph = graph
+        self.max_workers = max_workers or graph.max_workers
+        self.backend_limits = {**graph.backend_limits, **(backend_limits or {})}
+        self.cache = cache
+        self.store = store
+        self.trace_sink = trace_sink
+        self.timeout = timeout or graph.timeout
+        self.latencies = LatencyTracker()
+
+    def resume(self, context_id: str) -> CoordinatorResult:
+        """Continue a checkpointed run, executing only unfinished nodes.
+
+        Requires the executor to have been created with a RunStore.
+        Restored steps come first in the result, followed by new ones.
+        """
+        start = time.time()
+        task, completed, restored = self._load_checkpoint(context_id)
+        result = self._execute(task, context_id, completed, restored)
+        result.steps[:0] = restored
+        result.elapsed = time.time() - start
+        return result
 
     def _run(self, task: str) -> CoordinatorResult:
-        """Execute the graph with parallel group detection."""
+        return self._execute(task, uuid.uuid4().hex[:12], {})
+
+    def _execute(
+        self,
+        task: str,
+        context_id: str,
+        completed: dict[str, list[TaskEnvelope]],
+        restored: list[AgentResult] | None = None,
+    ) -> CoordinatorResult:
+        """Execute the graph with a dataflow (ready-queue) scheduler.
+
+        Each node is launched the moment its last upstream dependency
+        lands in ``completed`` — there is no barrier between topological
+        levels, so a fast branch never waits on a slow sibling. Nodes
+        already present in ``completed`` (restored checkpoints) are
+        skipped.
+        """
         log = StepLogger(self.name)
-        context_id = uuid.uuid4().hex[:12]
         steps: list[AgentResult] = []
 
         order = _topo_sort(self.graph)
         groups = _parallel_groups(self.graph, order)
         log.info(f"execution plan: {' -> '.join([str(g) for g in groups])}")
+        if self.store:
+            self.store.start_run(context_id, task, self.graph.name)
+            log.info(f"checkpointing run {context_id!r}")
+        self._start_trace(task, context_id, restored)
 
-        completed: dict[str, list[TaskEnvelope]] = {}
-        step_counter = 0
         total = len(order)
+        counter = _StepCounter()
+        limiter = ConcurrencyLimiter(self.max_workers, self.backend_limits)
+        deadline = _Deadline(self.timeout)
+        cancel = threading.Event()
         failed = False
 
-        for group in groups:
-            if failed:
-                break
-
-            if len(group) == 1:
-                node_id = group[0]
-                node = self.graph.nodes[node_id]
-
-                # Handle dynamic nodes (plan-execute pattern)
-                if node.type == "dynamic":
-                    expanded = self._run_dynamic(
-                        node, task,
-                        _get_upstream_envelopes(
-                            self.graph, node_id, task, context_id, completed,
-                        ),
-                        context_id, log,
-                    )
-                    completed[node_id] = expanded
-                    for env in expanded:
-                        if env.result:
-                            steps.append(env.result)
-                    continue
-
-                # Regular node
-                upstream_envelopes = _get_upstream_envelopes(
-                    self.graph, node_id, task, context_id, completed,
-                )
-                context = _build_context(
-                    self.graph.upstream(node_id), completed,
-                )
-
-                step_counter += 1
-                log.start(step_counter, total, node_id)
-
-                agent = _node_to_agent(node)
-                result = agent.run(task, context=context)
-                result.step_label = node_id
-                steps.append(result)
+        # Dependency counting: number of distinct upstream graph nodes
+        # that must complete before each node becomes ready.
+        pending = {
+            nid: len(_node_deps(self.graph, nid) - completed.keys())
+            for nid in order if nid not in completed
+        }
+        ready = [nid for nid in pending if pending[nid] == 0]
+
+        def run_node(nid: str) -> tuple[list[TaskEnvelope], list[AgentResult]]:
+            node = self.graph.nodes[nid]
+            upstream_envelopes = _get_upstream_envelopes(
+                self.graph, nid, task, context_id, completed,
+            )
 
-                env = _make_envelope(
-                    context_id, task, context, node_id, upstream_envelopes,
+            # Handle dynamic nodes (plan-execute pattern)
+            if node.type == "dynamic":
+                expanded = self._run_dynamic(
+                    node, task, upstream_envelopes, context_id, log, limiter,
+                    deadline, cancel,
                 )
+                return expanded, [e.result for e in expanded if e.result]
+
+            # Regular node
+            context = _build_context(
+                self.graph.upstream(nid), completed, node.context_budget,
+                summarize=partial(
+                    summary_call, limiter=limiter, deadline=deadline,
+                    cancel=cancel,
+                ),
+            )
+            step = counter.next()
+            log.start(step, total, nid)
 
-                if result.error:
-                    log.error(step_counter, total, node_id, result.error)
-                    env.mark_failed(result)
-                    completed[node_id] = [env]
-                    failed = True
-                    break
-
-                log.done(step_counter, total, node_id, len(result.output))
-                env.mark_completed(result)
-                completed[node_id] = [env]
+            result = call_node(
+                node, _node_to_agent(node, self.cache), task, context,
+                label=nid, log=log, limiter=limiter, deadline=deadline,
+                cancel=cancel, latencies=self.latencies,
+            )
+            result.step_label = nid
 
+            env = _make_envelope(
+                context_id, task, context, nid, upstream_envelopes,
+            )
+            if result.error:
+                log.error(step, total, nid, result.error)
             else:
-                # Parallel group — run concurrently
-                log.info(f"parallel group: {group}")
-
-                def run_node(nid: str) -> tuple[str, AgentResult, TaskEnvelope]:
-                    n = self.graph.nodes[nid]
-                    ue = _get_upstream_envelopes(
-                        self.graph, nid, task, context_id, completed,
-                    )
-                    ctx = _build_context(self.graph.upstream(nid), completed)
-                    a = _node_to_agent(n)
-                    r = a.run(task, context=ctx)
-                    r.step_label = nid
-                    e = _make_envelope(context_id, task, ctx, nid, ue)
-                    if r.error:
-                        e.mark_failed(r)
-                    else:
-                        e.mark_completed(r)
-                    return nid, r, e
-
-                with ThreadPoolExecutor(max_workers=len(group)) as pool:
-                    futures = {
-                        pool.submit(run_node, nid): nid for nid in group
-                    }
-                    for future in as_completed(futures):
-                        nid, result, env = future.result()
-                        step_counter += 1
-                        steps.append(result)
-                        completed[nid] = [env]
-
-                        if result.error:
-                            log.error(step_counter, total, nid, result.error)
+                log.done(step, total, nid, len(result.output))
+            _settle(env, result)
+            return [env], [result]
+
+        try:
+            with ThreadPoolExecutor(max_workers=limiter.pool_size(total)) as pool:
+                running = {pool.submit(run_node, nid): nid for nid in ready}
+
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        nid = running.pop(future)
+                        envelopes, results = future.result()
+                        completed[nid] = envelopes
+                        steps.extend(results)
+
+                        node = self.graph.nodes[nid]
+                        if node.type != "dynamic" and any(r.error for r in results):
+                            if not failed and running:
+                                log.info(
+                                    f"{nid!r} failed — cancelling "
+                                    f"{len(running)} running node(s)"
+                                )
                             failed = True
-                        else:
-                            log.done(
-                                step_counter, total, nid, len(result.output),
-                            )
-
+                            cancel.set()
+                        if not failed:
+                            for child in _node_children(self.graph, nid):
+                                pending[child] -= 1
+                                if pending[child] == 0:
+                                    running[pool.submit(run_node, child)] = child
+
+                        # Serialising envelopes and steps parses session files;
+                        # the store and the trace sink do it on their writer threads.
+                        if self.store:
+                            self.store.save_node_later(context_id, nid, envelopes)
+                        if self.trace_sink:
+                            self.trace_sink.write(results)
+        finally:
+            if self.store:
+                self.store.flush()
+            if self.trace_sink:
+                self.trace_sink.finish()
         return CoordinatorResult(
             steps=steps,
-            metadata={"pattern": "graph", "graph_name": self.graph.name},
+            metadata={
+                "pattern": "graph",
+                "graph_name": self.graph.name,
+                "context_id": context_id,
+            },
+        )
+
+    def _start_trace(
+        self, task: str, context_id: str, restored: list[AgentResult] | None,
+    ) -> None:
+        """Open the trace sink for a run, writing any restored steps first."""
+        if self.trace_sink is None:
+            return
+        self.trace_sink.start(
+            task, pattern="graph",
+            graph_name=self.graph.name, context_id=context_id,
         )
+        self.trace_sink.write(restored or [])
+
+    def _load_checkpoint(
+        self, context_id: str,
+    ) -> tuple[str, dict[str, list[TaskEnvelope]], list[AgentResult]]:
+        """Reload a run's task and the nodes that can be reused.
+
+        A node is reused only if all of its envelopes completed and every
+        upstream node is reused too — anything downstream of a failed or
+        missing node is executed again.
+
+        Returns:
+            (task, completed envelopes by node, restored steps in order)
+        """
+        if self.store is None:
+            raise ValueError("resume() requires a GraphExecutor with a RunStore")
+        task = self.store.load_run(context_id)["task"]
+        saved = self.store.load_nodes(context_id)
+
+        completed: dict[str, list[TaskEnvelope]] = {}
+        restored: list[AgentResult] = []
+        for nid in _topo_sort(self.graph):
+            envelopes = saved.get(nid)
+            if not envelopes or any(
+                e.state != TaskState.COMPLETED for e in envelopes
+            ):
+                continue
+            if not _node_deps(self.graph, nid) <= completed.keys():
+                continue
+            completed[nid] = envelopes
+            restored.extend(e.result for e in envelopes if e.result)
+        return task, completed, restored
 
     def _run_dynamic(
         self,
@@ -148,57 +286,59 @@ class GraphExecutor(Coordinator):
         upstream_envelopes: list[TaskEnvelope],
         context_id: str,
         log: StepLogger,
+        limiter: ConcurrencyLimiter,
+        deadline: "_Deadline",
+        cancel: threading.Event,
     ) -> list[TaskEnvelope]:
         """Execute a dynamic node: LLM call -> parse -> expand downstream."""
         llm = node.llm_call
         prompt = llm.prompt.replace("{{task}}", task)
 
         log.info(f"dynamic node {node.id!r}: calling LLM...")
-        resp = backend_call(
-            prompt,
-            backend=llm.backend,
-            model=llm.model,
-            full_auto=llm.full_auto,
-        )
+        try:
+            with limiter.slot(llm.backend, cancel):
+                resp = backend_call(
+                    prompt,
+                    backend=llm.backend,
+                    model=llm.model,
+                    full_auto=llm.full_auto,
+                    timeout=deadline.clamp(llm.timeout),
+                    cancel=cancel,
+                )
+        except SlotCancelled:
+            log.info(f"dynamic node {node.id!r}: cancelled before its call")
+            return []
 
         # Apply transform
         transform = get_transform(node.transform or "parse_list")
         items = transform(resp.text)
         log.info(f"dynamic node {node.id!r}: expanded to {len(items)} items")
 
-        # Find downstream node(s) for this dynamic node
-        downstream_edges = self.graph.downstream(node.id)
-        downstream_ids = [
-            e.target for e in downstream_edges if e.target != "_output"
-        ]
-
-        if not downstream_ids:
+        # Find the downstream node this dynamic node expands into
+        target_id, edge_policy = _expansion_target(self.graph, node.id)
+        if target_id is None:
             # Dynamic node outputs directly — wrap items as envelopes
-            envelopes = []
-            for item in items:
-                env = TaskEnvelope(
-                    context_id=context_id,
-                    task=item,
-                    node_id=node.id,
-                )
-                env.state = TaskState.COMPLETED
-                envelopes.append(env)
-            return envelopes
+            return _item_envelopes(items, context_id, node.id)
 
         # Execute downstream node for each expanded item
-        target_id = downstream_ids[0]
         target_node = self.graph.nodes[target_id]
-        agent = _node_to_agent(target_node)
+        agent = _node_to_agent(target_node, self.cache)
 
-        # Determine context policy from the edge
-        edge_policy = downstream_edges[0].context_policy
         envelopes: list[TaskEnvelope] = []
-        context = ""
+        context = ContextRope()
+        chain = _chain_compactor(
+            ChainCompactor, self.graph, node.id, edge_policy, log, cancel,
+            limiter, deadline,
+        )
 
         if node.expand == ExpandMode.SEQUENTIAL:
             for i, item in enumerate(items):
                 log.start(i + 1, len(items), f"{target_id} ({item[:50]})")
-                result = agent.run(item, context=context)
+                result = call_node(
+                    target_node, agent, item, context,
+                    label=f"{target_id}-{i+1}", log=log, limiter=limiter,
+                    deadline=deadline, cancel=cancel, latencies=self.latencies,
+                )
                 result.step_label = f"{target_id}-{i+1}"
 
                 env = TaskEnvelope(
@@ -218,26 +358,29 @@ class GraphExecutor(Coordinator):
                 env.mark_completed(result)
                 envelopes.append(env)
 
-                # Update context per policy
-                if edge_policy == ContextPolicy.ACCUMULATE:
-                    context += f"\n\nCompleted: {item}\nResult: {result.output}"
-                elif edge_policy == ContextPolicy.REPLACE:
-                    context = result.output
+                if chain is not None:
+                    context = chain.append(completed_step(item, result.output))
+                else:
+                    context = _next_context(
+                        context, edge_policy, item, result.output,
+                    )
 
         elif node.expand == ExpandMode.PARALLEL:
             def run_item(item: str, idx: int):
-                r = agent.run(item, context="")
+                r = call_node(
+                    target_node, agent, item, "",
+                    label=f"{target_id}-{idx+1}", log=log, limiter=limiter,
+                    deadline=deadline, cancel=cancel, latencies=self.latencies,
+                )
                 r.step_label = f"{target_id}-{idx+1}"
                 e = TaskEnvelope(
                     context_id=context_id, task=item, node_id=target_id,
                 )
-                if r.error:
-                    e.mark_failed(r)
-                else:
-                    e.mark_completed(r)
+                _settle(e, r)
                 return e
 
-            with ThreadPoolExecutor(max_workers=len(items)) as pool:
+            pool_size = limiter.pool_size(len(items))
+            with ThreadPoolExecutor(max_workers=pool_size) as pool:
                 futures = [
                     pool.submit(run_item, item, i)
                     for i, item in enumerate(items)
@@ -245,13 +388,143 @@ class GraphExecutor(Coordinator):
                 for future in as_completed(futures):
                     envelopes.append(future.result())
 
+        if chain is not None:
+            chain.close()
         return envelopes
 
 
 # ── Helpers ──────────────────────────────────────────────────────────
 
 
-def _node_to_agent(node: NodeDef) -> Agent:
+class _StepCounter:
+    """Thread-safe step numbering for log output."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    def next(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class _Deadline:
+    """Run-wide wall-clock budget shared by every call in a run."""
+
+    def __init__(self, seconds: float | None):
+        self._at = time.monotonic() + seconds if seconds else None
+
+    def clamp(self, timeout: float | None) -> float | None:
+        """Tighten a per-call timeout to the time left in the run.
+
+        Returns None when neither limit applies; may return <= 0 once the
+        run is out of time, which makes the backend fail immediately.
+        """
+        if self._at is None:
+            return timeout
+        left = self._at - time.monotonic()
+        return left if timeout is None else min(timeout, left)
+
+
+def _node_deps(graph: GraphDef, node_id: str) -> set[str]:
+    """Distinct upstream graph nodes (excluding _input) of a node."""
+    return {
+        e.source for e in graph.upstream(node_id)
+        if e.source != "_input" and e.source in graph.nodes
+    }
+
+
+def _node_children(graph: GraphDef, node_id: str) -> list[str]:
+    """Distinct downstream graph nodes (excluding _output) of a node."""
+    children: list[str] = []
+    for e in graph.downstream(node_id):
+        if e.target in graph.nodes and e.target not in children:
+            children.append(e.target)
+    return children
+
+
+def _expansion_target(
+    graph: GraphDef, node_id: str,
+) -> tuple[str | None, ContextPolicy]:
+    """Downstream node a dynamic node expands into, and the edge policy.
+
+    Returns (None, policy) when the dynamic node feeds only _output.
+    """
+    downstream_edges = graph.downstream(node_id)
+    downstream_ids = [
+        e.target for e in downstream_edges if e.target != "_output"
+    ]
+    policy = (
+        downstream_edges[0].context_policy if downstream_edges
+        else ContextPolicy.REPLACE
+    )
+    return (downstream_ids[0] if downstream_ids else None), policy
+
+
+def _item_envelopes(
+    items: list[str], context_id: str, node_id: str,
+) -> list[TaskEnvelope]:
+    """Wrap expanded items as completed envelopes (no downstream agent)."""
+    envelopes = []
+    for item in items:
+        env = TaskEnvelope(context_id=context_id, task=item, node_id=node_id)
+        env.state = TaskState.COMPLETED
+        envelopes.append(env)
+    return envelopes
+
+
+def _chain_compactor(
+    cls: type[ChainCompactor],
+    graph: GraphDef,
+    node_id: str,
+    policy: ContextPolicy,
+    log: StepLogger,
+    cancel,
+    limiter,
+    deadline: _Deadline,
+) -> ChainCompactor | None:
+    """Compactor for a sequential accumulate expansion, if it has a budget.
+
+    The budget comes from the expansion edge, else the target node's
+    context_budget. Its summarizer calls share the run's `limiter`,
+    `deadline` and `cancel` event.
+    """
+    if policy != ContextPolicy.ACCUMULATE:
+        return None
+    edge = next(
+        (e for e in graph.downstream(node_id) if e.target != "_output"), None,
+    )
+    if edge is None:
+        return None
+    budget = edge.budget or graph.nodes[edge.target].context_budget
+    if budget is None:
+        return None
+    return cls(
+        budget, log=log, cancel=cancel, limiter=limiter, deadline=deadline,
+    )
+
+
+def _next_context(
+    context: ContextRope, policy: ContextPolicy, item: str, output: str,
+) -> ContextRope:
+    """Context for the next sequential expansion step, per edge policy."""
+    if policy == ContextPolicy.ACCUMULATE:
+        return context.append(completed_step(item, output))
+    if policy == ContextPolicy.REPLACE:
+        return ContextRope(output)
+    return context
+
+
+def _settle(env: TaskEnvelope, result: AgentResult) -> None:
+    """Mark an envelope completed or failed according to its result."""
+    if result.error:
+        env.mark_failed(result)
+    else:
+        env.mark_completed(result)
+
+
+def _node_to_agent(node: NodeDef, cache: ResultCache | None = None) -> Agent:
     """Convert a NodeDef to an Agent instance."""
     return Agent(
         name=node.id,
@@ -260,6 +533,8 @@ def _node_to_agent(node: NodeDef) -> Agent:
         full_auto=node.full_auto,
         backend=node.backend,
         model=node.model,
+        cache=cache if node.cache else None,
+        fallbacks=list(node.fallbacks),
     )
 
 
@@ -306,25 +581,35 @@ def _get_upstream_envelopes(
 def _build_context(
     edges: list,
     completed: dict[str, list[TaskEnvelope]],
-) -> str:
-    """Build context string based on edge policies."""
+    budget: ContextBudget | None = None,
+    *,
+    summarize: SummaryCall | None = None,
+) -> Context:
+    """Build context based on edge policies.
+
+    Each edge's share is compacted to the edge's budget, then the whole
+    context to `budget` (the target node's context_budget); `summarize`
+    makes the calls of the "summarize" strategy. Accumulated
+    and aggregated context is a ContextRope whose leaves are the
+    upstream output strings themselves, not copies.
+    """
     if not edges:
         return ""
 
-    # Gather upstream outputs grouped by source
-    source_outputs: dict[str, list[str]] = {}
+    # Gather upstream envelopes with output, grouped by source
+    source_envelopes: dict[str, list[TaskEnvelope]] = {}
     for edge in edges:
         if edge.source == "_input":
             continue
         if edge.source in completed:
-            outputs = []
-            for env in completed[edge.source]:
-                if env.result and env.result.output:
-                    outputs.append(env.result.output)
-            if outputs:
-                source_outputs[edge.source] = outputs
-
-    if not source_outputs:
+            envs = [
+                env for env in completed[edge.source]
+                if env.result and env.result.output
+            ]
+            if envs:
+                source_envelopes[edge.source] = envs
+
+    if not source_envelopes:
         return ""
 
     # Use the first non-_input edge's policy as representative
@@ -337,39 +622,54 @@ def _build_context(
     if policy == ContextPolicy.NONE:
         return ""
 
+    source_parts: dict[str, list[Context]] = {}
+    sep = "\n\n"
     if policy == ContextPolicy.REPLACE:
         # Use the last upstream output only
-        all_outputs = []
-        for outputs in source_outputs.values():
-            all_outputs.extend(outputs)
-        return all_outputs[-1] if all_outputs else ""
-
-    if policy == ContextPolicy.ACCUMULATE:
+        source = list(source_envelopes)[-1]
+        source_parts[source] = [source_envelopes[source][-1].result.output]
+    elif policy == ContextPolicy.ACCUMULATE:
         # Build growing context from all upstream envelopes
-        parts = []
-        for source_id, outputs in source_outputs.items():
-            if source_id in completed:
-                for env in completed[source_id]:
-                    if env.result and env.result.output:
-                        label = env.task[:80] if env.task else env.node_id
-                        parts.append(
-                            f"Completed: {label}\nResult: {env.result.output}"
-                        )
-        return "\n\n".join(parts)
-
-    if policy == ContextPolicy.AGGREGATE:
+        for source, envs in source_envelopes.items():
+            source_parts[source] = [
+                ContextRope(
+                    f"Completed: {env.task[:80] if env.task else env.node_id}\n"
+                    "Result: "
+                ).append(env.result.output)
+                for env in envs
+            ]
+    elif policy == ContextPolicy.AGGREGATE:
         # Collect all upstream outputs, joined with labels
-        all_parts = []
-        for source_id, outputs in source_outputs.items():
-            for output in outputs:
-                all_parts.append(f"[{source_id}]:\n{output}")
-        return "\n\n---\n\n".join(all_parts)
+        sep = "\n\n---\n\n"
+        for source, envs in source_envelopes.items():
+            source_parts[source] = [
+                ContextRope(f"[{source}]:\n").append(env.result.output)
+                for env in envs
+            ]
+    else:
+        return ""
 
-    return ""
+    edge_budgets = {e.source: e.budget for e in edges if e.budget is not None}
+    parts: list[Context] = []
+    for source, chunks in source_parts.items():
+        parts.extend(compact(
+            chunks, edge_budgets.get(source), sep, summarize=summarize,
+        ))
+    parts = compact(parts, budget, sep, summarize=summarize)
+    if len(parts) == 1 and isinstance(parts[0], str):
+        return parts[0]
+    context = ContextRope()
+    for i, part in enumerate(parts):
+        context = context.append(part) if i == 0 else context.append(sep).append(part)
+    return context
 
 
 def _topo_sort(graph: GraphDef) -> list[str]:
-    """Topological sort of graph nodes (Kahn's algorithm)."""
+    """Topological sort of graph nodes (Kahn's algorithm).
+
+    Ready nodes are kept in a min-heap so the order is deterministic
+    (lexicographically smallest ready node first) in O((V+E) log V).
+    """
     in_degree: dict[str, int] = {nid: 0 for nid in graph.nodes}
     adjacency: dict[str, list[str]] = {nid: [] for nid in graph.nodes}
 
@@ -378,17 +678,17 @@ def _topo_sort(graph: GraphDef) -> list[str]:
             adjacency[edge.source].append(edge.target)
             in_degree[edge.target] += 1
 
-    queue = [nid for nid in graph.nodes if in_degree[nid] == 0]
+    heap = [nid for nid in graph.nodes if in_degree[nid] == 0]
+    heapq.heapify(heap)
     order: list[str] = []
 
-    while queue:
-        queue.sort()  # Deterministic ordering
-        node = queue.pop(0)
+    while heap:
+        node = heapq.heappop(heap)
         order.append(node)
         for neighbor in adjacency[node]:
             in_degree[neighbor] -= 1
             if in_degree[neighbor] == 0:
-                queue.append(neighbor)
+                heapq.heappush(heap, neighbor)
 
     return order
 
@@ -396,31 +696,21 @@ def _topo_sort(graph: GraphDef) -> list[str]:
 def _parallel_groups(
     graph: GraphDef, order: list[str],
 ) -> list[list[str]]:
-    """Group topologically sorted nodes into parallel execution groups.
+    """Group topologically sorted nodes into dependency levels.
 
-    Nodes whose dependencies are all satisfied at the same time can run
-    concurrently.
+    A node's level is one more than the deepest of its dependencies,
+    computed in a single pass over `order`. Used for the execution-plan
+    log line; actual scheduling is dataflow driven and does not wait for
+    a whole level to finish.
     """
-    done: set[str] = set()
+    level: dict[str, int] = {}
     groups: list[list[str]] = []
-    remaining = list(order)
-
-    while remaining:
-        ready = []
-        for nid in remaining:
-            deps = {
-                e.source for e in graph.upstream(nid)
-                if e.source != "_input" and e.source in graph.nodes
-            }
-            if deps <= done:
-                ready.append(nid)
-
-        if not ready:
-            break
 
-        groups.append(ready)
-        done.update(ready)
-        for nid in ready:
-            remaining.remove(nid)
+    for nid in order:
+        lvl = max((level[d] + 1 for d in _node_deps(graph, nid)), default=0)
+        level[nid] = lvl
+        if lvl == len(groups):
+            groups.append([])
+        groups[lvl].append(nid)
 
     return groups
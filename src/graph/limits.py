@@ -0,0 +1,259 @@
+"""
+Run-wide concurrency limits for graph execution.
+
+A single ConcurrencyLimiter is created per graph run and shared by every
+node and every dynamic expansion in that run, so the total number of
+in-flight backend calls (and the number per backend CLI) stays bounded
+no matter how wide the graph or how many items a planner returns.
+
+Waiting for a slot can be cut short by the run's cancel event: slot()
+then raises SlotCancelled instead of letting a doomed call queue behind
+the ones still running.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+from src.backends import Backend
+
+# How often a queued waiter re-checks the run's cancel event.
+CANCEL_POLL = 0.05
+
+
+class SlotCancelled(Exception):
+    """The run was cancelled while a call was waiting for a slot."""
+
+
+class _FairSemaphore:
+    """Counting semaphore that grants slots in FIFO order.
+
+    threading.Semaphore wakes an arbitrary waiter; with dozens of expanded
+    items competing for a handful of slots that lets late arrivals starve
+    earlier ones. Here a released slot is handed directly to the oldest
+    waiter.
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._lock = threading.Lock()
+        self._waiters: deque[threading.Event] = deque()
+
+    def acquire(self, cancel: threading.Event | None = None) -> bool:
+        """Take a slot; False if `cancel` is set before one is granted."""
+        with self._lock:
+            if cancel is not None and cancel.is_set():
+                return False
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return True
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        if cancel is None:
+            waiter.wait()
+            return True
+        while not waiter.wait(CANCEL_POLL):
+            if cancel.is_set():
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        return False
+                # Granted between the timeout and the lock: keep it
+                break
+        return True
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free and nobody is queued for it."""
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return True
+            return False
+
+    def release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self._value += 1
+
+
+class ConcurrencyLimiter:
+    """Global worker budget plus per-backend semaphores.
+
+    Args:
+        max_workers: Maximum concurrent backend calls across the whole run
+                     (None = unlimited).
+        backend_limits: Maximum concurrent calls per backend name,
+                        e.g. {"codex": 2}. Backends not listed are only
+                        bound by max_workers.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        backend_limits: dict[str, int] | None = None,
+    ):
+        self.max_workers = max_workers
+        self.backend_limits = dict(backend_limits or {})
+        self._global = _FairSemaphore(max_workers) if max_workers else None
+        self._backends = {
+            name: _FairSemaphore(limit)
+            for name, limit in self.backend_limits.items()
+        }
+
+    def pool_size(self, wanted: int) -> int:
+        """Thread-pool size for `wanted` tasks under the global budget."""
+        if self.max_workers:
+            wanted = min(wanted, self.max_workers)
+        return max(1, wanted)
+
+    @contextmanager
+    def slot(
+        self, backend: Backend | str, cancel: threading.Event | None = None,
+    ) -> Iterator[None]:
+        """Hold one global slot and one slot for `backend` while inside.
+
+        The backend slot is taken first so that a call queued behind a
+        saturated backend does not sit on a global slot other backends
+        could use.
+
+        Raises:
+            SlotCancelled: If `cancel` is set while waiting.
+        """
+        backend_sem = self._backends.get(_backend_name(backend))
+        if backend_sem and not backend_sem.acquire(cancel):
+            raise SlotCancelled(_backend_name(backend))
+        try:
+            if self._global and not self._global.acquire(cancel):
+                raise SlotCancelled(_backend_name(backend))
+            try:
+                yield
+            finally:
+                if self._global:
+                    self._global.release()
+        finally:
+            if backend_sem:
+                backend_sem.release()
+
+    @contextmanager
+    def try_slot(self, backend: Backend | str) -> Iterator[bool]:
+        """Like slot(), but yields False instead of waiting.
+
+        Used for speculative work (hedged requests) that should only run
+        on spare capacity, never ahead of queued calls.
+        """
+        backend_sem = self._backends.get(_backend_name(backend))
+        if backend_sem and not backend_sem.try_acquire():
+            yield False
+            return
+        if self._global and not self._global.try_acquire():
+            if backend_sem:
+                backend_sem.release()
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            if self._global:
+                self._global.release()
+            if backend_sem:
+                backend_sem.release()
+
+
+class AsyncConcurrencyLimiter:
+    """asyncio counterpart of ConcurrencyLimiter.
+
+    asyncio.Semaphore already wakes waiters in FIFO order. Must be
+    created inside the event loop that uses it.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        backend_limits: dict[str, int] | None = None,
+    ):
+        self.max_workers = max_workers
+        self.backend_limits = dict(backend_limits or {})
+        self._global = asyncio.Semaphore(max_workers) if max_workers else None
+        self._backends = {
+            name: asyncio.Semaphore(limit)
+            for name, limit in self.backend_limits.items()
+        }
+
+    @asynccontextmanager
+    async def slot(
+        self, backend: Backend | str, cancel: asyncio.Event | None = None,
+    ) -> AsyncIterator[None]:
+        """Hold one global slot and one slot for `backend` while inside.
+
+        Raises:
+            SlotCancelled: If `cancel` is set while waiting.
+        """
+        backend_sem = self._backends.get(_backend_name(backend))
+        if backend_sem and not await _aacquire(backend_sem, cancel):
+            raise SlotCancelled(_backend_name(backend))
+        try:
+            if self._global and not await _aacquire(self._global, cancel):
+                raise SlotCancelled(_backend_name(backend))
+            try:
+                yield
+            finally:
+                if self._global:
+                    self._global.release()
+        finally:
+            if backend_sem:
+                backend_sem.release()
+
+    @asynccontextmanager
+    async def try_slot(self, backend: Backend | str) -> AsyncIterator[bool]:
+        """Like slot(), but yields False instead of waiting."""
+        backend_sem = self._backends.get(_backend_name(backend))
+        sems = [s for s in (backend_sem, self._global) if s]
+        if any(s.locked() for s in sems):
+            yield False
+            return
+        for sem in sems:
+            await sem.acquire()  # free and single-threaded: no suspension
+        try:
+            yield True
+        finally:
+            for sem in sems:
+                sem.release()
+
+
+async def _aacquire(sem: asyncio.Semaphore, cancel: asyncio.Event | None) -> bool:
+    """Acquire `sem`; False if `cancel` is set before it is granted."""
+    if cancel is None:
+        await sem.acquire()
+        return True
+    if cancel.is_set():
+        return False
+    if not sem.locked():
+        await sem.acquire()  # free: no suspension
+        return True
+    acquire = asyncio.create_task(sem.acquire())
+    cancelled = asyncio.create_task(cancel.wait())
+    try:
+        await asyncio.wait({acquire, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        if acquire.done() and not acquire.cancelled():
+            sem.release()
+        acquire.cancel()
+        raise
+    finally:
+        cancelled.cancel()
+    if acquire.done() and not acquire.cancelled():
+        return True  # a grant wins a tie with cancellation
+    acquire.cancel()
+    try:
+        await acquire
+    except asyncio.CancelledError:
+        return False
+    return True
+
+
+def _backend_name(backend: Backend | str) -> str:
+    return backend.value if isinstance(backend, Backend) else str(backend)
@@ -5,15 +5,22 @@ Parses YAML graph definitions into GraphDef dataclasses,
 validates references, detects cycles, and checks dynamic node config.
 """
 
+from dataclasses import fields
+
 import yaml
 
+from src.backends import REGISTRY, ErrorKind
+from src.graph.compaction import COMPACTORS
 from src.graph.schema import (
+    ContextBudget,
     ContextPolicy,
     EdgeDef,
     ExpandMode,
     GraphDef,
+    HedgePolicy,
     LLMCallDef,
     NodeDef,
+    RetryPolicy,
 )
 
 
@@ -49,7 +56,18 @@ def parse_graph(data: dict) -> GraphDef:
     for edge_data in data.get("edges", []):
         edges.append(_parse_edge(edge_data))
 
-    graph = GraphDef(name=name, nodes=nodes, edges=edges)
+    max_workers, backend_limits = _parse_concurrency(
+        data.get("concurrency") or {},
+    )
+
+    graph = GraphDef(
+        name=name,
+        nodes=nodes,
+        edges=edges,
+        max_workers=max_workers,
+        backend_limits=backend_limits,
+        timeout=_parse_timeout(data.get("timeout"), "graph"),
+    )
     _validate(graph)
     return graph
 
@@ -58,29 +76,35 @@ def _parse_node(node_id: str, data: dict) -> NodeDef:
     """Parse a single node definition."""
     llm_call = None
     if "llm_call" in data:
-        lc = data["llm_call"]
-        llm_call = LLMCallDef(
-            backend=lc.get("backend", "codex"),
-            prompt=lc.get("prompt", ""),
-            model=lc.get("model", ""),
-            full_auto=lc.get("full_auto", False),
-        )
+        llm_call = _parse_llm_call(data["llm_call"], f"{node_id}.llm_call")
 
     expand = None
     if "expand" in data:
         expand = ExpandMode(data["expand"])
 
+    backend, model, fallbacks = _parse_backends(
+        data.get("backend", "codex"), data.get("model", ""), node_id,
+    )
+
     return NodeDef(
         id=node_id,
         role=data.get("role", ""),
-        backend=data.get("backend", "codex"),
-        model=data.get("model", ""),
+        backend=backend,
+        model=model,
         full_auto=data.get("full_auto", False),
         instruction=data.get("instruction", ""),
         type=data.get("type", "agent"),
         expand=expand,
         llm_call=llm_call,
         transform=data.get("transform", ""),
+        cache=data.get("cache", True),
+        timeout=_parse_timeout(data.get("timeout"), node_id),
+        retry=_parse_retry(data.get("retry"), node_id),
+        hedge=_parse_hedge(data.get("hedge"), node_id),
+        fallbacks=fallbacks,
+        context_budget=_parse_budget(
+            data.get("context_budget"), f"{node_id}.context_budget",
+        ),
     )
 
 
@@ -91,9 +115,213 @@ def _parse_edge(data: dict) -> EdgeDef:
         source=data["from"],
         target=data["to"],
         context_policy=ContextPolicy(policy_str),
+        budget=_parse_budget(
+            data.get("budget"), f"edge {data['from']}->{data['to']}.budget",
+        ),
+    )
+
+
+def _parse_llm_call(lc: dict, where: str) -> LLMCallDef:
+    """Parse an LLM call definition (dynamic node planner or summarizer)."""
+    return LLMCallDef(
+        backend=lc.get("backend", "codex"),
+        prompt=lc.get("prompt", ""),
+        model=lc.get("model", ""),
+        full_auto=lc.get("full_auto", False),
+        timeout=_parse_timeout(lc.get("timeout"), where),
     )
 
 
+def _parse_budget(value, where: str) -> ContextBudget | None:
+    """Parse a context token budget.
+
+    Example:
+        budget: 4000                  # shorthand for max_tokens, tail strategy
+        budget:
+          max_tokens: 4000
+          strategy: summarize         # tail | head | latest | summarize
+          summarizer: {backend: gemini, model: gemini-2.5-flash}
+    """
+    if value is None:
+        return None
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = {"max_tokens": value}
+    if not isinstance(value, dict):
+        raise ValueError(f"{where} must be an integer or a mapping")
+    unknown = set(value) - {f.name for f in fields(ContextBudget)}
+    if unknown:
+        raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+    if "max_tokens" not in value:
+        raise ValueError(f"{where}: max_tokens is required")
+    value = dict(value)
+    if value.get("summarizer") is not None:
+        value["summarizer"] = _parse_llm_call(
+            value["summarizer"], f"{where}.summarizer",
+        )
+    budget = ContextBudget(**value)
+    if not isinstance(budget.max_tokens, int) or budget.max_tokens < 1:
+        raise ValueError(f"{where}.max_tokens must be a positive integer")
+    if budget.strategy not in COMPACTORS:
+        raise ValueError(
+            f"{where}.strategy: {budget.strategy!r} not in {sorted(COMPACTORS)}"
+        )
+    if budget.keep is not None and (not isinstance(budget.keep, int) or budget.keep < 1):
+        raise ValueError(f"{where}.keep must be a positive integer")
+    if budget.strategy == "summarize":
+        if budget.summarizer is None:
+            raise ValueError(f"{where}: strategy 'summarize' requires a summarizer")
+        if budget.summarizer.backend not in REGISTRY:
+            raise ValueError(
+                f"{where}.summarizer: unknown backend {budget.summarizer.backend!r}"
+            )
+    return budget
+
+
+def _parse_backends(
+    value, model: str, node_id: str,
+) -> tuple[str, str, list[tuple[str, str]]]:
+    """Parse a node's backend: one name, or an ordered candidate list.
+
+    Example:
+        backend: codex
+        backend:
+          - codex                     # uses the node's `model`, if any
+          - claude_code
+          - {backend: gemini, model: gemini-2.5-flash}
+
+    Returns:
+        (primary backend, primary model, fallback candidates)
+    """
+    if not isinstance(value, list):
+        return value, model, []
+    if not value:
+        raise ValueError(f"{node_id}.backend: candidate list is empty")
+    candidates: list[tuple[str, str]] = []
+    for i, item in enumerate(value):
+        if isinstance(item, str):
+            item = {"backend": item}
+        if not isinstance(item, dict) or "backend" not in item:
+            raise ValueError(
+                f"{node_id}.backend[{i}] must be a name or a mapping "
+                f"with a 'backend' key"
+            )
+        name = item["backend"]
+        if name not in REGISTRY:
+            raise ValueError(f"{node_id}.backend[{i}]: unknown backend {name!r}")
+        candidates.append((name, item.get("model", model if i == 0 else "")))
+    (backend, model), *fallbacks = candidates
+    return backend, model, fallbacks
+
+
+def _parse_timeout(value, where: str) -> float | None:
+    """Validate an optional timeout in seconds."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(
+            f"{where}: timeout must be a positive number of seconds, got {value!r}"
+        )
+    return float(value)
+
+
+def _parse_retry(value, node_id: str) -> RetryPolicy | None:
+    """Parse a node's retry policy.
+
+    Example:
+        retry: 3                      # shorthand for max_attempts
+        retry:
+          max_attempts: 4
+          backoff: 2                  # seconds before the 2nd attempt
+          retry_on: [timeout, api]
+    """
+    if value is None:
+        return None
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = {"max_attempts": value}
+    if not isinstance(value, dict):
+        raise ValueError(f"{node_id}.retry must be an integer or a mapping")
+    unknown = set(value) - {f.name for f in fields(RetryPolicy)}
+    if unknown:
+        raise ValueError(f"{node_id}.retry: unknown keys {sorted(unknown)}")
+    policy = RetryPolicy(**value)
+    if not isinstance(policy.max_attempts, int) or policy.max_attempts < 1:
+        raise ValueError(f"{node_id}.retry.max_attempts must be >= 1")
+    if policy.backoff < 0 or policy.multiplier < 1:
+        raise ValueError(
+            f"{node_id}.retry: backoff must be >= 0 and multiplier >= 1"
+        )
+    valid = {k.value for k in ErrorKind} - {ErrorKind.CANCELLED.value}
+    bad = set(policy.retry_on) - valid
+    if bad:
+        raise ValueError(
+            f"{node_id}.retry.retry_on: {sorted(bad)} not in {sorted(valid)}"
+        )
+    policy.retry_on = tuple(policy.retry_on)
+    return policy
+
+
+def _parse_hedge(value, node_id: str) -> HedgePolicy | None:
+    """Parse a node's hedging policy.
+
+    Example:
+        hedge:
+          quantile: 0.95
+          after: 60                   # until enough latencies are known
+          backend: claude_code        # optional fallback backend
+    """
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise ValueError(f"{node_id}.hedge must be a mapping")
+    unknown = set(value) - {f.name for f in fields(HedgePolicy)}
+    if unknown:
+        raise ValueError(f"{node_id}.hedge: unknown keys {sorted(unknown)}")
+    policy = HedgePolicy(**value)
+    if not 0 < policy.quantile < 1:
+        raise ValueError(f"{node_id}.hedge.quantile must be between 0 and 1")
+    if policy.after is not None:
+        policy.after = _parse_timeout(policy.after, f"{node_id}.hedge.after")
+    if policy.backend is not None and policy.backend not in REGISTRY:
+        raise ValueError(f"{node_id}.hedge.backend: unknown backend {policy.backend!r}")
+    return policy
+
+
+def _parse_concurrency(data: dict) -> tuple[int | None, dict[str, int]]:
+    """Parse the optional top-level concurrency section.
+
+    Example:
+        concurrency:
+          max_workers: 8
+          backends:
+            codex: 2
+            gemini: 4
+    """
+    if not isinstance(data, dict):
+        raise ValueError("concurrency must be a mapping")
+    max_workers = data.get("max_workers")
+    if max_workers is not None and (
+        not isinstance(max_workers, int) or max_workers < 1
+    ):
+        raise ValueError(
+            f"concurrency.max_workers must be a positive integer, "
+            f"got {max_workers!r}"
+        )
+
+    backends = data.get("backends") or {}
+    if not isinstance(backends, dict):
+        raise ValueError("concurrency.backends must be a mapping")
+    backend_limits: dict[str, int] = {}
+    for backend, limit in backends.items():
+        if not isinstance(limit, int) or limit < 1:
+            raise ValueError(
+                f"concurrency.backends.{backend} must be a positive integer, "
+                f"got {limit!r}"
+            )
+        backend_limits[backend] = limit
+
+    return max_workers, backend_limits
+
+
 def _validate(graph: GraphDef) -> None:
     """Validate graph structure.
 
@@ -131,26 +359,33 @@ def _validate(graph: GraphDef) -> None:
                     "(sequential or parallel)"
                 )
 
-    # Cycle detection (DFS on non-special nodes)
-    adjacency: dict[str, list[str]] = {nid: [] for nid in graph.nodes}
-    for edge in graph.edges:
-        if edge.source in graph.nodes and edge.target in graph.nodes:
-            adjacency[edge.source].append(edge.target)
-
+    # Cycle detection (iterative DFS on non-special nodes, so long
+    # generated chains cannot hit the recursion limit)
     UNVISITED, IN_STACK, DONE = 0, 1, 2
     state: dict[str, int] = {nid: UNVISITED for nid in graph.nodes}
 
-    def dfs(node: str) -> None:
-        state[node] = IN_STACK
-        for neighbor in adjacency[node]:
-            if state[neighbor] == IN_STACK:
-                raise ValueError(
-                    f"Cycle detected in graph: ... -> {node} -> {neighbor} -> ..."
-                )
-            if state[neighbor] == UNVISITED:
-                dfs(neighbor)
-        state[node] = DONE
+    def children(node: str) -> list[str]:
+        return [
+            e.target for e in graph.downstream(node)
+            if e.target in graph.nodes
+        ]
 
-    for nid in graph.nodes:
-        if state[nid] == UNVISITED:
-            dfs(nid)
+    for root in graph.nodes:
+        if state[root] != UNVISITED:
+            continue
+        state[root] = IN_STACK
+        stack = [(root, iter(children(root)))]
+        while stack:
+            node, it = stack[-1]
+            for neighbor in it:
+                if state[neighbor] == IN_STACK:
+                    raise ValueError(
+                        f"Cycle detected in graph: ... -> {node} -> {neighbor} -> ..."
+                    )
+                if state[neighbor] == UNVISITED:
+                    state[neighbor] = IN_STACK
+                    stack.append((neighbor, iter(children(neighbor))))
+                    break
+            else:
+                state[node] = DONE
+                stack.pop()
@@ -0,0 +1,444 @@
+"""
+Retries and hedged requests for graph node calls.
+
+Both executors route every agent call through call_node / acall_node,
+which apply the node's RetryPolicy and HedgePolicy:
+
+- Retry: a failed call whose ErrorKind is retryable is repeated after
+  an exponentially growing, jittered wait, as long as the run is neither
+  cancelled nor out of time.
+- Hedge: when a call has run longer than the node usually takes, a
+  duplicate is started (optionally on another backend) and the first
+  success wins; the slower call is cancelled and its process group
+  killed. A hedge only ever runs on spare capacity — if the limiter has
+  no free slot, the original call simply continues alone.
+"""
+
+import asyncio
+import dataclasses
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable
+
+from src.agent import Agent, AgentResult
+from src.backends import ErrorKind
+from src.graph.limits import (
+    AsyncConcurrencyLimiter,
+    ConcurrencyLimiter,
+    SlotCancelled,
+)
+from src.graph.schema import HedgePolicy, NodeDef, RetryPolicy
+from src.logging import StepLogger
+
+if TYPE_CHECKING:
+    from src.graph.executor import _Deadline
+
+# A single attempt, no retries.
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+# How often a linked cancel event re-checks its parent while waiting.
+LINK_INTERVAL = 0.05
+
+
+class LatencyTracker:
+    """Recent successful call latencies per node, for hedge delays.
+
+    Args:
+        window: Samples kept per node; older ones are forgotten so the
+                estimate follows the backend's current behaviour.
+    """
+
+    def __init__(self, window: int = 100):
+        self.window = window
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def quantile(self, key: str, q: float, min_samples: int = 1) -> float | None:
+        """The q-quantile of `key`'s latencies, or None if too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._samples.values())
+
+
+def hedge_agent(agent: Agent, policy: HedgePolicy | None) -> Agent | None:
+    """The agent a node's hedged calls go to (None when hedging is off)."""
+    if policy is None:
+        return None
+    if policy.backend is None and policy.model is None and not agent.fallbacks:
+        return agent
+    # The hedge runs on a spare slot for its own backend only, so it never
+    # fails over to another one.
+    return dataclasses.replace(
+        agent,
+        backend=policy.backend or agent.backend,
+        model=policy.model if policy.model is not None else (
+            agent.model if policy.backend is None else ""
+        ),
+        fallbacks=[],
+    )
+
+
+def call_node(
+    node: NodeDef,
+    agent: Agent,
+    task: str,
+    context: str,
+    *,
+    label: str,
+    log: StepLogger,
+    limiter: ConcurrencyLimiter,
+    deadline: "_Deadline",
+    cancel: threading.Event,
+    latencies: LatencyTracker,
+) -> AgentResult:
+    """Run `agent` for `node` under its retry and hedge policies.
+
+    Each attempt holds its own limiter slot, so a node waiting out a
+    backoff does not keep other calls from running.
+    """
+    policy = node.retry or NO_RETRY
+    hedged_by = hedge_agent(agent, node.hedge)
+    attempt = 0
+    while True:
+        attempt += 1
+        result = _attempt(
+            node, agent, hedged_by, task, context,
+            limiter=limiter, deadline=deadline, cancel=cancel,
+            latencies=latencies,
+        )
+        wait_for = _retry_wait(policy, attempt, result, deadline)
+        if wait_for is None or cancel.is_set():
+            break
+        log.info(
+            f"{label}: attempt {attempt}/{policy.max_attempts} failed "
+            f"({result.error_kind.value}) — retrying in {wait_for:.1f}s"
+        )
+        if cancel.wait(wait_for):
+            break
+    result.attempts = attempt
+    return result
+
+
+async def acall_node(
+    node: NodeDef,
+    agent: Agent,
+    task: str,
+    context: str,
+    *,
+    label: str,
+    log: StepLogger,
+    limiter: AsyncConcurrencyLimiter,
+    deadline: "_Deadline",
+    cancel: asyncio.Event,
+    latencies: LatencyTracker,
+) -> AgentResult:
+    """Async counterpart of call_node."""
+    policy = node.retry or NO_RETRY
+    hedged_by = hedge_agent(agent, node.hedge)
+    attempt = 0
+    while True:
+        attempt += 1
+        result = await _aattempt(
+            node, agent, hedged_by, task, context,
+            limiter=limiter, deadline=deadline, cancel=cancel,
+            latencies=latencies,
+        )
+        wait_for = _retry_wait(policy, attempt, result, deadline)
+        if wait_for is None or cancel.is_set():
+            break
+        log.info(
+            f"{label}: attempt {attempt}/{policy.max_attempts} failed "
+            f"({result.error_kind.value}) — retrying in {wait_for:.1f}s"
+        )
+        try:
+            await asyncio.wait_for(cancel.wait(), wait_for)
+            break
+        except TimeoutError:
+            pass
+    result.attempts = attempt
+    return result
+
+
+def _retry_wait(
+    policy: RetryPolicy,
+    attempt: int,
+    result: AgentResult,
+    deadline: "_Deadline",
+) -> float | None:
+    """Seconds to wait before retrying `result`, or None to give up."""
+    if result.error is None or attempt >= policy.max_attempts:
+        return None
+    if result.error_kind is None or result.error_kind not in policy.retry_on:
+        return None
+    wait_for = policy.delay(attempt)
+    left = deadline.clamp(None)
+    if left is not None and left <= wait_for:
+        return None
+    return wait_for
+
+
+def _hedge_delay(
+    node: NodeDef, latencies: LatencyTracker,
+) -> float | None:
+    policy = node.hedge
+    observed = latencies.quantile(node.id, policy.quantile, policy.min_samples)
+    return observed if observed is not None else policy.after
+
+
+def _record(
+    latencies: LatencyTracker, node: NodeDef, result: AgentResult, took: float,
+) -> None:
+    if result.error is None and not result.cached:
+        latencies.record(node.id, took)
+
+
+def _attempt(
+    node: NodeDef,
+    agent: Agent,
+    hedged_by: Agent | None,
+    task: str,
+    context: str,
+    *,
+    limiter: ConcurrencyLimiter,
+    deadline: "_Deadline",
+    cancel: threading.Event,
+    latencies: LatencyTracker,
+) -> AgentResult:
+    """One (possibly hedged) call, holding a limiter slot throughout.
+
+    An agent with fallbacks may be routed to any of its candidates, so it
+    takes the slot per attempt, for the backend the router chose.
+    """
+    delay = _hedge_delay(node, latencies) if hedged_by else None
+    routed = _routed(agent, partial(limiter.slot, cancel=cancel))
+    held = nullcontext() if routed else limiter.slot(node.backend, cancel)
+    try:
+        with held:
+            t0 = time.monotonic()
+            if delay is None:
+                result = agent.run(
+                    task, context=context,
+                    timeout=deadline.clamp(node.timeout), cancel=cancel,
+                    **routed,
+                )
+            else:
+                result = _hedged(
+                    node, agent, hedged_by, task, context, delay,
+                    limiter=limiter, deadline=deadline, cancel=cancel,
+                    routed=routed,
+                )
+            _record(latencies, node, result, time.monotonic() - t0)
+    except SlotCancelled:
+        return _cancelled_in_queue(agent)
+    return result
+
+
+def _routed(agent: Agent, slot: Callable[[str], Any]) -> dict[str, Any]:
+    """Extra run() arguments: the per-attempt slot, if the agent routes."""
+    return {"slot": slot} if agent.fallbacks else {}
+
+
+def _cancelled_in_queue(agent: Agent) -> AgentResult:
+    """Result for a call the run cancelled before it got a slot."""
+    return AgentResult(
+        agent_name=agent.name,
+        output="",
+        error=f"{agent.name} cancelled while waiting for a slot",
+        error_kind=ErrorKind.CANCELLED,
+    )
+
+
+def _hedged(
+    node: NodeDef,
+    agent: Agent,
+    hedged_by: Agent,
+    task: str,
+    context: str,
+    delay: float,
+    *,
+    limiter: ConcurrencyLimiter,
+    deadline: "_Deadline",
+    cancel: threading.Event,
+    routed: dict[str, Any],
+) -> AgentResult:
+    """Race the primary call against a duplicate started after `delay`."""
+    pool = ThreadPoolExecutor(max_workers=2)
+    try:
+        primary_cancel = _LinkedEvent(cancel)
+        primary = pool.submit(
+            agent.run, task, context=context,
+            timeout=deadline.clamp(node.timeout), cancel=primary_cancel,
+            **routed,
+        )
+        if wait([primary], timeout=delay).done:
+            return primary.result()
+
+        with limiter.try_slot(hedged_by.backend) as free:
+            if not free:
+                return primary.result()
+            hedge_cancel = _LinkedEvent(cancel)
+            hedge = pool.submit(
+                hedged_by.run, task, context=context,
+                timeout=deadline.clamp(node.timeout), cancel=hedge_cancel,
+                coalesce=False,
+            )
+            losers = {primary: hedge_cancel, hedge: primary_cancel}
+            pending = {primary, hedge}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result.error is None:
+                        losers[future].set()
+                        result.hedged = future is hedge
+                        return result
+            return primary.result()
+    finally:
+        # The loser is being killed; wait for it so its slot is released
+        # only once its process group is gone.
+        pool.shutdown(wait=True)
+
+
+async def _aattempt(
+    node: NodeDef,
+    agent: Agent,
+    hedged_by: Agent | None,
+    task: str,
+    context: str,
+    *,
+    limiter: AsyncConcurrencyLimiter,
+    deadline: "_Deadline",
+    cancel: asyncio.Event,
+    latencies: LatencyTracker,
+) -> AgentResult:
+    delay = _hedge_delay(node, latencies) if hedged_by else None
+    routed = _routed(agent, partial(limiter.slot, cancel=cancel))
+    held = nullcontext() if routed else limiter.slot(node.backend, cancel)
+    try:
+        async with held:
+            t0 = time.monotonic()
+            if delay is None:
+                result = await agent.arun(
+                    task, context=context,
+                    timeout=deadline.clamp(node.timeout), cancel=cancel,
+                    **routed,
+                )
+            else:
+                result = await _ahedged(
+                    node, agent, hedged_by, task, context, delay,
+                    limiter=limiter, deadline=deadline, cancel=cancel,
+                    routed=routed,
+                )
+            _record(latencies, node, result, time.monotonic() - t0)
+    except SlotCancelled:
+        return _cancelled_in_queue(agent)
+    return result
+
+
+async def _ahedged(
+    node: NodeDef,
+    agent: Agent,
+    hedged_by: Agent,
+    task: str,
+    context: str,
+    delay: float,
+    *,
+    limiter: AsyncConcurrencyLimiter,
+    deadline: "_Deadline",
+    cancel: asyncio.Event,
+    routed: dict[str, Any],
+) -> AgentResult:
+    primary_cancel = _ALinkedEvent(cancel)
+    primary = asyncio.create_task(agent.arun(
+        task, context=context,
+        timeout=deadline.clamp(node.timeout), cancel=primary_cancel,
+        **routed,
+    ))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    async with limiter.try_slot(hedged_by.backend) as free:
+        if not free:
+            return await primary
+        hedge_cancel = _ALinkedEvent(cancel)
+        hedge = asyncio.create_task(hedged_by.arun(
+            task, context=context,
+            timeout=deadline.clamp(node.timeout), cancel=hedge_cancel,
+            coalesce=False,
+        ))
+        losers = {primary: (hedge_cancel, hedge), hedge: (primary_cancel, primary)}
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task_ in done:
+                result = task_.result()
+                if result.error is None:
+                    loser_cancel, loser = losers[task_]
+                    loser_cancel.set()
+                    await asyncio.gather(loser, return_exceptions=True)
+                    result.hedged = task_ is hedge
+                    return result
+        return primary.result()
+
+
+class _LinkedEvent(threading.Event):
+    """Cancel event for one side of a hedge: set on its own or by the run.
+
+    The backends poll is_set() and wait(), so both consult the parent
+    (the run-wide cancel) as well.
+    """
+
+    def __init__(self, parent: threading.Event):
+        super().__init__()
+        self._parent = parent
+
+    def is_set(self) -> bool:
+        return super().is_set() or self._parent.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        end = None if timeout is None else time.monotonic() + timeout
+        while not self.is_set():
+            left = LINK_INTERVAL if end is None else end - time.monotonic()
+            if left <= 0:
+                return False
+            super().wait(min(left, LINK_INTERVAL))
+        return True
+
+
+class _ALinkedEvent(asyncio.Event):
+    """asyncio counterpart of _LinkedEvent."""
+
+    def __init__(self, parent: asyncio.Event):
+        super().__init__()
+        self._parent = parent
+
+    def is_set(self) -> bool:
+        return super().is_set() or self._parent.is_set()
+
+    async def wait(self) -> bool:
+        while not self.is_set():
+            try:
+                await asyncio.wait_for(super().wait(), LINK_INTERVAL)
+            except TimeoutError:
+                pass
+        return True
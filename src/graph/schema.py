@@ -6,6 +6,7 @@ and their configuration. Maps A2A protocol concepts to lightweight in-process
 equivalents.
 """
 
+import random
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -34,6 +35,64 @@ class LLMCallDef:
     prompt: str = ""
     model: str = ""
     full_auto: bool = False
+    # Seconds before the planner CLI is killed (None = no limit)
+    timeout: float | None = None
+
+
+@dataclass
+class ContextBudget:
+    """Upper bound on the context an edge or node passes into a prompt.
+
+    Context estimated above `max_tokens` is compacted by `strategy`, a
+    name in src.graph.compaction.COMPACTORS ("tail", "head", "latest",
+    "summarize"). `keep` caps how many upstream outputs "latest" keeps;
+    `summarizer` is the LLM call "summarize" uses for older outputs.
+    """
+
+    max_tokens: int
+    strategy: str = "tail"
+    keep: int | None = None
+    summarizer: LLMCallDef | None = None
+
+
+@dataclass
+class RetryPolicy:
+    """When and how a node's failed backend call is retried.
+
+    `retry_on` lists retryable ErrorKind values; cancellation is never
+    retried. Waits grow as backoff * multiplier ** (attempt - 1), capped
+    at max_backoff, and are drawn from [wait/2, wait] when `jitter` is on.
+    """
+
+    max_attempts: int = 3
+    backoff: float = 1.0
+    multiplier: float = 2.0
+    max_backoff: float = 60.0
+    jitter: bool = True
+    retry_on: tuple[str, ...] = ("timeout", "api", "exit")
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after failed attempt number `attempt` (1-based)."""
+        wait = min(self.max_backoff, self.backoff * self.multiplier ** (attempt - 1))
+        return random.uniform(wait / 2, wait) if self.jitter else wait
+
+
+@dataclass
+class HedgePolicy:
+    """Launch a duplicate call when the first one runs unusually long.
+
+    The duplicate starts once the call has run longer than the node's
+    observed `quantile` latency (after `min_samples` successful calls),
+    or after `after` seconds until then. It goes to `backend`/`model`
+    (default: the node's own); the first success wins and the other
+    call is cancelled.
+    """
+
+    quantile: float = 0.95
+    min_samples: int = 5
+    after: float | None = None
+    backend: str | None = None
+    model: str | None = None
 
 
 @dataclass
@@ -50,6 +109,18 @@ class NodeDef:
     expand: ExpandMode | None = None
     llm_call: LLMCallDef | None = None
     transform: str = ""
+    # Allow the executor's ResultCache to serve this node (opt-out per node)
+    cache: bool = True
+    # Seconds before this node's CLI process group is killed (None = no limit)
+    timeout: float | None = None
+    # Retry failed calls (None = single attempt)
+    retry: RetryPolicy | None = None
+    # Duplicate slow calls to cut tail latency (None = off)
+    hedge: HedgePolicy | None = None
+    # Further (backend, model) candidates to route to or fail over to
+    fallbacks: list[tuple[str, str]] = field(default_factory=list)
+    # Cap on the assembled upstream context (None = unbounded)
+    context_budget: ContextBudget | None = None
 
 
 @dataclass
@@ -59,26 +130,84 @@ class EdgeDef:
     source: str
     target: str
     context_policy: ContextPolicy = ContextPolicy.REPLACE
+    # Cap on what this edge contributes to the target's context
+    budget: ContextBudget | None = None
 
 
 @dataclass
 class GraphDef:
-    """Complete graph definition."""
+    """Complete graph definition.
+
+    Upstream/downstream edge lists and entry/exit node sets are served
+    from an adjacency index built on first use. The index is rebuilt
+    automatically when `nodes` or `edges` is reassigned or changes size
+    (e.g. via add_edge or list.append); call invalidate() after editing
+    an existing EdgeDef in place.
+    """
 
     name: str
     nodes: dict[str, NodeDef] = field(default_factory=dict)
     edges: list[EdgeDef] = field(default_factory=list)
+    # Run-wide cap on concurrent backend calls (None = unlimited)
+    max_workers: int | None = None
+    # Per-backend caps on concurrent calls, e.g. {"codex": 2}
+    backend_limits: dict[str, int] = field(default_factory=dict)
+    # Wall-clock budget for the whole run in seconds (None = no limit)
+    timeout: float | None = None
+    _index: "_AdjacencyIndex | None" = field(
+        default=None, init=False, repr=False, compare=False,
+    )
 
     @property
     def entry_nodes(self) -> list[str]:
-        return [e.target for e in self.edges if e.source == "_input"]
+        return list(self._adjacency().entry_nodes)
 
     @property
     def exit_nodes(self) -> list[str]:
-        return [e.source for e in self.edges if e.target == "_output"]
+        return list(self._adjacency().exit_nodes)
 
     def upstream(self, node_id: str) -> list[EdgeDef]:
-        return [e for e in self.edges if e.target == node_id]
+        return list(self._adjacency().upstream.get(node_id, ()))
 
     def downstream(self, node_id: str) -> list[EdgeDef]:
-        return [e for e in self.edges if e.source == node_id]
+        return list(self._adjacency().downstream.get(node_id, ()))
+
+    def add_node(self, node: NodeDef) -> None:
+        self.nodes[node.id] = node
+        self.invalidate()
+
+    def add_edge(self, edge: EdgeDef) -> None:
+        self.edges.append(edge)
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Drop the adjacency index; it is rebuilt on next lookup."""
+        self._index = None
+
+    def _adjacency(self) -> "_AdjacencyIndex":
+        signature = (
+            id(self.nodes), len(self.nodes), id(self.edges), len(self.edges),
+        )
+        if self._index is None or self._index.signature != signature:
+            self._index = _AdjacencyIndex(self.edges, signature)
+        return self._index
+
+
+class _AdjacencyIndex:
+    """Edge lists keyed by target/source, built in one pass over edges."""
+
+    __slots__ = ("signature", "upstream", "downstream", "entry_nodes", "exit_nodes")
+
+    def __init__(self, edges: list[EdgeDef], signature: tuple):
+        self.signature = signature
+        self.upstream: dict[str, list[EdgeDef]] = {}
+        self.downstream: dict[str, list[EdgeDef]] = {}
+        self.entry_nodes: list[str] = []
+        self.exit_nodes: list[str] = []
+        for e in edges:
+            self.upstream.setdefault(e.target, []).append(e)
+            self.downstream.setdefault(e.source, []).append(e)
+            if e.source == "_input":
+                self.entry_nodes.append(e.target)
+            if e.target == "_output":
+                self.exit_nodes.append(e.source)
@@ -0,0 +1,146 @@
+"""
+Checkpoint store for graph runs.
+
+Each completed node's envelopes are written to disk as soon as the node
+finishes, keyed by the run's context_id and the node_id. A failed or
+interrupted run can then be resumed: completed nodes are reloaded and
+only the nodes that failed or never ran are executed.
+
+The executors hand checkpoints to save_node_later(), which writes them
+on the store's own thread in submission order, so serialising a node's
+envelopes never holds up the scheduler. A node's file appears (by
+atomic rename) only once its contents are fsynced; flush() waits for
+every queued save.
+
+A node file stores each distinct long text once, in a "blobs" table as
+in build_trace(dedupe=True), and refers to contexts leaf by leaf, so a
+sequential accumulate chain costs one reference per earlier step rather
+than a copy of the whole history. load_nodes() rebuilds the contexts as
+ContextRopes over the shared blob strings.
+
+Layout:
+    {directory}/{context_id}/run.json            task + graph name
+    {directory}/{context_id}/nodes/{node_id}.json  {"blobs", "envelopes"}
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from src.blobs import BlobStore, dedupe, expand, expand_rope
+from src.graph.envelope import TaskEnvelope
+
+DEFAULT_RUN_DIR = Path.home() / ".cache" / "agent-coordination" / "runs"
+
+
+class RunStore:
+    """Directory-backed store of per-node TaskEnvelope checkpoints."""
+
+    def __init__(self, directory: str | Path = DEFAULT_RUN_DIR):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._writer: ThreadPoolExecutor | None = None
+        self._pending: list[Future] = []
+
+    def start_run(self, context_id: str, task: str, graph_name: str) -> None:
+        """Record the run manifest needed to resume it later."""
+        _write_json(self._run_dir(context_id) / "run.json", {
+            "context_id": context_id,
+            "task": task,
+            "graph_name": graph_name,
+            "created": time.time(),
+        })
+
+    def save_node(
+        self, context_id: str, node_id: str, envelopes: list[TaskEnvelope],
+    ) -> None:
+        """Persist the envelopes a node produced (overwrites on re-run)."""
+        blobs = BlobStore()
+        # Contexts go first, so prompts echoed later reuse their leaves
+        records = [dedupe(e.to_dict(ropes=True), blobs) for e in envelopes]
+        _write_json(
+            self._run_dir(context_id) / "nodes" / f"{node_id}.json",
+            {"blobs": blobs.to_dict(), "envelopes": records},
+        )
+
+    def save_node_later(
+        self, context_id: str, node_id: str, envelopes: list[TaskEnvelope],
+    ) -> None:
+        """Queue save_node() on the store's writer thread."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="run-store",
+                )
+            # Keep unfinished and failed saves for flush()
+            self._pending = [
+                f for f in self._pending
+                if not f.done() or f.exception() is not None
+            ]
+            self._pending.append(self._writer.submit(
+                self.save_node, context_id, node_id, envelopes,
+            ))
+
+    def flush(self) -> None:
+        """Wait for queued saves; re-raises the first one that failed."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def load_run(self, context_id: str) -> dict:
+        """Return the run manifest.
+
+        Raises:
+            KeyError: If no run with this context_id was recorded.
+        """
+        path = self._run_dir(context_id) / "run.json"
+        if not path.exists():
+            raise KeyError(f"No checkpointed run {context_id!r} in {self.directory}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def load_nodes(self, context_id: str) -> dict[str, list[TaskEnvelope]]:
+        """Return every checkpointed node's envelopes for a run."""
+        nodes_dir = self._run_dir(context_id) / "nodes"
+        if not nodes_dir.exists():
+            return {}
+        loaded: dict[str, list[TaskEnvelope]] = {}
+        for path in nodes_dir.glob("*.json"):
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if isinstance(data, list):  # written before blob tables
+                data = {"blobs": {}, "envelopes": data}
+            loaded[path.stem] = [
+                TaskEnvelope.from_dict(_restore(d, data["blobs"]))
+                for d in data["envelopes"]
+            ]
+        return loaded
+
+    def _run_dir(self, context_id: str) -> Path:
+        return self.directory / context_id
+
+
+def _restore(record: dict, blobs: dict[str, str]) -> dict:
+    """An envelope record with contexts as ropes and other text expanded."""
+    record = dict(record, context=expand_rope(record.get("context", ""), blobs))
+    trace = (record.get("result") or {}).get("trace")
+    if trace:
+        trace = dict(trace)
+        for key in ("context", "full_prompt"):
+            if key in trace:
+                trace[key] = expand_rope(trace[key], blobs)
+        record["result"] = dict(record["result"], trace=trace)
+    return expand(record, blobs)
+
+
+def _write_json(path: Path, data) -> None:
+    """Write atomically so a crash never leaves a truncated checkpoint."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(data, ensure_ascii=False, default=str))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
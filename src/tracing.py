@@ -9,27 +9,52 @@ Trace schema v2.0 adds:
   - thinking blocks (extended thinking / reasoning)
   - session_messages (complete normalized messages from native session files)
   - session_file path for each step
+
+build_trace(dedupe=True) stores each distinct text once in a top-level
+"blobs" table (see src.blobs); load_trace() and expand_trace() turn such
+a trace back into the plain v2.0 layout.
+
+JsonlTraceSink streams the same steps to a JSONL file from a writer
+thread while the run is in progress, one compact record per line, so
+nothing is held back until the end and a crashed run still leaves its
+finished steps on disk.
+load_trace() reassembles those files into the v2.0 layout too.
 """
 
 import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable
 
 from src.backends import DEFAULT_MODELS, Backend
 from src.agent import AgentResult
 from src.base import CoordinatorResult
+from src.blobs import BlobStore, dedupe, expand
 
 
 SCHEMA_VERSION = "2.0"
 
 
-def _build_step(step: AgentResult, step_index: int) -> dict:
-    """Convert a single AgentResult into the unified step dict."""
+def _build_step(
+    step: AgentResult, step_index: int, blobs: BlobStore | None = None,
+) -> dict:
+    """Convert a single AgentResult into the unified step dict.
+
+    With `blobs`, long text is moved into the store and referenced.
+    """
     t = step.trace
-    return {
+    d = {
         "agent_name": step.agent_name,
         "step_label": step.step_label or "",
         "step_index": step_index,
         "elapsed_seconds": round(step.elapsed, 2),
+        "queue_delay_seconds": round(t.queue_delay, 2) if t else 0.0,
+        "attempts": step.attempts,
+        "hedged": step.hedged,
         "backend": t.backend if t else "",
         "model": t.model if t else None,
         "system_prompt": t.system_prompt if t else "",
@@ -50,6 +75,17 @@ def _build_step(step: AgentResult, step_index: int) -> dict:
         "usage": t.usage if t else None,
         "error": t.error if t else step.error,
     }
+    if blobs is not None:
+        # Ropes first, so text that repeats them (session messages,
+        # raw events) can point at their segments
+        for key in ("context", "full_prompt"):
+            d[key] = dedupe(d[key], blobs)
+        return dedupe(d, blobs)
+    # Ropes are materialized only here, as they are written out
+    if d["context"] is not None:
+        d["context"] = str(d["context"])
+    d["full_prompt"] = str(d["full_prompt"])
+    return d
 
 
 def build_trace(
@@ -58,6 +94,7 @@ def build_trace(
     *,
     pattern: str = "",
     model: str = "",
+    dedupe: bool = False,
 ) -> dict:
     """Build a unified trace dict from a CoordinatorResult.
 
@@ -67,35 +104,251 @@ def build_trace(
         pattern: Coordination pattern name (auto-detected from
                  result.metadata["pattern"] if not provided).
         model: Model name (defaults to codex model for backward compat).
+        dedupe: Store each distinct long text once under "blobs" and
+                reference it from the steps (read back with load_trace).
     """
     pat = pattern or result.metadata.get("pattern", "")
-    mdl = model or DEFAULT_MODELS[Backend.CODEX]
 
-    steps = [_build_step(s, i) for i, s in enumerate(result.steps)]
+    blobs = BlobStore() if dedupe else None
+    steps = [_build_step(s, i, blobs) for i, s in enumerate(result.steps)]
 
-    # Collect unique backends used across all steps
-    backends_used = sorted({
-        s.trace.backend for s in result.steps
-        if s.trace and s.trace.backend
-    })
-
-    return {
+    trace = {
         "schema_version": SCHEMA_VERSION,
         "metadata": {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "model": mdl,
-            "pattern": pat,
-            "task": task,
-            "total_elapsed_seconds": round(result.elapsed, 2),
-            "total_steps": len(steps),
-            "success": result.success,
-            "backends_used": backends_used,
+            **_run_metadata(task, pat, model),
+            **_summary(result.steps, result.elapsed),
         },
         "steps": steps,
     }
+    if blobs is not None:
+        trace["blobs"] = blobs.to_dict()
+    return trace
+
+
+def _run_metadata(task: str, pattern: str, model: str) -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "model": model or DEFAULT_MODELS[Backend.CODEX],
+        "pattern": pattern,
+        "task": task,
+    }
+
+
+def _summary(steps: list[AgentResult], elapsed: float) -> dict:
+    return {
+        "total_elapsed_seconds": round(elapsed, 2),
+        "total_steps": len(steps),
+        "success": all(s.error is None for s in steps),
+        # Unique backends used across all steps
+        "backends_used": sorted({
+            s.trace.backend for s in steps if s.trace and s.trace.backend
+        }),
+    }
 
 
 def save_trace(trace: dict, path: str) -> None:
     """Write a trace dict to a JSON file."""
     with open(path, "w", encoding="utf-8") as f:
         json.dump(trace, f, indent=2, ensure_ascii=False, default=str)
+
+
+def expand_trace(trace: dict) -> dict:
+    """Plain v2.0 trace from a deduplicated one (others pass through)."""
+    if "blobs" not in trace:
+        return trace
+    blobs = trace["blobs"]
+    plain = {k: v for k, v in trace.items() if k != "blobs"}
+    plain["steps"] = expand(trace["steps"], blobs)
+    return plain
+
+
+def load_trace(path: str) -> dict:
+    """Read a trace written by save_trace or JsonlTraceSink (*.jsonl).
+
+    Blob references are expanded, so the result is plain v2.0.
+    """
+    if str(path).endswith(".jsonl"):
+        return read_trace_jsonl(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return expand_trace(json.load(f))
+
+
+class JsonlTraceSink:
+    """Append a run's trace to a JSONL file as its steps complete.
+
+    Records, one per line:
+        {"type": "run", "schema_version": ..., "metadata": {...}}
+        {"type": "blob", "id": ..., "text": ...}      # dedupe only
+        {"type": "step", "step": {...}}               # as in build_trace
+        {"type": "end", "metadata": {...}}            # totals
+
+    start(), write() and finish() queue their work on the sink's writer
+    thread, which builds the records (parsing session files on the way)
+    and writes them in order; the calling scheduler or event loop only
+    hands the steps over. finish() waits for the queue to drain.
+
+    Each record is flushed when written (and fsynced with `fsync`), so a
+    crash loses at most the steps still queued. With `dedupe`, a blob
+    record precedes the first step that references it. start() truncates
+    the file, so a sink records one run at a time.
+
+    Usage:
+        sink = JsonlTraceSink("traces/run.jsonl")
+        GraphExecutor(graph, trace_sink=sink).run(task)
+        trace = load_trace("traces/run.jsonl")
+    """
+
+    def __init__(
+        self, path: str | Path, *, dedupe: bool = False, fsync: bool = False,
+    ):
+        self.path = Path(path)
+        self.dedupe = dedupe
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._writer: ThreadPoolExecutor | None = None
+        self._pending: list[Future] = []
+        self._running = False
+        self._started = 0.0
+        # Owned by the writer thread
+        self._file = None
+        self._blobs: BlobStore | None = None
+        self._steps: list[AgentResult] = []
+
+    def start(
+        self, task: str, *, pattern: str = "", model: str = "", **metadata,
+    ) -> None:
+        """Queue opening the file and writing the run header."""
+        with self._lock:
+            self._running = True
+            self._started = time.time()
+        self._submit(self._open, {
+            "type": "run",
+            "schema_version": SCHEMA_VERSION,
+            "metadata": {**_run_metadata(task, pattern, model), **metadata},
+        })
+
+    def write(self, steps: Iterable[AgentResult]) -> None:
+        """Queue finished steps (numbered in the order they arrive)."""
+        with self._lock:
+            if not self._running:
+                raise ValueError("JsonlTraceSink.write() before start()")
+        self._submit(self._append, list(steps))
+
+    def finish(self) -> None:
+        """Write the totals record, close the file and wait for the writer.
+
+        Re-raises the first failed write of the run.
+        """
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            elapsed = time.time() - self._started
+        self._submit(self._end, elapsed)
+        self.flush()
+
+    def flush(self) -> None:
+        """Wait for queued records; re-raises the first one that failed."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def _submit(self, fn, *args) -> None:
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="trace-sink",
+                )
+            # Keep unfinished and failed writes for flush()
+            self._pending = [
+                f for f in self._pending
+                if not f.done() or f.exception() is not None
+            ]
+            self._pending.append(self._writer.submit(fn, *args))
+
+    def _open(self, header: dict) -> None:
+        self._close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._blobs = BlobStore() if self.dedupe else None
+        self._steps = []
+        self._emit([header])
+
+    def _append(self, steps: list[AgentResult]) -> None:
+        records = []
+        for step in steps:
+            d = _build_step(step, len(self._steps), self._blobs)
+            self._steps.append(step)
+            if self._blobs is not None:
+                records.extend(
+                    {"type": "blob", "id": digest, "text": text}
+                    for digest, text in self._blobs.drain()
+                )
+            records.append({"type": "step", "step": d})
+        self._emit(records)
+
+    def _end(self, elapsed: float) -> None:
+        if self._file is None:
+            return
+        self._emit([{"type": "end", "metadata": _summary(self._steps, elapsed)}])
+        self._close()
+
+    def _emit(self, records: list[dict]) -> None:
+        if not records:
+            return
+        self._file.write("".join(
+            json.dumps(r, ensure_ascii=False, separators=(",", ":"), default=str)
+            + "\n"
+            for r in records
+        ))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_trace_jsonl(path: str | Path) -> dict:
+    """Reassemble a JsonlTraceSink file into a v2.0 trace dict.
+
+    A run that never finished (no end record) gets totals computed from
+    the steps on disk and `"complete": False` in its metadata; a torn
+    last line is ignored.
+    """
+    metadata: dict = {}
+    end: dict | None = None
+    steps: list[dict] = []
+    blobs: dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break  # partial write from a crash
+            kind = record.get("type")
+            if kind == "run":
+                metadata = dict(record.get("metadata", {}))
+            elif kind == "blob":
+                blobs[record["id"]] = record["text"]
+            elif kind == "step":
+                steps.append(record["step"])
+            elif kind == "end":
+                end = record.get("metadata", {})
+
+    if blobs:
+        steps = expand(steps, blobs)
+    if end is not None:
+        metadata.update(end)
+    else:
+        metadata.update({
+            "total_elapsed_seconds": None,
+            "total_steps": len(steps),
+            "success": all(s.get("error") is None for s in steps),
+            "backends_used": sorted({s["backend"] for s in steps if s.get("backend")}),
+            "complete": False,
+        })
+    return {"schema_version": SCHEMA_VERSION, "metadata": metadata, "steps": steps}
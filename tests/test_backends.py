@@ -0,0 +1,449 @@
+"""
+Offline tests for the CLI backends.
+
+A fake `codex` executable is placed on PATH; it emits a `codex exec
+--json` event stream and writes a rollout session file, so the
+subprocess handling and session parsing run end-to-end without the
+real CLI.
+"""
+
+import asyncio
+import os
+import stat
+import sys
+import textwrap
+import threading
+import time
+
+sys.path.insert(0, ".")
+
+import pytest
+
+from src.backends import ErrorKind, acall, call, saved_calls
+from src.backends import codex as codex_backend
+from src.backends.worker_pool import WarmPool
+
+FAKE_CODEX = textwrap.dedent("""\
+    #!{python}
+    import json, os, sys, time, uuid
+    time.sleep(float(os.environ.get("FAKE_CODEX_STARTUP", "0")))
+    prompt = sys.stdin.read() if sys.argv[-1] == "-" else sys.argv[-1]
+    session_dir = os.path.join(
+        os.environ["FAKE_CODEX_SESSIONS"], time.strftime("%Y/%m/%d"))
+    thread_id = str(uuid.uuid4())
+    os.makedirs(session_dir, exist_ok=True)
+    with open(os.path.join(session_dir, f"rollout-x-{{thread_id}}.jsonl"), "w") as f:
+        f.write(json.dumps({{"type": "response_item", "payload": {{
+            "type": "reasoning", "summary": [{{"text": "thinking about " + prompt}}]}}}}) + "\\n")
+        f.write(json.dumps({{"type": "response_item", "payload": {{
+            "type": "function_call", "name": "shell", "arguments": "ls", "call_id": "c1"}}}}) + "\\n")
+    sys.stderr.write("noise\\n" * int(os.environ.get("FAKE_CODEX_STDERR_LINES", "0")))
+    if os.environ.get("FAKE_CODEX_SLEEP"):
+        import subprocess
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        with open(os.environ["FAKE_CODEX_CHILD_PID"], "w") as f:
+            f.write(str(child.pid))
+        sys.stdout.flush()
+        time.sleep(float(os.environ["FAKE_CODEX_SLEEP"]))
+    print("x" * int(os.environ.get("FAKE_CODEX_LONG_LINE", "0")))
+    print(json.dumps({{"type": "thread.started", "thread_id": thread_id}}))
+    print(json.dumps({{"type": "item.completed", "item": {{"type": "agent_message", "text": "echo: " + prompt}}}}))
+    print(json.dumps({{"type": "turn.completed", "usage": {{"output_tokens": 3}}}}))
+    sys.exit(int(os.environ.get("FAKE_CODEX_EXIT", "0")))
+""")
+
+
+@pytest.fixture
+def fake_codex(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "codex"
+    script.write_text(FAKE_CODEX.format(python=sys.executable))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+    sessions = tmp_path / "sessions"
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_CODEX_SESSIONS", str(sessions))
+    monkeypatch.setattr(codex_backend, "CODEX_SESSION_DIR", sessions)
+    return sessions
+
+
+def test_call_codex_parses_stream_and_session(fake_codex):
+    resp = call("hello", backend="codex")
+
+    assert resp.error is None
+    assert resp.text == "echo: hello"
+    assert resp.usage == {"output_tokens": 3}
+    assert resp.thinking == ["thinking about hello"]
+    assert resp.tool_calls[0]["name"] == "shell"
+    assert resp.session_file and resp.session_file.startswith(str(fake_codex))
+
+
+def test_acall_codex_runs_concurrently(fake_codex):
+    async def main():
+        return await asyncio.gather(*[
+            acall(f"p{i}", backend="codex") for i in range(5)
+        ])
+
+    responses = asyncio.run(main())
+
+    assert sorted(r.text for r in responses) == [f"echo: p{i}" for i in range(5)]
+    assert all(r.error is None for r in responses)
+    # Each call resolved its own rollout by thread ID, not just the newest
+    assert all(r.thinking == [f"thinking about {r.text[6:]}"] for r in responses)
+    assert len({r.session_file for r in responses}) == 5
+
+
+def test_nonzero_exit_is_reported(fake_codex, monkeypatch):
+    monkeypatch.setenv("FAKE_CODEX_EXIT", "3")
+
+    resp = call("hello", backend="codex")
+
+    assert resp.error == "codex exited with code 3"
+    assert resp.text == "echo: hello"
+
+
+def test_verbose_stderr_does_not_deadlock(fake_codex, monkeypatch):
+    # ~1.2 MB of stderr written before any stdout: far beyond a pipe buffer.
+    monkeypatch.setenv("FAKE_CODEX_STDERR_LINES", "200000")
+    monkeypatch.setenv("FAKE_CODEX_EXIT", "1")
+
+    resp = call("hello", backend="codex")
+    aresp = asyncio.run(acall("hello", backend="codex"))
+
+    for r in (resp, aresp):
+        assert r.text == "echo: hello"
+        # Only a bounded tail of stderr is kept for the error message
+        assert r.error.endswith("noise") and len(r.error) <= 64 * 1024
+
+
+def test_oversized_stdout_line_fails_the_call(fake_codex, monkeypatch):
+    from src.backends import process_utils
+
+    monkeypatch.setattr(process_utils, "STREAM_LIMIT", 1000)
+    monkeypatch.setenv("FAKE_CODEX_LONG_LINE", "5000")
+
+    resp = call("hello", backend="codex", coalesce=False)
+    aresp = asyncio.run(acall("hello", backend="codex", coalesce=False))
+
+    for r in (resp, aresp):
+        assert r.error_kind == ErrorKind.EXIT
+        assert "over 1000 bytes" in r.error and r.text == ""
+
+
+def test_on_event_streams_events_as_they_arrive(fake_codex):
+    seen: list[str] = []
+
+    call("hello", backend="codex", on_event=lambda ev: seen.append(ev["type"]))
+
+    assert seen == ["thread.started", "item.completed", "turn.completed"]
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A killed child may linger as a zombie until its parent is reaped
+    with open(f"/proc/{pid}/stat") as f:
+        return f.read().split()[2] != "Z"
+
+
+@pytest.fixture
+def hanging_codex(fake_codex, tmp_path, monkeypatch):
+    pid_file = tmp_path / "child.pid"
+    monkeypatch.setenv("FAKE_CODEX_SLEEP", "60")
+    monkeypatch.setenv("FAKE_CODEX_CHILD_PID", str(pid_file))
+    return pid_file
+
+
+def wait_dead(pid_file) -> bool:
+    pid = int(pid_file.read_text())
+    for _ in range(100):
+        if not pid_alive(pid):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_timeout_kills_process_group(hanging_codex):
+    t0 = time.time()
+    resp = call("hello", backend="codex", timeout=0.5)
+
+    assert time.time() - t0 < 10
+    assert resp.error_kind == ErrorKind.TIMEOUT
+    assert "timed out" in resp.error
+    # The grandchild shares the CLI's process group and dies with it
+    assert wait_dead(hanging_codex)
+
+
+def test_cancel_event_stops_call(hanging_codex):
+    cancel = threading.Event()
+    threading.Timer(0.5, cancel.set).start()
+
+    resp = call("hello", backend="codex", cancel=cancel)
+
+    assert resp.error_kind == ErrorKind.CANCELLED
+    assert wait_dead(hanging_codex)
+
+
+def test_async_timeout(hanging_codex):
+    resp = asyncio.run(acall("hello", backend="codex", timeout=0.5))
+
+    assert resp.error_kind == ErrorKind.TIMEOUT
+    assert wait_dead(hanging_codex)
+
+
+def test_exit_error_kind(fake_codex, monkeypatch):
+    monkeypatch.setenv("FAKE_CODEX_EXIT", "3")
+
+    assert call("hello", backend="codex").error_kind == ErrorKind.EXIT
+
+
+def test_session_lookup_ignores_newer_foreign_rollout(fake_codex, monkeypatch):
+    seen: list[dict] = []
+    day_dir = fake_codex / time.strftime("%Y/%m/%d")
+
+    def plant_decoy(event):
+        # Another call's rollout written after ours, before lookup runs
+        if event["type"] == "turn.completed":
+            decoy = day_dir / "rollout-x-other.jsonl"
+            decoy.write_text("{}\n")
+            future = time.time() + 10
+            os.utime(decoy, (future, future))
+        seen.append(event)
+
+    resp = call("hello", backend="codex", on_event=plant_decoy)
+
+    assert resp.session_file.endswith(f"{seen[0]['thread_id']}.jsonl")
+    assert resp.thinking == ["thinking about hello"]
+
+
+def test_locate_waits_for_late_session_file(tmp_path):
+    from src.backends.session_utils import locate_session_file
+
+    target = tmp_path / "2026" / "01" / "02"  # partition not created yet
+
+    def write_late():
+        target.mkdir(parents=True)
+        (target / "rollout-a-123.jsonl").write_text("{}\n")
+
+    threading.Timer(0.3, write_late).start()
+    found = locate_session_file([target], "rollout-*123.jsonl", 0, timeout=5)
+
+    assert found == target / "rollout-a-123.jsonl"
+    assert locate_session_file([target], "rollout-*999.jsonl", 0, timeout=0.2) is None
+
+    # A file nobody has written to for a while needs no settle time
+    from src.backends.session_utils import settle
+
+    stale = target / "rollout-a-123.jsonl"
+    os.utime(stale, (time.time() - 60, time.time() - 60))
+    t0 = time.monotonic()
+    assert settle(stale) == stale and time.monotonic() - t0 < 0.05
+
+
+def test_directory_watch_climbs_no_higher_than_the_sessions_root(tmp_path):
+    from src.backends.session_utils import _DirectoryWatch
+
+    root = tmp_path / "sessions"
+    day = root / "2026" / "01" / "02"
+    watch = _DirectoryWatch([day], root=root)
+
+    assert watch._target(day) is None  # root itself missing: poll
+    (root / "2026").mkdir(parents=True)
+    assert watch._target(day) == root / "2026"
+    day.mkdir(parents=True)
+    assert watch._target(day) == day
+    # Outside the root, or with no root, missing directories are polled
+    assert watch._target(tmp_path / "elsewhere" / "x") is None
+    assert _DirectoryWatch([day])._target(root / "2027") is None
+
+
+def test_session_trace_is_parsed_on_first_access(fake_codex, monkeypatch):
+    parses: list = []
+    lookups: list = []
+    real = codex_backend._parse_codex_session
+    locate = codex_backend.locate_session_file
+    monkeypatch.setattr(
+        codex_backend, "_parse_codex_session",
+        lambda path: parses.append(path) or real(path),
+    )
+    monkeypatch.setattr(
+        codex_backend, "locate_session_file",
+        lambda *a, **kw: lookups.append(a) or locate(*a, **kw),
+    )
+    from src.agent import Agent
+
+    result = Agent(name="a", role="r").run("hello")
+    aresult = asyncio.run(Agent(name="a", role="r").arun("hello again"))
+
+    # Neither the lookup (with its settle wait) nor the parse ran yet
+    assert result.output.startswith("echo:") and parses == lookups == []
+    assert aresult.output.endswith("hello again")
+    assert result.trace.tool_calls[0]["name"] == "shell"
+    assert result.trace.thinking[0].startswith("thinking about")
+    assert result.trace.session_file.startswith(str(fake_codex))
+    assert len(parses) == len(lookups) == 1  # shared by all fields
+    assert aresult.trace.thinking[0].endswith("hello again")
+
+
+def test_cached_agent_run_leaves_session_parse_to_the_writer(
+    fake_codex, monkeypatch, tmp_path,
+):
+    from src.agent import Agent
+    from src.cache import ResultCache
+
+    parses: list = []
+    real = codex_backend._parse_codex_session
+    monkeypatch.setattr(
+        codex_backend, "_parse_codex_session",
+        lambda path: parses.append(threading.current_thread().name) or real(path),
+    )
+    cache = ResultCache(tmp_path)
+    agent = Agent(name="a", role="r", cache=cache)
+
+    result = agent.run("hello")
+    assert result.output.startswith("echo:") and not result.cached
+
+    cached = agent.run("hello")  # waits for the queued write
+    cache.flush()
+    assert cached.cached and cached.trace.thinking[0].startswith("thinking about")
+    assert len(parses) == 1 and parses[0].startswith("result-cache")
+
+
+def wait_for_idle(pool: WarmPool, n: int) -> None:
+    for _ in range(200):
+        if pool.idle_count() >= n:
+            return
+        time.sleep(0.01)
+    raise AssertionError("pool never refilled")
+
+
+def test_warm_pool_takes_startup_off_the_critical_path(fake_codex, monkeypatch):
+    monkeypatch.setenv("FAKE_CODEX_STARTUP", "0.5")
+
+    with WarmPool(size=1) as pool:
+        t0 = time.time()
+        cold = call("one", backend="codex")
+        cold_elapsed = time.time() - t0
+
+        wait_for_idle(pool, 1)
+        time.sleep(0.6)  # the warm worker finishes "starting up" meanwhile
+        t0 = time.time()
+        warm = call("two", backend="codex")
+        warm_elapsed = time.time() - t0
+
+    assert cold.text == "echo: one" and warm.text == "echo: two"
+    assert cold_elapsed >= 0.5 > warm_elapsed
+    stats = pool.stats
+    assert (stats.cold_starts, stats.warm_hits) == (1, 1)
+    assert pool.idle_count() == 0  # close() killed the refilled worker
+
+
+def test_warm_pool_discards_dead_and_stale_workers(fake_codex):
+    with WarmPool(size=1, max_idle=60) as pool:
+        call("one", backend="codex")
+        wait_for_idle(pool, 1)
+        worker = next(iter(pool._idle.values()))[0]
+        worker.proc.kill()
+        worker.proc.wait()
+        assert call("two", backend="codex").text == "echo: two"
+
+        wait_for_idle(pool, 1)
+        pool.max_idle = 0
+        assert call("three", backend="codex").text == "echo: three"
+
+    stats = pool.stats
+    assert (stats.dead, stats.recycled, stats.warm_hits) == (1, 1, 0)
+    assert stats.cold_starts == 3
+
+
+def test_warm_pool_reaps_stale_workers_off_the_calling_thread(
+    fake_codex, monkeypatch,
+):
+    from src.backends import worker_pool
+
+    reaped: list[str] = []
+    release = threading.Event()
+    discard = worker_pool._discard
+
+    def slow_discard(proc):
+        release.wait(5)  # a worker that only dies after the kill grace
+        reaped.append(threading.current_thread().name)
+        discard(proc)
+
+    monkeypatch.setattr(worker_pool, "_discard", slow_discard)
+    with WarmPool(size=1, max_idle=60) as pool:
+        call("one", backend="codex")
+        wait_for_idle(pool, 1)
+        pool.max_idle = 0
+        assert call("two", backend="codex").text == "echo: two"
+        assert reaped == []  # the call did not wait for the kill
+        release.set()
+        pool.max_idle = 60
+
+    assert pool.stats.recycled == 1
+    assert "warm-pool-reaper" in reaped  # close() reaps the rest itself
+
+
+def rollouts(sessions) -> int:
+    return len(list(sessions.rglob("rollout-*.jsonl")))
+
+
+def test_identical_concurrent_calls_share_one_process(fake_codex, monkeypatch):
+    monkeypatch.setenv("FAKE_CODEX_STARTUP", "0.3")
+    before = saved_calls()
+    responses: list = [None] * 4
+
+    def worker(i):
+        responses[i] = call("same", backend="codex")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(r is responses[0] for r in responses)
+    assert responses[0].text == "echo: same"
+    assert rollouts(fake_codex) == 1
+    assert saved_calls() - before == 3
+
+
+def test_async_coalescing_and_opt_out(fake_codex, monkeypatch):
+    monkeypatch.setenv("FAKE_CODEX_STARTUP", "0.3")
+
+    async def main():
+        shared = await asyncio.gather(*[acall("a", backend="codex") for _ in range(3)])
+        separate = await asyncio.gather(*[
+            acall("b", backend="codex", coalesce=False) for _ in range(2)
+        ])
+        return shared, separate
+
+    shared, separate = asyncio.run(main())
+
+    assert shared[0] is shared[1] is shared[2]
+    assert separate[0] is not separate[1]
+    assert rollouts(fake_codex) == 3
+
+
+def test_waiter_retries_when_leader_is_cancelled(fake_codex, monkeypatch):
+    monkeypatch.setenv("FAKE_CODEX_STARTUP", "0.5")
+    cancel = threading.Event()
+    results: dict = {}
+
+    leader = threading.Thread(target=lambda: results.update(
+        leader=call("p", backend="codex", cancel=cancel)))
+    leader.start()
+    time.sleep(0.1)
+    follower = threading.Thread(target=lambda: results.update(
+        follower=call("p", backend="codex")))
+    follower.start()
+    time.sleep(0.1)
+    cancel.set()
+    leader.join()
+    follower.join()
+
+    assert results["leader"].error_kind == ErrorKind.CANCELLED
+    assert results["follower"].text == "echo: p"
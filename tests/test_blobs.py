@@ -0,0 +1,112 @@
+"""
+Offline tests for the blob store and deduplicated traces.
+"""
+
+import json
+import sys
+
+sys.path.insert(0, ".")
+
+import src.blobs as blobs
+from src.backends import call
+from src.backends.mock import MOCK
+from src.blobs import REF, BlobStore, dedupe, expand
+from src.context import ContextRope
+from src.graph import GraphExecutor, parse_graph
+from src.tracing import build_trace, load_trace, save_trace
+
+
+def plan_graph(n: int) -> dict:
+    MOCK.configure("planner", replay={"steps": [
+        {"output": json.dumps([f"subtask {i}" for i in range(n)])},
+    ]})
+    return {
+        "name": "plan",
+        "nodes": {
+            "planner": {
+                "type": "dynamic",
+                "expand": "sequential",
+                "llm_call": {"backend": "mock", "model": "planner",
+                             "prompt": "Plan: {{task}}"},
+            },
+            "executor": {"role": "worker", "backend": "mock"},
+            "review": {"role": "reviewer", "backend": "mock"},
+        },
+        "edges": [
+            {"from": "_input", "to": "planner"},
+            {"from": "planner", "to": "executor", "context_policy": "accumulate"},
+            {"from": "executor", "to": "review", "context_policy": "aggregate"},
+            {"from": "review", "to": "_output"},
+        ],
+    }
+
+
+def test_store_dedupes_and_round_trips():
+    store = BlobStore()
+    text = "z" * 300
+    rope = ContextRope("a" * 300).append(text)
+
+    value = dedupe({"x": text, "y": ["short", rope], "z": "".join(["z"] * 300)}, store)
+
+    assert value["x"] == {REF: [store.put(text)]} and value["z"] == value["x"]
+    assert value["y"][0] == "short" and len(value["y"][1][REF]) == 2
+    assert len(store) == 2 and store.get(store.put("z" * 300)) is text
+    assert dedupe("a" * 300 + text, store) == value["y"][1]  # reuses the rope
+    assert dedupe("b" * 300 + text, store)[REF] != value["y"][1][REF]
+    assert expand(value, store.to_dict()) == {
+        "x": text, "y": ["short", str(rope)], "z": text,
+    }
+
+
+def test_growing_rope_hashes_each_leaf_once(monkeypatch):
+    hashed: list[int] = []
+    real = blobs.blob_id
+    monkeypatch.setattr(blobs, "blob_id", lambda t: hashed.append(len(t)) or real(t))
+    store = BlobStore()
+    rope = ContextRope()
+    for i in range(300):
+        rope = rope.append(f"{i:04}" + "s" * 296)
+        store.put_rope(rope)
+
+    assert sum(hashed) == 300 * 300
+    assert store.refs(str(rope)) == store.put_rope(rope)
+    assert len(store._ropes) == blobs.ROPE_MEMORY
+
+    for i in range(blobs.DIGEST_MEMORY + 10):
+        store.put(f"{i:05}" + "d" * 300)
+    assert len(store._ids) == blobs.DIGEST_MEMORY
+
+
+def test_aggregate_context_references_upstream_outputs():
+    MOCK.clear()
+    result = GraphExecutor(parse_graph(plan_graph(3))).run("task")
+
+    upstream, review = result.steps[-2:]
+    assert review.trace.context == f"[executor]:\n{upstream.output}"
+    assert any(leaf is upstream.output for leaf in review.trace.context.segments())
+    accumulated = result.steps[2].trace.context
+    assert any(leaf is result.steps[1].output for leaf in accumulated.segments())
+    MOCK.clear()
+
+
+def test_deduped_trace_matches_plain_and_is_smaller(tmp_path):
+    MOCK.clear()
+    MOCK.configure(output_chars=2000, tool_calls=2)
+    result = GraphExecutor(parse_graph(plan_graph(20))).run("task")
+
+    plain = build_trace(result, "task")
+    deduped = build_trace(result, "task", dedupe=True)
+    save_trace(plain, tmp_path / "plain.json")
+    save_trace(deduped, tmp_path / "deduped.json")
+    loaded = load_trace(tmp_path / "deduped.json")
+
+    assert "blobs" not in loaded and loaded["steps"] == plain["steps"]
+    assert load_trace(tmp_path / "plain.json")["steps"] == plain["steps"]
+    plain_bytes = (tmp_path / "plain.json").stat().st_size
+    assert (tmp_path / "deduped.json").stat().st_size < plain_bytes / 4
+
+    MOCK.clear()
+    MOCK.configure("replay", replay=tmp_path / "deduped.json")
+    resp = call("anything", backend="mock", model="replay")
+    assert resp.text in {s["output"] for s in plain["steps"]}
+    MOCK.clear()
@@ -0,0 +1,158 @@
+"""
+Offline tests for the content-addressed result cache.
+"""
+
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from src import agent as agent_module
+from src.agent import Agent, AgentResult, AgentTrace
+from src.backends import LLMResponse, TraceMessage
+from src.cache import ResultCache
+from src.graph import GraphExecutor, parse_graph
+
+
+def result(output: str) -> AgentResult:
+    return AgentResult(
+        agent_name="a",
+        output=output,
+        trace=AgentTrace(
+            full_prompt="p",
+            thinking=["hmm"],
+            session_messages=[TraceMessage("assistant", "text", output)],
+            output=output,
+            backend="codex",
+        ),
+    )
+
+
+def fake_backend(monkeypatch) -> list[str]:
+    prompts: list[str] = []
+
+    def call(prompt, *, backend, model, full_auto, **kwargs):
+        prompts.append(prompt)
+        return LLMResponse(text=f"answer {len(prompts)}", backend=str(backend))
+
+    monkeypatch.setattr(agent_module, "backend_call", call)
+    return prompts
+
+
+def test_roundtrip_preserves_trace(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = cache.key("prompt", backend="codex")
+
+    assert cache.get(key) is None
+    cache.put(key, result("hello"))
+    hit = ResultCache(tmp_path).get(key)  # fresh instance reads from disk
+
+    assert hit.output == "hello"
+    assert hit.trace.thinking == ["hmm"]
+    assert hit.trace.session_messages[0].content == "hello"
+
+
+def test_key_covers_backend_model_and_full_auto():
+    keys = {
+        ResultCache.key("p", backend="codex"),
+        ResultCache.key("p", backend="codex", model="gpt-5.2-codex"),
+        ResultCache.key("p", backend="gemini"),
+        ResultCache.key("p", backend="codex", full_auto=True),
+        ResultCache.key("q", backend="codex"),
+    }
+    # Empty model resolves to the backend default, so the first two match.
+    assert len(keys) == 4
+
+
+def test_ttl_expiry(tmp_path):
+    cache = ResultCache(tmp_path, ttl=0.05)
+    cache.put("k", result("x"))
+    time.sleep(0.1)
+
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(tmp_path, max_entries=2)
+    cache.put("a", result("a"))
+    time.sleep(0.01)
+    cache.put("b", result("b"))
+    time.sleep(0.01)
+    cache.get("a")  # refresh a; b is now least recently used
+    time.sleep(0.01)
+    cache.put("c", result("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").output == "a"
+    assert cache.get("c").output == "c"
+
+
+def test_size_eviction(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1)
+    cache.put("a", result("a" * 100))
+
+    assert len(cache) == 0
+
+
+def test_agent_serves_identical_prompt_from_cache(tmp_path, monkeypatch):
+    prompts = fake_backend(monkeypatch)
+    agent = Agent(name="a", role="r", cache=ResultCache(tmp_path))
+
+    first = agent.run("task")
+    second = agent.run("task")
+    third = agent.run("other task")
+
+    assert len(prompts) == 2
+    assert second.cached and not first.cached and not third.cached
+    assert second.output == first.output
+
+
+def test_async_agent_uses_cache_off_the_event_loop(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+
+    async def acall(prompt, **kwargs):
+        return LLMResponse(text="answer", backend="codex")
+
+    monkeypatch.setattr(agent_module, "backend_acall", acall)
+    cache = ResultCache(tmp_path)
+    threads: list[int] = []
+    for name in ("get", "put"):
+        method = getattr(cache, name)
+        monkeypatch.setattr(cache, name, lambda *a, _m=method: (
+            threads.append(threading.get_ident()), _m(*a),
+        )[1])
+    agent = Agent(name="a", role="r", cache=cache)
+
+    async def main():
+        return (
+            await agent.arun("task"), await agent.arun("task"),
+            threading.get_ident(),
+        )
+
+    first, second, loop_thread = asyncio.run(main())
+
+    assert not first.cached and second.cached and second.output == "answer"
+    assert len(threads) == 3 and loop_thread not in threads
+
+
+def test_executor_cache_with_node_opt_out(tmp_path, monkeypatch):
+    prompts = fake_backend(monkeypatch)
+    graph = parse_graph({
+        "name": "cached",
+        "nodes": {"a": {"role": "a"}, "b": {"role": "b", "cache": False}},
+        "edges": [
+            {"from": "_input", "to": "a"},
+            {"from": "a", "to": "b"},
+            {"from": "b", "to": "_output"},
+        ],
+    })
+    executor = GraphExecutor(graph, cache=ResultCache(tmp_path))
+
+    executor.run("task")
+    rerun = executor.run("task")
+
+    # a: 1 call then cached; b: opted out, called both times
+    assert len(prompts) == 3
+    assert [s.cached for s in rerun.steps] == [True, False]
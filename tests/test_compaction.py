@@ -0,0 +1,287 @@
+"""
+Offline tests for token-budgeted context assembly.
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from functools import partial
+
+sys.path.insert(0, ".")
+
+import pytest
+
+from src.agent import AgentResult
+from src.backends.mock import MOCK, Latency
+from src.graph import (
+    AsyncGraphExecutor,
+    ContextBudget,
+    ContextPolicy,
+    EdgeDef,
+    GraphExecutor,
+    LLMCallDef,
+    parse_graph,
+)
+from src.graph.compaction import (
+    SUMMARY_HEADER,
+    TRUNCATED,
+    ChainCompactor,
+    estimate_tokens,
+    summary_call,
+)
+from src.graph.envelope import TaskEnvelope
+from src.graph.executor import _build_context, _Deadline
+from src.graph.limits import ConcurrencyLimiter
+
+
+def fan_in(k: int, chars: int = 400) -> dict[str, list[TaskEnvelope]]:
+    completed = {}
+    for i in range(k):
+        env = TaskEnvelope(context_id="c", task=f"task {i}", node_id=f"s{i}")
+        env.mark_completed(AgentResult(agent_name=f"s{i}", output=f"{i}:" + "x" * chars))
+        completed[f"s{i}"] = [env]
+    return completed
+
+
+def edges(k: int, policy=ContextPolicy.AGGREGATE, budget=None) -> list[EdgeDef]:
+    return [EdgeDef(f"s{i}", "t", policy, budget) for i in range(k)]
+
+
+@pytest.mark.parametrize("strategy", ["tail", "head", "latest"])
+def test_node_budget_bounds_context_as_fan_in_grows(strategy):
+    budget = ContextBudget(max_tokens=500, strategy=strategy)
+    unbounded = str(_build_context(edges(100), fan_in(100)))
+
+    context = str(_build_context(edges(100), fan_in(100), budget))
+
+    assert estimate_tokens(unbounded) > 10_000
+    assert estimate_tokens(context) <= 500
+    if strategy == "tail":
+        assert context.startswith(TRUNCATED) and context.endswith(unbounded[-100:])
+    elif strategy == "head":
+        assert context.startswith("[s0]:") and context.endswith(TRUNCATED)
+    else:  # whole outputs, newest first
+        assert context.endswith(unbounded[-100:]) and TRUNCATED not in context
+        assert context.startswith("[s9") and context.count("[s") == 4
+
+
+def test_edge_budget_applies_per_source():
+    completed = fan_in(2, chars=4000)
+    budget = ContextBudget(max_tokens=100)
+    context = str(_build_context(
+        [EdgeDef("s0", "t", ContextPolicy.AGGREGATE, budget),
+         EdgeDef("s1", "t", ContextPolicy.AGGREGATE)],
+        completed,
+    ))
+
+    first, second = context.split("\n\n---\n\n")
+    assert estimate_tokens(first) <= 100 and first.startswith(TRUNCATED)
+    assert second == "[s1]:\n1:" + "x" * 4000
+
+
+def test_summarize_keeps_newest_and_condenses_the_rest():
+    MOCK.clear()
+    MOCK.configure("summarizer", replay={"steps": [{"output": "short recap"}]})
+    budget = ContextBudget(
+        max_tokens=400, strategy="summarize",
+        summarizer=LLMCallDef(backend="mock", model="summarizer"),
+    )
+
+    context = str(
+        _build_context(edges(10, ContextPolicy.ACCUMULATE), fan_in(10), budget)
+    )
+
+    assert context.startswith("Summary of earlier results:\nshort recap\n\n")
+    assert context.endswith("Result: 9:" + "x" * 400)
+    assert "task 0" not in context and estimate_tokens(context) <= 400
+
+    MOCK.configure("summarizer", error_rate=1.0)  # failed summary -> tail
+    context = _build_context(edges(10, ContextPolicy.ACCUMULATE), fan_in(10), budget)
+    assert context.startswith(TRUNCATED) and estimate_tokens(context) <= 400
+    MOCK.clear()
+
+
+def test_summarizer_call_shares_the_runs_limits():
+    MOCK.clear()
+    MOCK.configure("summarizer", latency=Latency.constant(0.2),
+                   replay={"steps": [{"output": "recap"}]})
+    budget = ContextBudget(
+        max_tokens=400, strategy="summarize",
+        summarizer=LLMCallDef(backend="mock", model="summarizer"),
+    )
+    limiter = ConcurrencyLimiter(backend_limits={"mock": 1})
+    cancel = threading.Event()
+
+    def build(deadline: _Deadline) -> str:
+        return str(_build_context(
+            edges(10, ContextPolicy.ACCUMULATE), fan_in(10), budget,
+            summarize=partial(summary_call, limiter=limiter,
+                              deadline=deadline, cancel=cancel),
+        ))
+
+    assert build(_Deadline(None)).startswith(SUMMARY_HEADER + "recap")
+    # Out of run time: the call fails at once and compaction falls back
+    t0 = time.monotonic()
+    assert build(_Deadline(0.01)).startswith(TRUNCATED)
+    # Queued behind a busy slot: the run's cancel event frees it
+    with limiter.slot("mock"):
+        threading.Timer(0.05, cancel.set).start()
+        assert build(_Deadline(None)).startswith(TRUNCATED)
+    assert time.monotonic() - t0 < 0.2
+    MOCK.clear()
+
+
+def test_yaml_budgets():
+    graph = parse_graph({
+        "name": "t",
+        "nodes": {
+            "a": {"role": "a", "backend": "mock"},
+            "b": {"role": "b", "backend": "mock", "context_budget": {
+                "max_tokens": 2000, "strategy": "summarize",
+                "summarizer": {"backend": "mock", "model": "small"},
+            }},
+        },
+        "edges": [
+            {"from": "_input", "to": "a"},
+            {"from": "a", "to": "b", "context_policy": "aggregate", "budget": 500},
+            {"from": "b", "to": "_output"},
+        ],
+    })
+
+    assert graph.edges[1].budget == ContextBudget(max_tokens=500)
+    summarizer = graph.nodes["b"].context_budget.summarizer
+    assert (summarizer.backend, summarizer.model) == ("mock", "small")
+
+    def node(budget) -> dict:
+        return {
+            "nodes": {"a": {"context_budget": budget}},
+            "edges": [{"from": "_input", "to": "a"}, {"from": "a", "to": "_output"}],
+        }
+
+    with pytest.raises(ValueError, match="not in"):
+        parse_graph(node({"max_tokens": 10, "strategy": "middle"}))
+    with pytest.raises(ValueError, match="requires a summarizer"):
+        parse_graph(node({"max_tokens": 10, "strategy": "summarize"}))
+    with pytest.raises(ValueError, match="positive integer"):
+        parse_graph(node({"max_tokens": 0}))
+
+
+def test_chain_summarizes_in_background_until_twice_over_budget():
+    MOCK.clear()
+    MOCK.configure("sum", latency=Latency.constant(0.3),
+                   replay={"steps": [{"output": "recap"}]})
+    budget = ContextBudget(
+        max_tokens=100, strategy="summarize",
+        summarizer=LLMCallDef(backend="mock", model="sum"),
+    )
+    chain = ChainCompactor(budget)
+    segment = "\n\nCompleted: step\nResult: " + "y" * 124  # 150 chars
+
+    t0 = time.monotonic()
+    contexts = [str(chain.append(segment)) for _ in range(5)]
+    assert time.monotonic() - t0 < 0.2  # 3rd append launched, nobody waited
+    assert all(SUMMARY_HEADER not in c for c in contexts)
+    assert len(contexts[-1]) == 750
+
+    context = str(chain.append(segment))  # 900 chars > 2x budget: waits
+    chain.close()
+    MOCK.clear()
+
+    assert time.monotonic() - t0 >= 0.25
+    assert context.startswith(f"\n\n{SUMMARY_HEADER}recap\n\nCompleted: step")
+    assert context.count("Completed: step") == 4 and chain.summaries == 1
+
+    # A failing summarizer falls back to the tail, still within 2x budget
+    MOCK.configure("sum", error_rate=1.0)
+    chain = ChainCompactor(budget)
+    contexts = [str(chain.append(segment)) for _ in range(30)]
+    chain.close()
+    MOCK.clear()
+
+    assert chain.summaries == 0 and max(map(len, contexts)) <= 2 * 100 * 4
+    assert contexts[-1].endswith(segment) and TRUNCATED in contexts[-1]
+
+
+def test_chain_without_summarizer_keeps_only_the_compacted_tail():
+    segment = "\n\nCompleted: step\nResult: " + "y" * 124
+    for strategy in ("tail", "summarize"):
+        chain = ChainCompactor(ContextBudget(max_tokens=10, strategy=strategy))
+        assert len(chain.append("x" * 100)) <= 40
+
+        chain = ChainCompactor(ContextBudget(max_tokens=100, strategy=strategy))
+        for i in range(200):
+            context = str(chain.append(segment + str(i)))
+        assert len(chain._segments) == 1 and len(context) <= 400
+        assert context.startswith(TRUNCATED) and context.endswith("y199")
+
+
+def test_chain_summary_waits_for_a_slot_and_the_runs_cancel():
+    MOCK.clear()
+    MOCK.configure("sum", replay={"steps": [{"output": "recap"}]})
+    budget = ContextBudget(
+        max_tokens=100, strategy="summarize",
+        summarizer=LLMCallDef(backend="mock", model="sum"),
+    )
+    limiter = ConcurrencyLimiter(backend_limits={"mock": 1})
+    cancel = threading.Event()
+    chain = ChainCompactor(budget, cancel=cancel, limiter=limiter)
+    segment = "\n\nCompleted: step\nResult: " + "y" * 124
+
+    with limiter.slot("mock"):
+        threading.Timer(0.1, cancel.set).start()
+        t0 = time.monotonic()
+        context = [str(chain.append(segment)) for _ in range(6)][-1]
+    chain.close()
+    MOCK.clear()
+
+    # The summary queued behind the held slot until the run was cancelled
+    assert time.monotonic() - t0 >= 0.1 and chain.summaries == 0
+    assert context.startswith(TRUNCATED) and len(context) <= 100 * 4
+
+
+def plan_graph(n: int, budget: dict) -> dict:
+    MOCK.configure("planner", replay={"steps": [
+        {"output": json.dumps([f"subtask {i}" for i in range(n)])},
+    ]})
+    MOCK.configure("sum", replay={"steps": [{"output": "recap"}]})
+    return {
+        "name": "plan",
+        "nodes": {
+            "planner": {
+                "type": "dynamic",
+                "expand": "sequential",
+                "llm_call": {"backend": "mock", "model": "planner",
+                             "prompt": "Plan: {{task}}"},
+            },
+            "executor": {"role": "worker", "backend": "mock"},
+        },
+        "edges": [
+            {"from": "_input", "to": "planner"},
+            {"from": "planner", "to": "executor",
+             "context_policy": "accumulate", "budget": budget},
+            {"from": "executor", "to": "_output"},
+        ],
+    }
+
+
+@pytest.mark.parametrize("executor", [GraphExecutor, AsyncGraphExecutor])
+def test_plan_execute_chain_stays_bounded(executor):
+    MOCK.clear()
+    graph = parse_graph(plan_graph(30, {
+        "max_tokens": 300, "strategy": "summarize",
+        "summarizer": {"backend": "mock", "model": "sum"},
+    }))
+
+    if executor is GraphExecutor:
+        result = executor(graph).run("task")
+    else:
+        result = asyncio.run(executor(graph).arun("task"))
+    MOCK.clear()
+
+    contexts = [s.trace.context for s in result.steps[:30] if s.trace.context]
+    assert result.success and len(contexts) == 29
+    assert max(map(len, contexts)) <= 2 * 300 * 4 + 250
+    assert SUMMARY_HEADER + "recap" in str(contexts[-1])
+    assert "subtask 28" in str(contexts[-1]) and "subtask 0\n" not in str(contexts[-1])
@@ -0,0 +1,81 @@
+"""
+Offline tests for rope-backed accumulating context.
+"""
+
+import sys
+
+sys.path.insert(0, ".")
+
+from src.agent import Agent
+from src.backends.mock import MOCK
+from src.context import ContextRope, run_chain
+from src.graph import GraphExecutor, parse_graph
+from src.logging import StepLogger
+from src.tracing import build_trace
+
+
+def test_rope_views_are_persistent():
+    base = ContextRope("a")
+    ab = base.append("b")
+    abc = ab.append("c")
+    branch = ab.append("X")  # appending to an older view must not clobber abc
+
+    assert str(base) == "a" and str(ab) == "ab"
+    assert abc == "abc" and branch == "abX" and len(branch) == 3
+    assert abc._shared is ab._shared and branch._shared is not ab._shared
+    assert str(ContextRope("[").append(abc).append("]")) == "[abc]"
+    assert not ContextRope() and ContextRope().append("") == ""
+
+
+def test_run_chain_accumulates_without_copying():
+    MOCK.clear()
+    agent = Agent(name="step", role="worker", backend="mock")
+    tasks = [f"task {i}" for i in range(5)]
+
+    results = run_chain([agent], tasks, StepLogger("t"), accumulate=True)
+
+    contexts = [r.trace.context for r in results]
+    assert contexts[0] is None
+    assert all(c._shared is contexts[1]._shared for c in contexts[1:])
+    expected = "".join(
+        f"\n\nCompleted: {t}\nResult: {r.output}" for t, r in zip(tasks, results)
+    )
+    assert contexts[-1] == expected[:len(contexts[-1])]
+    assert str(results[-1].trace.full_prompt).count("Completed: ") == 4
+    assert any(leaf is results[0].output for leaf in contexts[-1].segments())
+
+
+def test_sequential_expansion_shares_context():
+    MOCK.clear()
+    MOCK.configure("planner", replay={"steps": [
+        {"output": '["one", "two", "three"]'},
+    ]})
+    graph = parse_graph({
+        "name": "plan",
+        "nodes": {
+            "planner": {
+                "type": "dynamic",
+                "expand": "sequential",
+                "llm_call": {"backend": "mock", "model": "planner",
+                             "prompt": "Plan: {{task}}"},
+            },
+            "executor": {"role": "worker", "backend": "mock"},
+        },
+        "edges": [
+            {"from": "_input", "to": "planner"},
+            {"from": "planner", "to": "executor", "context_policy": "accumulate"},
+            {"from": "executor", "to": "_output"},
+        ],
+    })
+
+    result = GraphExecutor(graph).run("task")
+    trace = build_trace(result, "task")
+    MOCK.clear()
+
+    first, second, third = result.steps[:3]
+    assert second.trace.context._shared is third.trace.context._shared
+    assert trace["steps"][2]["context"] == (
+        f"\n\nCompleted: one\nResult: {first.output}"
+        f"\n\nCompleted: two\nResult: {second.output}"
+    )
+    assert trace["steps"][2]["full_prompt"].startswith("You are: worker\n\n")
@@ -0,0 +1,493 @@
+"""
+Offline tests for the graph executor.
+
+Agent.run is replaced with a fake that sleeps for a per-node duration,
+so scheduling behaviour can be verified without any CLI installed.
+"""
+
+import sys
+import threading
+import time
+
+sys.path.insert(0, ".")
+
+import pytest
+
+from src.agent import Agent, AgentResult
+from src.graph import GraphExecutor, parse_graph
+
+
+def fake_agents(monkeypatch, durations: dict[str, float], fail: set[str] = frozenset()):
+    """Patch Agent.run to sleep ``durations[name]`` and echo the context."""
+    calls: list[tuple[str, str]] = []
+
+    def run(self, task, context="", **kwargs):
+        calls.append((self.name, context))
+        time.sleep(durations.get(self.name, 0.0))
+        if self.name in fail:
+            return AgentResult(agent_name=self.name, output="", error="boom")
+        return AgentResult(agent_name=self.name, output=f"out:{self.name}")
+
+    monkeypatch.setattr(Agent, "run", run)
+    return calls
+
+
+def graph(edges: list[tuple[str, str, str]], name: str = "test") -> GraphExecutor:
+    nodes = {
+        n: {"role": n}
+        for src, dst, _ in edges for n in (src, dst)
+        if n not in ("_input", "_output")
+    }
+    return GraphExecutor(parse_graph({
+        "name": name,
+        "nodes": nodes,
+        "edges": [
+            {"from": s, "to": t, "context_policy": p} for s, t, p in edges
+        ],
+    }))
+
+
+def level_synchronous_makespan(executor: GraphExecutor, durations: dict[str, float]) -> float:
+    """Makespan a barrier-per-level scheduler would need for the same graph."""
+    from src.graph.executor import _parallel_groups, _topo_sort
+
+    g = executor.graph
+    return sum(
+        max(durations.get(n, 0.0) for n in group)
+        for group in _parallel_groups(g, _topo_sort(g))
+    )
+
+
+def test_dataflow_beats_level_barrier(monkeypatch):
+    # fast -> after_fast is the critical path; slow sits alone in level 1.
+    durations = {"fast": 0.05, "slow": 0.4, "after_fast": 0.4}
+    fake_agents(monkeypatch, durations)
+    ex = graph([
+        ("_input", "fast", "replace"),
+        ("_input", "slow", "replace"),
+        ("fast", "after_fast", "replace"),
+        ("after_fast", "_output", "replace"),
+        ("slow", "_output", "replace"),
+    ])
+
+    t0 = time.time()
+    result = ex.run("task")
+    makespan = time.time() - t0
+
+    barrier = level_synchronous_makespan(ex, durations)
+    assert result.success
+    assert len(result.steps) == 3
+    assert barrier == pytest.approx(0.8)
+    assert makespan < 0.65, f"dataflow makespan {makespan:.2f}s vs barrier {barrier:.2f}s"
+
+
+def test_node_waits_for_all_upstream(monkeypatch):
+    calls = fake_agents(monkeypatch, {"a": 0.01, "b": 0.1})
+    ex = graph([
+        ("_input", "a", "none"),
+        ("_input", "b", "none"),
+        ("a", "synth", "aggregate"),
+        ("b", "synth", "aggregate"),
+        ("synth", "_output", "replace"),
+    ])
+
+    result = ex.run("task")
+
+    assert result.success
+    assert [s.step_label for s in result.steps][-1] == "synth"
+    synth_context = dict(calls)["synth"]
+    assert "[a]:\nout:a" in synth_context
+    assert "[b]:\nout:b" in synth_context
+
+
+def test_failure_stops_downstream(monkeypatch):
+    calls = fake_agents(monkeypatch, {}, fail={"first"})
+    ex = graph([
+        ("_input", "first", "replace"),
+        ("first", "second", "replace"),
+        ("second", "_output", "replace"),
+    ])
+
+    result = ex.run("task")
+
+    assert not result.success
+    assert [name for name, _ in calls] == ["first"]
+
+
+def test_concurrency_limits_cap_in_flight_calls(monkeypatch):
+    lock = threading.Lock()
+    in_flight = {"all": 0, "codex": 0}
+    peak = {"all": 0, "codex": 0}
+
+    def run(self, task, context="", **kwargs):
+        keys = ["all"] + (["codex"] if self.backend == "codex" else [])
+        with lock:
+            for k in keys:
+                in_flight[k] += 1
+                peak[k] = max(peak[k], in_flight[k])
+        time.sleep(0.05)
+        with lock:
+            for k in keys:
+                in_flight[k] -= 1
+        return AgentResult(agent_name=self.name, output="ok")
+
+    monkeypatch.setattr(Agent, "run", run)
+    nodes = {f"w{i}": {"role": "w", "backend": "codex" if i % 2 else "gemini"}
+             for i in range(8)}
+    ex = GraphExecutor(parse_graph({
+        "name": "wide",
+        "concurrency": {"max_workers": 3, "backends": {"codex": 1}},
+        "nodes": nodes,
+        "edges": [{"from": "_input", "to": n} for n in nodes]
+        + [{"from": n, "to": "_output"} for n in nodes],
+    }))
+
+    result = ex.run("task")
+
+    assert result.success and len(result.steps) == 8
+    assert peak["all"] <= 3
+    assert peak["codex"] == 1
+
+
+def test_queued_slot_waiters_wake_on_cancel():
+    import asyncio
+
+    from src.graph.limits import (
+        AsyncConcurrencyLimiter,
+        ConcurrencyLimiter,
+        SlotCancelled,
+    )
+
+    limiter, cancel = ConcurrencyLimiter(2, {"codex": 1}), threading.Event()
+    with limiter.slot("codex"):
+        threading.Timer(0.05, cancel.set).start()
+        t0 = time.monotonic()
+        with pytest.raises(SlotCancelled):
+            with limiter.slot("codex", cancel):
+                pass
+        assert time.monotonic() - t0 < 0.5
+    with limiter.slot("codex"), limiter.slot("gemini"):
+        pass  # nothing leaked
+
+    async def queued() -> None:
+        limiter, cancel = AsyncConcurrencyLimiter(1), asyncio.Event()
+        async with limiter.slot("codex"):
+            asyncio.get_running_loop().call_later(0.05, cancel.set)
+            with pytest.raises(SlotCancelled):
+                async with limiter.slot("gemini", cancel):
+                    pass
+        async with limiter.slot("gemini"):
+            pass
+
+    asyncio.run(asyncio.wait_for(queued(), 1))
+
+
+def test_failure_cancels_nodes_queued_for_a_slot(monkeypatch):
+    from src.backends import ErrorKind
+
+    ran: list[str] = []
+
+    def run(self, task, context="", **kwargs):
+        ran.append(self.name)
+        time.sleep(0.05 if self.name == "bad" else 0.5)  # codex ignores cancel
+        error = "boom" if self.name == "bad" else None
+        return AgentResult(agent_name=self.name, output="x", error=error)
+
+    monkeypatch.setattr(Agent, "run", run)
+    nodes = {"bad": {"backend": "gemini"}, "c1": {"backend": "codex"},
+             "c2": {"backend": "codex"}}
+    ex = GraphExecutor(parse_graph({
+        "name": "queue",
+        "concurrency": {"backends": {"codex": 1}},
+        "nodes": nodes,
+        "edges": [{"from": "_input", "to": n} for n in nodes]
+        + [{"from": n, "to": "_output"} for n in nodes],
+    }))
+
+    result = ex.run("task")
+
+    bad, queued, holder = result.steps
+    assert bad.agent_name == "bad" and holder.agent_name in ran
+    assert queued.agent_name not in ran  # gave up its place in the queue
+    assert queued.error_kind == ErrorKind.CANCELLED
+
+
+def test_concurrency_config_validation():
+    def graph(concurrency):
+        return parse_graph({
+            "concurrency": concurrency,
+            "nodes": {"a": {}},
+            "edges": [{"from": "_input", "to": "a"}, {"from": "a", "to": "_output"}],
+        })
+
+    with pytest.raises(ValueError, match="max_workers"):
+        graph({"max_workers": 0})
+    with pytest.raises(ValueError, match="concurrency must be a mapping"):
+        graph([4])
+    with pytest.raises(ValueError, match="backends must be a mapping"):
+        graph({"backends": ["codex"]})
+    # An empty `concurrency:` section parses to None
+    assert graph(None).max_workers is None
+
+
+def test_async_executor_matches_sync_semantics(monkeypatch):
+    import asyncio
+
+    from src.graph import AsyncGraphExecutor
+
+    durations = {"fast": 0.05, "slow": 0.4, "after_fast": 0.4}
+
+    async def arun(self, task, context="", **kwargs):
+        await asyncio.sleep(durations.get(self.name, 0.0))
+        return AgentResult(agent_name=self.name, output=f"out:{self.name}:{context}")
+
+    monkeypatch.setattr(Agent, "arun", arun)
+    ex = AsyncGraphExecutor(graph([
+        ("_input", "fast", "replace"),
+        ("_input", "slow", "replace"),
+        ("fast", "after_fast", "replace"),
+        ("after_fast", "_output", "replace"),
+        ("slow", "_output", "replace"),
+    ]).graph)
+
+    result = asyncio.run(ex.arun("task"))
+
+    assert result.success
+    assert [s.step_label for s in result.steps] == ["fast", "slow", "after_fast"]
+    assert result.steps[-1].output == "out:after_fast:out:fast:"
+    assert result.elapsed < 0.65
+
+
+def test_resume_reruns_only_unfinished_nodes(tmp_path, monkeypatch):
+    from src.graph import RunStore
+
+    edges = [
+        ("_input", "a", "replace"),
+        ("_input", "b", "replace"),
+        ("a", "c", "aggregate"),
+        ("b", "c", "aggregate"),
+        ("c", "d", "replace"),
+        ("d", "_output", "replace"),
+    ]
+    calls = fake_agents(monkeypatch, {}, fail={"c"})
+    store = RunStore(tmp_path)
+    ex = GraphExecutor(graph(edges).graph, store=store)
+
+    first = ex.run("task")
+    context_id = first.metadata["context_id"]
+    assert not first.success
+    assert sorted(name for name, _ in calls) == ["a", "b", "c"]
+
+    calls = fake_agents(monkeypatch, {})
+    resumed = GraphExecutor(graph(edges).graph, store=store).resume(context_id)
+
+    assert resumed.success
+    assert [name for name, _ in calls] == ["c", "d"]
+    assert "[a]:\nout:a" in dict(calls)["c"]
+    assert [s.step_label for s in resumed.steps][-2:] == ["c", "d"]
+    assert len(resumed.steps) == 4
+
+
+def test_checkpoints_do_not_hold_up_the_scheduler(tmp_path, monkeypatch):
+    from src.graph import RunStore
+
+    started: dict[str, float] = {}
+
+    def run(self, task, context="", **kwargs):
+        started[self.name] = time.monotonic()
+        return AgentResult(agent_name=self.name, output=f"out:{self.name}")
+
+    save = RunStore.save_node
+
+    def slow_save(self, *args):
+        time.sleep(0.2)
+        save(self, *args)
+
+    monkeypatch.setattr(Agent, "run", run)
+    monkeypatch.setattr(RunStore, "save_node", slow_save)
+    store = RunStore(tmp_path)
+    ex = GraphExecutor(graph([
+        ("_input", "a", "replace"),
+        ("a", "b", "replace"),
+        ("b", "c", "replace"),
+        ("c", "_output", "replace"),
+    ]).graph, store=store)
+
+    result = ex.run("task")
+
+    assert started["c"] - started["a"] < 0.15
+    # run() returns only once every checkpoint is on disk
+    assert set(store.load_nodes(result.metadata["context_id"])) == {"a", "b", "c"}
+
+
+def test_chain_checkpoint_stores_each_output_once(tmp_path):
+    import json
+
+    from src.backends.mock import MOCK
+    from src.context import ContextRope
+    from src.graph import RunStore
+
+    MOCK.clear()
+    MOCK.configure(output_chars=2000)
+    MOCK.configure("planner", replay={"steps": [
+        {"output": json.dumps([f"subtask {i}" for i in range(60)])},
+    ]})
+    store = RunStore(tmp_path)
+    result = GraphExecutor(parse_graph({
+        "name": "chain",
+        "nodes": {
+            "planner": {"type": "dynamic", "expand": "sequential",
+                        "llm_call": {"backend": "mock", "model": "planner"}},
+            "executor": {"role": "worker", "backend": "mock"},
+        },
+        "edges": [
+            {"from": "_input", "to": "planner"},
+            {"from": "planner", "to": "executor", "context_policy": "accumulate"},
+            {"from": "executor", "to": "_output"},
+        ],
+    }), store=store).run("task")
+    MOCK.clear()
+
+    envelopes = store.load_nodes(result.metadata["context_id"])["planner"]
+    plain = len(json.dumps([e.to_dict() for e in envelopes]))
+    checkpoint = tmp_path / result.metadata["context_id"] / "nodes" / "planner.json"
+    assert checkpoint.stat().st_size < plain / 8
+
+    # Reloaded contexts are ropes over the reloaded outputs, not copies
+    last = envelopes[-1]
+    assert isinstance(last.context, ContextRope)
+    assert last.context == result.steps[-2].trace.context
+    assert any(leaf is envelopes[-2].result.output for leaf in last.context.segments())
+
+
+def test_failure_cancels_running_siblings(monkeypatch):
+    cancelled: list[str] = []
+
+    def run(self, task, context="", *, timeout=None, cancel=None):
+        if self.name == "bad":
+            time.sleep(0.05)
+            return AgentResult(agent_name=self.name, output="", error="boom")
+        if cancel.wait(5):
+            cancelled.append(self.name)
+            return AgentResult(agent_name=self.name, output="", error="cancelled")
+        return AgentResult(agent_name=self.name, output="late")
+
+    monkeypatch.setattr(Agent, "run", run)
+    ex = graph([
+        ("_input", "bad", "replace"),
+        ("_input", "slow", "replace"),
+        ("bad", "_output", "replace"),
+        ("slow", "_output", "replace"),
+    ])
+
+    t0 = time.time()
+    result = ex.run("task")
+
+    assert time.time() - t0 < 2
+    assert not result.success
+    assert cancelled == ["slow"]
+
+
+def test_node_timeout_is_clamped_to_run_deadline(monkeypatch):
+    seen: dict[str, float | None] = {}
+
+    def run(self, task, context="", *, timeout=None, cancel=None):
+        seen[self.name] = timeout
+        return AgentResult(agent_name=self.name, output="ok")
+
+    monkeypatch.setattr(Agent, "run", run)
+    g = parse_graph({
+        "name": "t",
+        "timeout": 30,
+        "nodes": {"a": {"role": "a", "timeout": 5}, "b": {"role": "b"}},
+        "edges": [
+            {"from": "_input", "to": "a"},
+            {"from": "a", "to": "b"},
+            {"from": "b", "to": "_output"},
+        ],
+    })
+    GraphExecutor(g).run("task")
+
+    assert seen["a"] == 5
+    assert 29 < seen["b"] <= 30
+    assert GraphExecutor(g, timeout=60).timeout == 60
+    with pytest.raises(ValueError, match="timeout"):
+        parse_graph({"name": "t", "timeout": 0, "nodes": {"a": {"role": "a"}},
+                     "edges": [{"from": "_input", "to": "a"}]})
+
+
+def single_node(node: dict) -> GraphExecutor:
+    return GraphExecutor(parse_graph({
+        "name": "t",
+        "nodes": {"a": {"role": "a", **node}},
+        "edges": [{"from": "_input", "to": "a"}, {"from": "a", "to": "_output"}],
+    }))
+
+
+def test_retry_transient_errors_with_backoff(monkeypatch):
+    from src.backends import ErrorKind
+
+    kinds = [ErrorKind.API, ErrorKind.TIMEOUT, None]
+
+    def run(self, task, context="", **kwargs):
+        kind = kinds.pop(0)
+        if kind:
+            return AgentResult(agent_name=self.name, output="", error="x", error_kind=kind)
+        return AgentResult(agent_name=self.name, output="ok")
+
+    monkeypatch.setattr(Agent, "run", run)
+    ex = single_node({"retry": {"max_attempts": 3, "backoff": 0.01, "jitter": False}})
+
+    result = ex.run("task")
+
+    assert result.success
+    assert result.steps[0].attempts == 3
+
+    # Non-retryable kinds fail on the first attempt.
+    kinds[:] = [ErrorKind.EXIT, None]
+    result = single_node({"retry": {"retry_on": ["api"], "backoff": 0.01}}).run("task")
+    assert not result.success and result.steps[0].attempts == 1
+    with pytest.raises(ValueError, match="retry_on"):
+        single_node({"retry": {"retry_on": ["cancelled"]}})
+
+
+def test_hedge_wins_over_slow_primary(monkeypatch):
+    calls: list[str] = []
+    cancelled: list[str] = []
+
+    def run(self, task, context="", *, timeout=None, cancel=None, coalesce=True):
+        calls.append(self.backend)
+        if self.backend == "codex":  # the straggler
+            if cancel.wait(5):
+                cancelled.append(self.backend)
+                return AgentResult(agent_name=self.name, output="", error="cancelled")
+        return AgentResult(agent_name=self.name, output=f"out:{self.backend}")
+
+    monkeypatch.setattr(Agent, "run", run)
+    ex = single_node({"hedge": {"after": 0.05, "backend": "gemini"}})
+
+    t0 = time.time()
+    result = ex.run("task")
+
+    assert time.time() - t0 < 2
+    assert result.success and result.steps[0].hedged
+    assert result.steps[0].output == "out:gemini"
+    assert calls == ["codex", "gemini"] and cancelled == ["codex"]
+
+
+def test_hedge_needs_spare_capacity(monkeypatch):
+    calls: list[str] = []
+
+    def run(self, task, context="", **kwargs):
+        calls.append(self.backend)
+        time.sleep(0.2)
+        return AgentResult(agent_name=self.name, output="ok")
+
+    monkeypatch.setattr(Agent, "run", run)
+    ex = single_node({"hedge": {"after": 0.01}})
+    ex.max_workers = 1
+
+    result = ex.run("task")
+
+    assert result.success and not result.steps[0].hedged
+    assert calls == ["codex"]
@@ -0,0 +1,98 @@
+"""
+Offline tests for the in-process mock backend.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+
+sys.path.insert(0, ".")
+
+import pytest
+
+from src.backends import ErrorKind, acall, call
+from src.backends.mock import MOCK, Latency
+from src.graph import AsyncGraphExecutor, GraphExecutor, parse_graph
+from src.tracing import build_trace
+
+
+@pytest.fixture(autouse=True)
+def fresh_mock():
+    MOCK.clear()
+    yield
+    MOCK.clear()
+
+
+def wide_graph(width: int) -> dict:
+    nodes = {f"w{i}": {"role": "worker", "backend": "mock"} for i in range(width)}
+    nodes["synth"] = {"role": "synth", "backend": "mock"}
+    return {
+        "name": "wide",
+        "nodes": nodes,
+        "edges": [{"from": "_input", "to": f"w{i}"} for i in range(width)]
+        + [{"from": f"w{i}", "to": "synth", "context_policy": "aggregate"}
+           for i in range(width)]
+        + [{"from": "synth", "to": "_output"}],
+    }
+
+
+def test_draws_are_deterministic_per_seed():
+    MOCK.configure(latency=Latency.lognormal(1.0, 0.5), time_scale=0, seed=3,
+                   tool_calls=2)
+    first = [call(f"p{i}", backend="mock", coalesce=False).text for i in range(5)]
+    again = call("p0", backend="mock", coalesce=False)
+    MOCK.clear()
+    MOCK.configure(latency=Latency.lognormal(1.0, 0.5), time_scale=0, seed=3,
+                   tool_calls=2)
+    second = [call(f"p{i}", backend="mock", coalesce=False).text for i in range(5)]
+
+    assert first == second
+    assert again.text != first[0]  # the 2nd call with a prompt draws anew
+    assert len(again.tool_calls) == 2 and again.thinking
+    assert again.usage["output_tokens"] == 50
+
+
+def test_error_rate_and_timeout():
+    MOCK.configure(error_rate=1.0)
+    assert call("p", backend="mock").error_kind == ErrorKind.API
+
+    MOCK.configure(latency=Latency.constant(5))
+    t0 = time.monotonic()
+    resp = call("p", backend="mock", timeout=0.05)
+    assert resp.error_kind == ErrorKind.TIMEOUT
+    assert time.monotonic() - t0 < 1
+
+    cancel = threading.Event()
+    threading.Timer(0.05, cancel.set).start()
+    assert call("q", backend="mock", cancel=cancel).error_kind == ErrorKind.CANCELLED
+    cancel = asyncio.Event()
+    cancel.set()
+    resp = asyncio.run(acall("r", backend="mock", cancel=cancel))
+    assert resp.error_kind == ErrorKind.CANCELLED
+
+
+def test_replays_recorded_trace():
+    MOCK.configure(time_scale=0)
+    recorded = build_trace(GraphExecutor(parse_graph(wide_graph(3))).run("t"), "t")
+    MOCK.clear()
+    MOCK.configure("replay", replay=recorded)
+
+    resp = call("anything", backend="mock", model="replay")
+
+    assert resp.text in {s["output"] for s in recorded["steps"]}
+    assert resp.session_messages[-1].content == resp.text
+
+
+def test_executor_runs_offline_at_high_throughput():
+    width = 500
+    result = GraphExecutor(parse_graph(wide_graph(width))).run("task")
+
+    assert result.success and len(result.steps) == width + 1
+    assert result.steps[-1].trace.backend == "mock"
+    assert result.elapsed < 5
+
+    async_result = asyncio.run(
+        AsyncGraphExecutor(parse_graph(wide_graph(width))).arun("task"),
+    )
+    assert async_result.success and len(async_result.steps) == width + 1
@@ -0,0 +1,66 @@
+"""
+Planning benchmark: topological sort + level assignment on a 50k-node
+synthetic DAG must stay near-linear.
+
+The previous list-sort/pop(0) Kahn loop and per-round remaining.remove()
+were quadratic on wide graphs and took minutes at this size.
+"""
+
+import random
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from src.graph import EdgeDef, GraphDef, NodeDef
+from src.graph.executor import _parallel_groups, _topo_sort
+
+N_NODES = 50_000
+FAN_IN = 3
+TIME_BOUND_SECONDS = 5.0
+
+
+def synthetic_dag(n: int, fan_in: int, seed: int = 0) -> GraphDef:
+    """Random layered DAG: every node depends on up to `fan_in` earlier nodes."""
+    rng = random.Random(seed)
+    ids = [f"n{i:05d}" for i in range(n)]
+    nodes = {nid: NodeDef(id=nid) for nid in ids}
+    edges: list[EdgeDef] = []
+    for i, nid in enumerate(ids):
+        if i < 100:
+            edges.append(EdgeDef("_input", nid))
+            continue
+        for src in rng.sample(ids[max(0, i - 1000):i], min(fan_in, i)):
+            edges.append(EdgeDef(src, nid))
+    edges.extend(EdgeDef(nid, "_output") for nid in ids[-100:])
+    return GraphDef(name="synthetic", nodes=nodes, edges=edges)
+
+
+def test_plan_50k_node_graph_within_bound():
+    graph = synthetic_dag(N_NODES, FAN_IN)
+
+    t0 = time.perf_counter()
+    order = _topo_sort(graph)
+    groups = _parallel_groups(graph, order)
+    elapsed = time.perf_counter() - t0
+
+    assert len(order) == N_NODES
+    assert sum(len(g) for g in groups) == N_NODES
+    assert elapsed < TIME_BOUND_SECONDS, (
+        f"planned {N_NODES} nodes into {len(groups)} levels in {elapsed:.2f}s"
+    )
+
+
+def test_order_and_levels_are_deterministic_and_valid():
+    graph = synthetic_dag(2000, FAN_IN, seed=1)
+
+    order = _topo_sort(graph)
+    groups = _parallel_groups(graph, order)
+
+    assert order == _topo_sort(graph)
+    position = {nid: i for i, nid in enumerate(order)}
+    level = {nid: k for k, g in enumerate(groups) for nid in g}
+    for e in graph.edges:
+        if e.source in graph.nodes and e.target in graph.nodes:
+            assert position[e.source] < position[e.target]
+            assert level[e.source] < level[e.target]
@@ -0,0 +1,86 @@
+"""
+Offline tests for the process-wide backend rate limiter.
+"""
+
+import sys
+import threading
+import time
+
+sys.path.insert(0, ".")
+
+import pytest
+
+import src.backends as backends
+from src.backends import ErrorKind, LLMResponse, call
+from src.backends.rate_limit import RATE_LIMITS, TokenBucket
+
+
+@pytest.fixture
+def fake_dispatch(monkeypatch):
+    """Replace the CLI dispatch with an instant fake that records start times."""
+    starts: list[float] = []
+
+    def dispatch(prompt, backend, model, full_auto, **kwargs):
+        starts.append(time.monotonic())
+        return LLMResponse(
+            text=prompt, backend=backend, model=model,
+            usage={"input_tokens": 900, "output_tokens": 100},
+        )
+
+    monkeypatch.setattr(backends, "_dispatch", dispatch)
+    yield starts
+    RATE_LIMITS.clear()
+
+
+def test_token_bucket_spaces_reservations_at_the_refill_rate():
+    bucket = TokenBucket(per_minute=120, burst_seconds=0)  # 2/s, capacity 1
+
+    delays = [bucket.reserve(1) for _ in range(4)]
+
+    assert delays[0] == 0
+    assert delays[1:] == pytest.approx([0.5, 1.0, 1.5], abs=0.05)
+
+
+def test_parallel_burst_is_smoothed_not_failed(fake_dispatch):
+    RATE_LIMITS.configure("codex", rpm=240, burst_seconds=0)  # one per 0.25s
+    results: list = []
+
+    threads = [
+        threading.Thread(target=lambda i=i: results.append(
+            call(f"p{i}", backend="codex")))
+        for i in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(r.error is None for r in results)
+    gaps = [b - a for a, b in zip(fake_dispatch, fake_dispatch[1:])]
+    assert all(g > 0.15 for g in gaps)
+    assert max(r.queue_delay for r in results) == pytest.approx(0.75, abs=0.1)
+
+
+def test_wait_longer_than_timeout_fails_fast_and_refunds(fake_dispatch):
+    RATE_LIMITS.configure("codex", rpm=6, burst_seconds=0)  # one per 10s
+    call("first", backend="codex")
+
+    t0 = time.monotonic()
+    resp = call("second", backend="codex", timeout=0.2)
+
+    assert resp.error_kind == ErrorKind.TIMEOUT
+    assert time.monotonic() - t0 < 1
+    assert len(fake_dispatch) == 1
+
+
+def test_model_limits_and_token_settlement(fake_dispatch):
+    RATE_LIMITS.configure("codex", "slow-model", tpm=60_000, burst_seconds=1)
+
+    other = call("x" * 4000, backend="codex", model="fast-model")
+    first = call("x" * 4000, backend="codex", model="slow-model")
+    second = call("y" * 4000, backend="codex", model="slow-model")
+
+    assert other.queue_delay == 0 and first.queue_delay == 0
+    # 1000 estimated tokens per call against 1000/s: the second call waits
+    # on the settled debt of the first (900 + 100 reported tokens).
+    assert second.queue_delay == pytest.approx(1.0, abs=0.1)
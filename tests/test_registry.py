@@ -0,0 +1,117 @@
+"""
+Offline tests for the pluggable backend registry.
+"""
+
+import asyncio
+import sys
+import threading
+
+sys.path.insert(0, ".")
+
+import pytest
+
+from src.backends import (
+    Capabilities,
+    LLMResponse,
+    acall,
+    call,
+    call_batch,
+    register_backend,
+)
+from src.backends.registry import REGISTRY
+from src.graph import GraphExecutor, parse_graph
+
+
+@pytest.fixture
+def echo():
+    """A sync-only, non-streaming backend that records its calls."""
+    seen: list[tuple[str, str, object]] = []
+
+    def call_echo(prompt, *, model, full_auto, timeout=None, cancel=None):
+        seen.append((prompt, model, cancel))
+        return LLMResponse(text=f"echo: {prompt}", backend="echo", model=model)
+
+    register_backend("echo", call_echo, default_model="echo-1")
+    yield seen
+    REGISTRY.unregister("echo")
+
+
+def test_custom_backend_through_call_and_acall(echo):
+    events = []
+    resp = call("hi", backend="echo", on_event=events.append)
+
+    assert resp.text == "echo: hi" and resp.model == "echo-1"
+    assert events == [{"type": "text", "text": "echo: hi"}]
+
+    cancel = asyncio.Event()
+    resp = asyncio.run(acall("async", backend="echo", cancel=cancel))
+    assert resp.text == "echo: async"
+    assert isinstance(echo[-1][2], threading.Event)  # bridged for the thread
+
+
+def test_registration_errors(echo):
+    with pytest.raises(ValueError, match="already registered"):
+        register_backend("echo", lambda prompt, **kw: None)
+    with pytest.raises(ValueError, match="requires `batch`"):
+        register_backend("b", "x:y", capabilities=Capabilities(batching=True))
+    with pytest.raises(ValueError, match="requires `acall`"):
+        register_backend("b", "x:y", capabilities=Capabilities(async_native=True))
+    with pytest.raises(ValueError, match="Unknown backend"):
+        call("p", backend="nope")
+
+
+def test_call_batch_uses_batch_capability(echo):
+    batches = []
+
+    def batch(prompts, *, model, full_auto, timeout=None, cancel=None):
+        batches.append(list(prompts))
+        return [LLMResponse(text=p.upper(), backend="bulk", model=model)
+                for p in prompts]
+
+    register_backend(
+        "bulk", "unused.module:call", default_model="bulk-1",
+        capabilities=Capabilities(batching=True), batch=batch,
+    )
+    try:
+        resps = call_batch(["a", "b", "c"], backend="bulk")
+    finally:
+        REGISTRY.unregister("bulk")
+
+    assert [r.text for r in resps] == ["A", "B", "C"]
+    assert batches == [["a", "b", "c"]]
+
+    resps = call_batch(["x", "y"], backend="echo")
+    assert [r.text for r in resps] == ["echo: x", "echo: y"]
+    assert sorted(p for p, _, _ in echo) == ["x", "y"]
+
+
+def test_graph_can_name_registered_backend(echo):
+    graph = parse_graph({
+        "name": "t",
+        "nodes": {"a": {"role": "a", "backend": "echo"}},
+        "edges": [{"from": "_input", "to": "a"}, {"from": "a", "to": "_output"}],
+    })
+
+    result = GraphExecutor(graph).run("task")
+
+    assert result.success and result.steps[0].trace.backend == "echo"
+    assert echo and echo[0][1] == "echo-1"
+
+
+def test_acall_runs_blocking_backends_in_a_thread():
+    threads = []
+
+    def call_blocking(prompt, *, model, full_auto, timeout=None, cancel=None):
+        threads.append(threading.current_thread())
+        return LLMResponse(text=prompt, backend="blocking", model=model)
+
+    async def acall_blocking(prompt, **kwargs):
+        return call_blocking(prompt, **kwargs)
+
+    register_backend("blocking", call_blocking, acall=acall_blocking)
+    try:
+        resp = asyncio.run(acall("p", backend="blocking"))
+    finally:
+        REGISTRY.unregister("blocking")
+
+    assert resp.text == "p" and threads[0] is not threading.main_thread()
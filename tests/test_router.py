@@ -0,0 +1,141 @@
+"""
+Offline tests for backend fallback chains and latency-aware routing.
+"""
+
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+import pytest
+
+import src.backends as backends
+from src.backends import Backend, ErrorKind, LLMResponse, backend_stats, call
+from src.backends.router import ROUTER
+from src.graph import parse_graph
+
+
+@pytest.fixture
+def fake_dispatch(monkeypatch):
+    """CLI dispatch fake: per-backend latency and an optional outage."""
+    behaviour = {"latency": {}, "down": set()}
+    calls: list[str] = []
+
+    def dispatch(prompt, backend, model, full_auto, **kwargs):
+        calls.append(backend)
+        time.sleep(behaviour["latency"].get(backend, 0.0))
+        if backend in behaviour["down"]:
+            return LLMResponse(
+                text="", error="503", backend=backend, model=model,
+                error_kind=ErrorKind.API,
+            )
+        return LLMResponse(text=backend, backend=backend, model=model)
+
+    monkeypatch.setattr(backends, "_dispatch", dispatch)
+    ROUTER.clear()
+    yield behaviour, calls
+    ROUTER.clear()
+
+
+def test_fails_over_to_next_candidate(fake_dispatch):
+    behaviour, calls = fake_dispatch
+    behaviour["down"].add("codex")
+
+    resp = call("p", backend="codex", fallbacks=[("gemini", "")])
+
+    assert resp.error is None and resp.backend == "gemini"
+    assert calls == ["codex", "gemini"]
+    decision = ROUTER.decisions[-1]
+    assert decision.attempts == [
+        ("codex/gpt-5.2-codex", "api"), ("gemini/gemini-2.5-pro", None),
+    ]
+    assert decision.chosen == "gemini/gemini-2.5-pro"
+
+
+def test_degraded_backend_is_tried_last(fake_dispatch):
+    behaviour, calls = fake_dispatch
+    behaviour["down"].add("codex")
+    for _ in range(ROUTER.failure_threshold):
+        call("p", backend="codex", coalesce=False)
+    calls.clear()
+
+    resp = call("p", backend="codex", fallbacks=[("claude_code", "")])
+
+    assert calls == ["claude_code"] and resp.error is None
+    assert backend_stats()["codex/gpt-5.2-codex"]["degraded"]
+    assert ROUTER.decisions[-1].degraded == ["codex/gpt-5.2-codex"]
+
+
+def test_routes_to_lower_observed_latency(fake_dispatch):
+    behaviour, calls = fake_dispatch
+    behaviour["latency"] = {"codex": 0.1, "gemini": 0.01}
+    call("warm", backend="codex")
+    call("warm", backend="gemini")
+    calls.clear()
+
+    resp = call("p", backend="codex", fallbacks=[("gemini", "")])
+
+    assert resp.backend == "gemini" and calls == ["gemini"]
+    stats = ROUTER.stats(Backend.CODEX, "gpt-5.2-codex")
+    assert stats.calls == 1 and stats.in_flight == 0
+    assert stats.latency == pytest.approx(0.1, abs=0.05)
+
+
+def test_yaml_backend_candidate_list():
+    graph = parse_graph({
+        "name": "t",
+        "nodes": {"a": {
+            "role": "a",
+            "model": "gpt-5.2",
+            "backend": ["codex", {"backend": "gemini", "model": "gemini-2.5-flash"}],
+        }},
+        "edges": [{"from": "_input", "to": "a"}, {"from": "a", "to": "_output"}],
+    })
+    node = graph.nodes["a"]
+
+    assert (node.backend, node.model) == ("codex", "gpt-5.2")
+    assert node.fallbacks == [("gemini", "gemini-2.5-flash")]
+    with pytest.raises(ValueError, match="unknown backend"):
+        parse_graph({
+            "nodes": {"a": {"backend": ["codex", "nope"]}},
+            "edges": [{"from": "_input", "to": "a"}, {"from": "a", "to": "_output"}],
+        })
+
+
+def test_limiter_slot_follows_the_routed_backend(fake_dispatch):
+    from src.graph.limits import ConcurrencyLimiter
+
+    behaviour, calls = fake_dispatch
+    behaviour["down"].add("codex")
+    limiter = ConcurrencyLimiter(backend_limits={"gemini": 1})
+    held: list[str] = []
+
+    def slot(backend):
+        held.append(backend)
+        return limiter.slot(backend)
+
+    resp = call("p", backend="codex", fallbacks=[("gemini", "")], slot=slot)
+
+    assert resp.backend == "gemini" and held == calls == ["codex", "gemini"]
+    with limiter.try_slot("gemini") as free:
+        assert free
+
+
+def test_fallback_answers_are_not_cached(fake_dispatch, tmp_path):
+    from src.agent import Agent
+    from src.cache import ResultCache
+
+    behaviour, calls = fake_dispatch
+    behaviour["down"].add("codex")
+    agent = Agent(
+        name="a", role="r", backend="codex", fallbacks=[("gemini", "")],
+        cache=ResultCache(tmp_path),
+    )
+
+    assert agent.run("t").output == "gemini"
+    behaviour["down"].clear()
+    ROUTER.clear()
+    second = agent.run("t")
+
+    assert not second.cached and second.output == "codex"
+    assert agent.run("t").cached
@@ -0,0 +1,58 @@
+"""
+Offline tests for GraphDef adjacency indexing and loader validation.
+"""
+
+import sys
+
+sys.path.insert(0, ".")
+
+import pytest
+
+from src.graph import EdgeDef, GraphDef, NodeDef, parse_graph
+
+
+def chain(n: int) -> dict:
+    nodes = {f"n{i}": {"role": "r"} for i in range(n)}
+    edges = [{"from": "_input", "to": "n0"}]
+    edges += [{"from": f"n{i}", "to": f"n{i+1}"} for i in range(n - 1)]
+    edges += [{"from": f"n{n-1}", "to": "_output"}]
+    return {"name": "chain", "nodes": nodes, "edges": edges}
+
+
+def test_index_tracks_mutation():
+    g = GraphDef(name="g", nodes={"a": NodeDef(id="a")})
+    g.add_edge(EdgeDef("_input", "a"))
+    assert g.entry_nodes == ["a"] and g.exit_nodes == []
+
+    g.add_node(NodeDef(id="b"))
+    g.edges.append(EdgeDef("a", "b"))  # plain list mutation is detected too
+    g.add_edge(EdgeDef("b", "_output"))
+
+    assert [e.source for e in g.upstream("b")] == ["a"]
+    assert [e.target for e in g.downstream("a")] == ["b"]
+    assert g.exit_nodes == ["b"]
+
+    g.edges = [EdgeDef("_input", "b"), EdgeDef("b", "_output")]
+    assert g.upstream("a") == [] and g.entry_nodes == ["b"]
+
+
+def test_lookups_return_copies():
+    g = parse_graph(chain(2))
+    g.upstream("n1").clear()
+
+    assert len(g.upstream("n1")) == 1
+
+
+def test_long_chain_validates_without_recursion_error():
+    g = parse_graph(chain(5000))
+
+    assert g.entry_nodes == ["n0"]
+    assert g.exit_nodes == ["n4999"]
+
+
+def test_cycle_detection():
+    data = chain(3)
+    data["edges"].append({"from": "n2", "to": "n0"})
+
+    with pytest.raises(ValueError, match="Cycle detected"):
+        parse_graph(data)
@@ -0,0 +1,113 @@
+"""
+Offline tests for the streaming session-file parsers.
+"""
+
+import json
+import sys
+import tracemalloc
+
+sys.path.insert(0, ".")
+
+from src.backends.claude_code import _parse_claude_code_session
+from src.backends.codex import _parse_codex_session
+from src.backends.gemini import _parse_gemini_session
+from src.backends.session_utils import TraceLimits, iter_json_array, iter_jsonl
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+    return path
+
+
+def test_codex_parse_caps_tool_output(tmp_path):
+    path = write_jsonl(tmp_path / "rollout.jsonl", [
+        {"type": "response_item", "payload": {
+            "type": "reasoning", "summary": [{"text": "plan"}]}},
+        {"type": "response_item", "payload": {
+            "type": "function_call", "name": "shell", "arguments": "a" * 50,
+            "call_id": "c1"}},
+        {"type": "response_item", "payload": {
+            "type": "function_call_output", "call_id": "c1",
+            "output": "z" * 10_000}},
+        "not a record",
+    ])
+
+    thinking, calls, results, messages = _parse_codex_session(
+        path, TraceLimits(tool_output=100, tool_input=10),
+    )
+
+    assert thinking == ["plan"]
+    assert calls[0]["arguments"].startswith("a" * 10) and len(calls[0]["arguments"]) < 50
+    assert results == [{"call_id": "c1", "output": "z" * 100 + "...[truncated]"}]
+    assert [m.content_type for m in messages] == ["thinking", "tool_call", "tool_result"]
+
+
+def test_claude_parse_and_max_items(tmp_path):
+    path = write_jsonl(tmp_path / "s.jsonl", [
+        {"type": "progress"},
+        {"type": "user", "message": {"content": "hi"}},
+        {"type": "assistant", "message": {"content": [
+            {"type": "thinking", "thinking": "hmm"},
+            {"type": "tool_use", "id": "t1", "name": "Read", "input": {"p": 1}},
+            {"type": "text", "text": "done"},
+        ]}},
+    ])
+
+    thinking, calls, _, messages = _parse_claude_code_session(path)
+    capped = _parse_claude_code_session(path, TraceLimits(max_items=2))[3]
+
+    assert thinking == ["hmm"]
+    assert calls == [{"id": "t1", "name": "Read", "input": {"p": 1}}]
+    assert [m.content for m in messages][-1] == "done"
+    assert len(messages) == 4 and len(capped) == 2
+
+
+def test_gemini_streams_messages_array(tmp_path):
+    path = tmp_path / "session-1.json"
+    path.write_text(json.dumps({
+        "sessionId": "s",
+        "meta": {"nested": ["]", "}"]},
+        "messages": [
+            {"type": "user", "content": "q"},
+            {"type": "gemini", "model": "g", "tokens": {"total": 7},
+             "toolCalls": [{"name": "ls", "args": {}, "result": "r" * 5000}],
+             "content": "answer"},
+        ],
+    }, indent=1))
+
+    parsed = _parse_gemini_session(path)
+
+    assert parsed["final_text"] == "answer" and parsed["model"] == "g"
+    assert parsed["usage"] == {"total_tokens": 7}
+    assert len(parsed["tool_results"][0]["output"]) < 2100
+    assert list(iter_json_array(path, "missing")) == []
+
+
+def test_oversized_jsonl_record_is_skipped(tmp_path):
+    path = tmp_path / "big.jsonl"
+    path.write_text(
+        json.dumps({"n": 1}) + "\n"
+        + json.dumps({"blob": "x" * 5000}) + "\n"
+        + json.dumps({"n": 2}) + "\n"
+    )
+
+    assert list(iter_jsonl(path, max_record_bytes=1000)) == [{"n": 1}, {"n": 2}]
+
+
+def test_parse_memory_is_bounded_by_caps_not_file_size(tmp_path):
+    # ~40 MB of tool output; the retained trace is a few hundred KB.
+    output = "o" * (256 * 1024)
+    path = tmp_path / "rollout.jsonl"
+    with open(path, "w") as f:
+        for i in range(160):
+            f.write(json.dumps({"type": "response_item", "payload": {
+                "type": "function_call_output", "call_id": f"c{i}",
+                "output": output}}) + "\n")
+
+    tracemalloc.start()
+    results = _parse_codex_session(path)[2]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(results) == 160
+    assert peak < 8 * 1024 * 1024
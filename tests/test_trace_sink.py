@@ -0,0 +1,146 @@
+"""
+Offline tests for the streaming JSONL trace sink.
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+
+sys.path.insert(0, ".")
+
+import pytest
+
+from src.backends.mock import MOCK
+from src.graph import AsyncGraphExecutor, GraphExecutor, RunStore, parse_graph
+from src.tracing import JsonlTraceSink, build_trace, load_trace
+
+
+def graph(fail: bool = False) -> dict:
+    MOCK.configure("bad", error_rate=1.0 if fail else 0.0)
+    return {
+        "name": "g",
+        "nodes": {
+            "a": {"role": "a", "backend": "mock"},
+            "b": {"role": "b", "backend": "mock", "model": "bad"},
+            "c": {"role": "c", "backend": "mock"},
+        },
+        "edges": [
+            {"from": "_input", "to": "a"},
+            {"from": "a", "to": "b", "context_policy": "aggregate"},
+            {"from": "b", "to": "c", "context_policy": "aggregate"},
+            {"from": "c", "to": "_output"},
+        ],
+    }
+
+
+def records(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.mark.parametrize("executor", [GraphExecutor, AsyncGraphExecutor])
+@pytest.mark.parametrize("dedupe", [False, True])
+def test_jsonl_trace_matches_build_trace(tmp_path, executor, dedupe):
+    MOCK.clear()
+    MOCK.configure(output_chars=1000)
+    path = tmp_path / "run.jsonl"
+    ex = executor(parse_graph(graph()), trace_sink=JsonlTraceSink(path, dedupe=dedupe))
+    result = ex.run("task") if executor is GraphExecutor else asyncio.run(ex.arun("task"))
+    MOCK.clear()
+
+    kinds = [r["type"] for r in records(path)]
+    assert kinds[0] == "run" and kinds[-1] == "end"
+    assert ("blob" in kinds) == dedupe and kinds.count("step") == 3
+
+    trace = load_trace(path)
+    expected = build_trace(result, "task", pattern="graph")
+    assert trace["steps"] == expected["steps"]
+    for key in ("pattern", "task", "total_steps", "success", "backends_used"):
+        assert trace["metadata"][key] == expected["metadata"][key]
+    assert trace["metadata"]["context_id"] == result.metadata["context_id"]
+
+
+def test_steps_are_on_disk_as_nodes_finish(tmp_path):
+    MOCK.clear()
+    path = tmp_path / "run.jsonl"
+    store = RunStore(tmp_path / "runs")
+    ex = GraphExecutor(parse_graph(graph(fail=True)), store=store,
+                       trace_sink=JsonlTraceSink(path))
+    result = ex.run("task")
+    assert not result.success
+
+    # Simulate a crash after "b": drop the end record and tear the last line
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:-1]) + '{"type":"step","st')
+    trace = load_trace(path)
+    assert trace["metadata"]["complete"] is False
+    assert [s["agent_name"] for s in trace["steps"]] == ["a", "b"]
+    assert trace["metadata"]["success"] is False
+
+    # Resuming rewrites the file with the restored step first
+    MOCK.configure("bad", error_rate=0.0)
+    resumed = ex.resume(result.metadata["context_id"])
+    MOCK.clear()
+    trace = load_trace(path)
+    assert resumed.success and trace["metadata"]["success"]
+    assert "complete" not in trace["metadata"]
+    assert [s["agent_name"] for s in trace["steps"]] == ["a", "b", "c"]
+    assert [s["step_index"] for s in trace["steps"]] == [0, 1, 2]
+
+
+def test_steps_are_built_on_the_writer_thread(tmp_path, monkeypatch):
+    import src.tracing as tracing
+
+    threads = []
+    build_step = tracing._build_step
+
+    def slow_build_step(*args):
+        threads.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return build_step(*args)
+
+    monkeypatch.setattr(tracing, "_build_step", slow_build_step)
+    MOCK.clear()
+    path = tmp_path / "run.jsonl"
+    sink = JsonlTraceSink(path)
+    result = GraphExecutor(parse_graph(graph())).run("task")
+
+    sink.start("task", pattern="graph")
+    t0 = time.monotonic()
+    sink.write(result.steps)
+    assert time.monotonic() - t0 < 0.1
+    sink.finish()
+
+    assert all(name.startswith("trace-sink") for name in threads)
+    assert [r["type"] for r in records(path)] == ["run", "step", "step", "step", "end"]
+    with pytest.raises(ValueError, match="before start"):
+        sink.write(result.steps)
+
+
+@pytest.mark.parametrize("executor", [GraphExecutor, AsyncGraphExecutor])
+def test_writers_are_flushed_when_the_scheduler_raises(tmp_path, monkeypatch, executor):
+    import src.graph.async_executor as async_module
+    import src.graph.executor as sync_module
+
+    module = sync_module if executor is GraphExecutor else async_module
+    make_envelope = module._make_envelope
+
+    def broken_make_envelope(context_id, task, context, nid, *args):
+        if nid == "b":
+            raise RuntimeError("scheduler bug")
+        return make_envelope(context_id, task, context, nid, *args)
+
+    monkeypatch.setattr(module, "_make_envelope", broken_make_envelope)
+    MOCK.clear()
+    path = tmp_path / "run.jsonl"
+    store = RunStore(tmp_path / "runs")
+    ex = executor(parse_graph(graph()), store=store, trace_sink=JsonlTraceSink(path))
+    with pytest.raises(RuntimeError, match="scheduler bug"):
+        ex.run("task") if executor is GraphExecutor else asyncio.run(ex.arun("task"))
+
+    # "a" reached both writers before the failure, and the trace was closed
+    kinds = [r["type"] for r in records(path)]
+    assert kinds == ["run", "step", "end"]
+    context_id = records(path)[0]["metadata"]["context_id"]
+    assert list(store.load_nodes(context_id)) == ["a"]